@@ -0,0 +1,307 @@
+"""
+Batch mode: one instruction applied to many files.
+The instruction is resolved to a command template once (by the local intent
+parser, or by a single LLM call on the first file). Each file then gets the
+template with its own input name and output format, checked and optimized
+against its own analysis, and runs
+on the shared job scheduler in a work directory of its own. Failed files keep
+their error and can be retried one at a time, with the LLM correcting the
+command from that file's stderr.
+"""
+import os
+import re
+import shutil
+import threading
+from . import (ffmpeg_runner, ffmpeg_command, llm_client, intent_parser, command_optimizer, video_analyzer,
+               job_scheduler, config)
+from .job_scheduler import QUEUED, RUNNING, DONE, FAILED, CANCELLED
+
+INPUT_PLACEHOLDER = '{input}'
+WORK_DIR_NAME = '.ffmigo_batch'
+
+
+def _link_or_copy(src, dst):
+    """Make src available at dst without copying the data when the filesystem allows it"""
+    for make_link in (os.link, os.symlink):
+        try:
+            make_link(src, dst)
+            return
+        except (OSError, NotImplementedError):
+            continue
+    shutil.copy2(src, dst)
+
+
+class BatchRunner:
+    """
+    Runs one instruction over a list of files. on_update(index) is called from
+    worker threads whenever items[index] changes.
+    """
+    def __init__(self, files, instruction, output_dir, assets=None, on_update=None):
+        self.instruction = instruction
+        self.output_dir = output_dir
+        self.assets = assets or []
+        self.on_update = on_update
+        self.settings = config.get_config()
+        self.work_root = os.path.join(output_dir, WORK_DIR_NAME)
+        self.items = []
+        for path in files:
+            self.items.append({
+                'path': path,
+                'name': os.path.basename(path),
+                'ext': os.path.splitext(path)[1][1:].lower(),
+                'analysis': None,
+                'state': QUEUED,
+                'percent': 0,
+                'command': None,
+                'error': None,
+                'log_path': None,
+                'output': None,
+                'retries': 0,
+            })
+        self.template = None
+        self.template_source = None
+        # Extension of the file the LLM template was written for
+        self.template_ext = None
+        self._jobs = {}
+        self._job_ids = {}
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+
+    # Template
+
+    def _llm_settings(self):
+        return (self.settings.get("llm_endpoint", "http://localhost:11434/api/generate"),
+                self.settings.get("llm_model", "llama3"),
+                self.settings.get("provider", "Ollama"),
+                self.settings.get("api_key", None))
+
+    def _asset_payload(self):
+        return [{'name': os.path.basename(p), 'type': 'file', 'rel_path': f"assets/{os.path.basename(p)}"}
+                for p in self.assets]
+
+    def resolve_template(self):
+        """Turn the instruction into a command template. Returns (True, source) or (False, error)."""
+        if not self.items:
+            return False, 'No files to process.'
+        for item in self.items:
+            item['analysis'] = video_analyzer.analyze_video(item['path'])
+        first = self.items[0]
+        input_name = f"input.{first['ext']}"
+        if not self.assets and self.settings.get('intent_fast_path', True):
+            intent = intent_parser.parse_intent(self.instruction, input_name, first['ext'], first['analysis'])
+            if intent:
+                # Simple edits are rebuilt per file from each file's own analysis
+                self.template_source = f"local ({intent[1]})"
+                self.template = INPUT_PLACEHOLDER
+                return True, self.template_source
+        endpoint, model, provider, api_key = self._llm_settings()
+        summary = video_analyzer.get_video_summary(first['analysis']) if first['analysis'] else None
+        # No input_analysis: a compiled edit plan must not stream copy based on the first file's codecs alone
+        command = llm_client.get_ffmpeg_command(self.instruction, input_name, first['ext'], endpoint, model,
+                                                provider, api_key, attachments=self._asset_payload(),
+                                                input_video_info=summary)
+        if not command:
+            return False, 'Failed to get command from LLM.'
+        valid, reason = ffmpeg_runner.validate_ffmpeg_command(command)
+        if not valid:
+            return False, f'Invalid FFmpeg command: {reason}'
+        self.template = command.replace(input_name, INPUT_PLACEHOLDER)
+        self.template_ext = first['ext']
+        self.template_source = f"{provider} ({model})"
+        print(f"[INFO] Batch template from {self.template_source}: {self.template}")
+        return True, self.template_source
+
+    def _command_for(self, item):
+        input_name = f"input.{item['ext']}"
+        if self.template == INPUT_PLACEHOLDER:
+            intent = intent_parser.parse_intent(self.instruction, input_name, item['ext'], item['analysis'])
+            if not intent:
+                return None
+            command = intent[0]
+        else:
+            command = self._reparameterize(self.template.replace(INPUT_PLACEHOLDER, input_name), item['ext'])
+        if self.settings.get('optimize_commands', True) and item['analysis']:
+            optimized, rewrites = command_optimizer.optimize_command(command, item['analysis'])
+            if rewrites and ffmpeg_runner.validate_ffmpeg_command(optimized)[0]:
+                command = optimized
+        return command
+
+    def _reparameterize(self, command, ext):
+        """
+        Give the output the file's own format when the template only kept the
+        first file's format because the instruction named none.
+        """
+        if ext == self.template_ext or re.search(rf'\b{re.escape(self.template_ext)}\b', self.instruction.lower()):
+            return command
+        try:
+            tokens = ffmpeg_command.split(command)
+        except ValueError:
+            return command
+        out_idx = ffmpeg_command.output_index(tokens)
+        if out_idx is None or tokens[out_idx] != f"output.{self.template_ext}":
+            return command
+        # Encoders chosen for the first container may not fit another one
+        if ffmpeg_command.find_option(tokens, ('-c', '-codec', '-c:v', '-vcodec', '-codec:v', '-c:a', '-acodec', '-codec:a')) is not None:
+            return command
+        tokens[out_idx] = f"output.{ext}"
+        return ffmpeg_command.join(tokens)
+
+    def _check_times(self, command, item):
+        """Why the template's seek or duration does not fit this file, or None"""
+        duration = video_analyzer.get_duration(item['analysis'])
+        if not duration or self.template == INPUT_PLACEHOLDER:
+            return None
+        try:
+            tokens = ffmpeg_command.split(command)
+        except ValueError:
+            return None
+        seek = ffmpeg_runner.parse_ffmpeg_time(ffmpeg_command.get_option(tokens, ('-ss',)) or '0') or 0.0
+        length = ffmpeg_command.get_option(tokens, ('-t',))
+        end = ffmpeg_command.get_option(tokens, ('-to',))
+        if length is not None:
+            end = seek + (ffmpeg_runner.parse_ffmpeg_time(length) or 0.0)
+        elif end is not None:
+            end = ffmpeg_runner.parse_ffmpeg_time(end)
+        if seek >= duration:
+            return f"The command seeks to {seek:g}s, past the end of this file ({duration:.1f}s long)."
+        if end is not None and end > duration + 0.5:
+            return f"The command runs to {end:g}s, past the end of this file ({duration:.1f}s long)."
+        return None
+
+    # Scheduling
+
+    def start(self):
+        """Queue every file on the shared scheduler"""
+        for index in range(len(self.items)):
+            self._submit(index, self._run_item)
+
+    def retry(self, index):
+        """Queue a failed file again, asking the LLM to correct its command first"""
+        if self.items[index]['state'] not in (FAILED, CANCELLED):
+            return
+        self._cancelled.clear()
+        self._update(index, state=QUEUED, percent=0)
+        self._submit(index, self._retry_item)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        scheduler = job_scheduler.get_scheduler()
+        with self._lock:
+            jobs = list(self._jobs.values())
+            queued = [i for i, job_id in self._job_ids.items() if scheduler.cancel(job_id)]
+        for index in queued:
+            self._update(index, state=CANCELLED)
+        for job in jobs:
+            job.cancel()
+
+    def _submit(self, index, fn):
+        job_id = job_scheduler.get_scheduler().submit(fn, index, name=f"batch-{index}")
+        with self._lock:
+            self._job_ids[index] = job_id
+
+    def is_finished(self):
+        return all(item['state'] in (DONE, FAILED, CANCELLED) for item in self.items)
+
+    def cleanup(self):
+        """Remove the work directories (outputs were already moved out)"""
+        shutil.rmtree(self.work_root, ignore_errors=True)
+
+    # Work
+
+    def _update(self, index, **changes):
+        self.items[index].update(changes)
+        if self.on_update:
+            self.on_update(index)
+
+    def _work_dir(self, index):
+        return os.path.join(self.work_root, str(index))
+
+    def _prepare_work_dir(self, index):
+        item = self.items[index]
+        work_dir = self._work_dir(index)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(os.path.join(work_dir, 'assets'), exist_ok=True)
+        _link_or_copy(item['path'], os.path.join(work_dir, f"input.{item['ext']}"))
+        for asset in self.assets:
+            _link_or_copy(asset, os.path.join(work_dir, 'assets', os.path.basename(asset)))
+        return work_dir
+
+    def _run_item(self, index, command=None):
+        item = self.items[index]
+        if self._cancelled.is_set():
+            self._update(index, state=CANCELLED)
+            return
+        command = command or self._command_for(item)
+        if not command:
+            self._update(index, state=FAILED, error='The instruction does not apply to this file.')
+            return
+        problem = self._check_times(command, item)
+        if problem:
+            # Keep the command so a retry asks the LLM to fit it to this file
+            self._update(index, state=FAILED, command=command, error=problem)
+            return
+        self._update(index, state=RUNNING, command=command, error=None, percent=0)
+        work_dir = self._prepare_work_dir(index)
+
+        def on_progress(progress):
+            if progress.get('percent') is not None:
+                self._update(index, percent=int(progress['percent']))
+
+        job = ffmpeg_runner.FFmpegJob(command, work_dir, progress_callback=on_progress,
+                                      duration=video_analyzer.get_duration(item['analysis']))
+        with self._lock:
+            self._jobs[index] = job
+        try:
+            result = job.run()
+        finally:
+            with self._lock:
+                self._jobs.pop(index, None)
+        if result.get('cancelled'):
+            self._update(index, state=CANCELLED, error='Cancelled.')
+        elif not result.get('success'):
+            self._update(index, state=FAILED, error=result.get('stderr', 'Unknown error'), log_path=result.get('log_path'))
+        else:
+            output = self._collect_output(index, command)
+            if output:
+                shutil.rmtree(work_dir, ignore_errors=True)
+                self._update(index, state=DONE, percent=100, output=output)
+            else:
+                self._update(index, state=FAILED, error='FFmpeg did not produce an output file.')
+
+    def _collect_output(self, index, command):
+        """Move output.* out of the work directory as <name>_edited.<ext>"""
+        work_dir = self._work_dir(index)
+        outputs = [f for f in os.listdir(work_dir) if f.startswith('output.')]
+        if not outputs:
+            return None
+        out_ext = os.path.splitext(outputs[0])[1]
+        stem = os.path.splitext(self.items[index]['name'])[0]
+        dest = os.path.join(self.output_dir, f"{stem}_edited{out_ext}")
+        n = 2
+        while os.path.exists(dest):
+            dest = os.path.join(self.output_dir, f"{stem}_edited_{n}{out_ext}")
+            n += 1
+        shutil.move(os.path.join(work_dir, outputs[0]), dest)
+        return dest
+
+    def _retry_item(self, index):
+        item = self.items[index]
+        if not item['command'] or not item['error']:
+            self._run_item(index)
+            return
+        endpoint, model, provider, api_key = self._llm_settings()
+        summary = video_analyzer.get_video_summary(item['analysis']) if item['analysis'] else None
+        self._update(index, state=RUNNING, percent=0)
+        command = llm_client.retry_ffmpeg_command(item['command'], item['error'], self.instruction,
+                                                  f"input.{item['ext']}", item['ext'], endpoint, model, provider,
+                                                  api_key, attachments=self._asset_payload(), input_video_info=summary)
+        valid, reason = ffmpeg_runner.validate_ffmpeg_command(command) if command else (False, 'no command from LLM')
+        item['retries'] += 1
+        if not valid:
+            self._update(index, state=FAILED, error=f"Retry failed: {reason}")
+            return
+        self._run_item(index, command=command)
@@ -0,0 +1,295 @@
+"""
+Segment-parallel encoding for long inputs.
+The input's video stream is split at keyframes with the segment muxer, the
+(per-frame) command is run on every chunk in parallel, the audio is encoded
+once in a single pass, and the pieces are stitched back together with the
+concat demuxer. Only commands without temporal filters or timing options are
+eligible, so every chunk can be processed independently.
+"""
+import os
+import shutil
+import threading
+import time
+import itertools
+from . import ffmpeg_runner, ffmpeg_command, video_analyzer
+
+# Inputs shorter than this are encoded in a single pass
+MIN_DURATION = 120
+MIN_CHUNK_SECONDS = 10
+# Chunks per parallel worker, so a slow chunk does not leave the others idle
+CHUNKS_PER_WORKER = 2
+# FFmpeg threads given to each chunk encode
+THREADS_PER_CHUNK = 2
+
+# Options that trim, retime or remap streams and so cannot be applied per chunk
+UNCHUNKABLE_OPTIONS = {
+    '-ss', '-t', '-to', '-sseof', '-itsoffset', '-r', '-frames:v', '-vframes',
+    '-fps_mode', '-vsync', '-filter_complex', '-lavfi', '-filter_complex_script',
+    '-map', '-stream_loop', '-loop',
+}
+STREAM_COPY_VALUES = {'copy'}
+# Outputs that are not a plain video container
+NON_VIDEO_OUTPUTS = {
+    'gif', 'png', 'jpg', 'jpeg', 'webp', 'bmp', 'apng', 'mp3', 'wav', 'aac',
+    'm4a', 'flac', 'ogg', 'opus',
+}
+VIDEO_ONLY_OPTIONS = {
+    '-vf', '-filter:v', '-c:v', '-vcodec', '-codec:v', '-crf', '-qp', '-preset', '-tune',
+    '-pix_fmt', '-profile:v', '-level', '-b:v', '-maxrate', '-bufsize', '-g', '-s',
+    '-aspect', '-x264-params', '-x265-params', '-x264opts', '-q:v', '-qscale:v',
+}
+AUDIO_ONLY_OPTIONS = {
+    '-af', '-filter:a', '-c:a', '-acodec', '-codec:a', '-b:a', '-ar', '-ac', '-q:a',
+    '-qscale:a', '-aq',
+}
+# Codec options that apply to every stream
+GENERIC_CODEC_OPTIONS = {'-c', '-codec'}
+
+_chunk_ids = itertools.count(1)
+
+
+def worker_count():
+    """Number of chunks encoded at once, from the job's thread budget"""
+    budget = ffmpeg_runner.get_thread_budget() or os.cpu_count() or 2
+    return max(1, budget // THREADS_PER_CHUNK)
+
+
+def is_chunkable(cmd, analysis):
+    """Return (True, '') if cmd can be encoded in parallel chunks, else (False, reason)"""
+    duration = video_analyzer.get_duration(analysis)
+    if not duration or duration < MIN_DURATION:
+        return False, 'input is too short'
+    if not analysis.get('video_streams'):
+        return False, 'input has no video stream'
+    if worker_count() < 2:
+        return False, 'not enough cores'
+    try:
+        tokens = ffmpeg_command.split(cmd)
+    except ValueError as e:
+        return False, f'cannot parse command: {e}'
+    if len(ffmpeg_command.input_indices(tokens)) != 1:
+        return False, 'command has more than one input'
+    out_idx = ffmpeg_command.output_index(tokens)
+    if out_idx is None:
+        return False, 'no output file'
+    out_ext = os.path.splitext(tokens[out_idx])[1][1:].lower()
+    if out_ext in NON_VIDEO_OUTPUTS:
+        return False, f'{out_ext} output'
+    for option in UNCHUNKABLE_OPTIONS:
+        if option in tokens:
+            return False, f'uses {option}'
+    if '-vn' in tokens:
+        return False, 'no video output'
+    for option in ('-c', '-codec', '-c:v', '-vcodec', '-codec:v'):
+        if ffmpeg_command.get_option(tokens, (option,)) in STREAM_COPY_VALUES:
+            return False, 'video is stream copied'
+    for name in ffmpeg_command.filter_names(ffmpeg_command.video_filters(tokens)):
+        if name in ffmpeg_command.TEMPORAL_FILTERS:
+            return False, f'temporal filter {name}'
+    return True, ''
+
+
+class ChunkedEncode:
+    """
+    Runs a per-frame FFmpeg command over parallel chunks of the input.
+    Exposes the same run()/cancel() interface as ffmpeg_runner.FFmpegJob and
+    falls back to a single-pass encode if the chunked pipeline fails.
+    """
+    def __init__(self, cmd, workdir, analysis, progress_callback=None):
+        self.cmd = cmd
+        self.workdir = workdir
+        self.analysis = analysis
+        self.duration = video_analyzer.get_duration(analysis)
+        self.progress_callback = progress_callback
+        self.chunk_dir_name = f"chunks_{int(time.time())}_{next(_chunk_ids)}"
+        self.chunk_dir = os.path.join(workdir, self.chunk_dir_name)
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._active_jobs = set()
+        self._chunk_times = {}
+        self._started = None
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._lock:
+            jobs = list(self._active_jobs)
+        for job in jobs:
+            job.cancel()
+
+    def run(self):
+        self._started = time.time()
+        try:
+            result = self._run_chunked()
+        except Exception as e:
+            result = ffmpeg_runner._error_result(f'Chunked encode failed: {e}')
+        finally:
+            shutil.rmtree(self.chunk_dir, ignore_errors=True)
+        if result.get('success') or result.get('cancelled'):
+            return result
+        print(f"[WARNING] Chunked encode failed, falling back to a single pass: {result.get('stderr', '')[-300:]}")
+        return self._run_job(self.cmd, progress_callback=self.progress_callback, duration=self.duration, final=True)
+
+    def _run_job(self, cmd, progress_callback=None, duration=None, threads=None, final=False):
+        """
+        Run one FFmpeg step. Intermediate steps log into the chunk directory and
+        leave cleanup to run(); final steps write output.* and log to the project.
+        """
+        job = ffmpeg_runner.FFmpegJob(
+            cmd, self.workdir,
+            progress_callback=progress_callback,
+            duration=duration,
+            partial_outputs=None if final else [],
+            threads=threads,
+            # Short chunks on a few threads would drag down the speed history behind full-file deadlines
+            record_speed=final,
+            log_path=None if final else os.path.join(self.chunk_dir, f"ffmpeg_{time.time_ns()}.log")
+        )
+        with self._lock:
+            self._active_jobs.add(job)
+        if self._cancelled.is_set():
+            job.cancel()
+        try:
+            return job.run()
+        finally:
+            with self._lock:
+                self._active_jobs.discard(job)
+
+    def _rel(self, name):
+        return os.path.join(self.chunk_dir_name, name)
+
+    def _run_chunked(self):
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        tokens = ffmpeg_command.split(self.cmd)
+        input_name = tokens[ffmpeg_command.input_indices(tokens)[0]]
+        out_idx = ffmpeg_command.output_index(tokens)
+        output_name = tokens[out_idx]
+        out_ext = os.path.splitext(output_name)[1][1:]
+        workers = worker_count()
+
+        # 1. Split the video stream at keyframes
+        segment_time = max(MIN_CHUNK_SECONDS, int(self.duration / (workers * CHUNKS_PER_WORKER)) + 1)
+        split_cmd = ffmpeg_command.join([
+            'ffmpeg', '-y', '-i', input_name, '-map', '0:v:0', '-c', 'copy',
+            '-f', 'segment', '-segment_time', str(segment_time), '-reset_timestamps', '1',
+            self._rel('src_%04d.mkv')
+        ])
+        result = self._run_job(split_cmd)
+        if not result.get('success'):
+            return result
+        sources = sorted(f for f in os.listdir(self.chunk_dir) if f.startswith('src_'))
+        if len(sources) < 2:
+            return ffmpeg_runner._error_result('Input could not be split into chunks')
+        print(f"[INFO] Chunked encode: {len(sources)} chunks of ~{segment_time}s on {workers} workers")
+
+        # 2. Build the per-chunk video commands and the single audio command
+        video_tokens = ffmpeg_command.remove_option(tokens, AUDIO_ONLY_OPTIONS | {'-an'})
+        tasks = []
+        for i, source in enumerate(sources):
+            chunk_tokens = list(video_tokens)
+            chunk_tokens[ffmpeg_command.input_indices(chunk_tokens)[0]] = self._rel(source)
+            chunk_out = ffmpeg_command.output_index(chunk_tokens)
+            chunk_tokens[chunk_out:chunk_out + 1] = ['-an', self._rel(f'out_{i:04d}.{out_ext}')]
+            if '-y' not in chunk_tokens:
+                chunk_tokens.insert(1, '-y')
+            tasks.append(('video', i, ffmpeg_command.join(chunk_tokens)))
+
+        has_audio = bool(self.analysis.get('audio_streams')) and '-an' not in tokens
+        audio_name = f'audio.{out_ext}'
+        if has_audio:
+            audio_tokens = ffmpeg_command.remove_option(tokens, VIDEO_ONLY_OPTIONS)
+            codec = ffmpeg_command.get_option(audio_tokens, GENERIC_CODEC_OPTIONS)
+            audio_tokens = ffmpeg_command.remove_option(audio_tokens, GENERIC_CODEC_OPTIONS)
+            if codec and '-c:a' not in audio_tokens and '-acodec' not in audio_tokens:
+                audio_tokens[1:1] = ['-c:a', codec]
+            audio_out = ffmpeg_command.output_index(audio_tokens)
+            audio_tokens[audio_out:audio_out + 1] = ['-vn', self._rel(audio_name)]
+            if '-y' not in audio_tokens:
+                audio_tokens.insert(1, '-y')
+            # Audio first: it is one long task
+            tasks.insert(0, ('audio', None, ffmpeg_command.join(audio_tokens)))
+
+        # 3. Run everything on a bounded set of worker threads
+        failures = []
+        pending = list(tasks)
+        pending_lock = threading.Lock()
+
+        def work():
+            while not self._cancelled.is_set() and not failures:
+                with pending_lock:
+                    if not pending:
+                        return
+                    kind, index, cmd = pending.pop(0)
+                callback = self._chunk_progress_callback(index) if kind == 'video' else None
+                res = self._run_job(cmd, progress_callback=callback, threads=THREADS_PER_CHUNK)
+                if not res.get('success'):
+                    failures.append(res)
+                    # Stop the other chunks early
+                    if not res.get('cancelled'):
+                        self.cancel_active()
+
+        threads = [threading.Thread(target=work, daemon=True) for _ in range(min(workers, len(tasks)))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if self._cancelled.is_set():
+            return ffmpeg_runner._error_result('FFmpeg job was cancelled.', cancelled=True)
+        real_failures = [f for f in failures if not f.get('cancelled')]
+        if real_failures:
+            return real_failures[0]
+
+        # 4. Stitch the chunks (and audio) back together without re-encoding
+        list_path = os.path.join(self.chunk_dir, 'list.txt')
+        with open(list_path, 'w') as f:
+            for i in range(len(sources)):
+                f.write(f"file 'out_{i:04d}.{out_ext}'\n")
+        concat = ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', self._rel('list.txt')]
+        if has_audio:
+            concat += ['-i', self._rel(audio_name), '-map', '0:v', '-map', '1:a']
+        concat += ['-c', 'copy']
+        movflags = ffmpeg_command.get_option(tokens, ('-movflags',))
+        if movflags:
+            concat += ['-movflags', movflags]
+        concat.append(output_name)
+        result = self._run_job(ffmpeg_command.join(concat), final=True)
+        if result.get('success'):
+            result['chunked'] = True
+            result['chunks'] = len(sources)
+            self._report_progress(final=True)
+            print(f"[INFO] Chunked encode finished in {time.time() - self._started:.1f}s")
+        return result
+
+    def cancel_active(self):
+        """Stop running chunk jobs without marking the whole encode as cancelled"""
+        with self._lock:
+            jobs = list(self._active_jobs)
+        for job in jobs:
+            job.cancel()
+
+    def _chunk_progress_callback(self, index):
+        def on_progress(progress):
+            if progress.get('out_time') is None:
+                return
+            with self._lock:
+                self._chunk_times[index] = progress['out_time']
+            self._report_progress()
+        return on_progress
+
+    def _report_progress(self, final=False):
+        if not self.progress_callback or not self.duration:
+            return
+        with self._lock:
+            done = sum(self._chunk_times.values())
+        elapsed = max(time.time() - self._started, 0.001)
+        done = self.duration if final else min(done, self.duration)
+        speed = done / elapsed
+        self.progress_callback({
+            'out_time': done,
+            'frame': None,
+            'fps': None,
+            'speed': speed,
+            'bitrate': 'N/A',
+            'percent': done / self.duration * 100.0,
+            'eta': 0.0 if final else (self.duration - done) / speed if speed > 0 else None,
+            'status': 'end' if final else 'continue',
+        })
@@ -0,0 +1,338 @@
+"""
+Local index of request -> command pairs that ran successfully.
+Every successful edit is added to ~/.video-editor-app/command_history.jsonl.
+On first use the index is also filled from existing projects: each checkpoint's
+user_command is paired with its ffmpeg_command, or for older checkpoints with
+the last successful FFmpeg job in the project's metrics log before the next
+checkpoint. Similar past requests are found with TF-IDF cosine similarity
+(no network) and used as few-shot examples in the LLM prompt. A near-identical
+request on an input with compatible specs reuses the stored command directly.
+"""
+import os
+import re
+import json
+import math
+import time
+import threading
+from . import project_manager, metrics, ffmpeg_command, video_analyzer, config
+from .ffmpeg_runner import validate_ffmpeg_command, parse_ffmpeg_time
+
+MAX_ENTRIES = 2000
+DEFAULT_EXAMPLES = 3
+# Matches weaker than this are more likely to mislead the model than to help
+MIN_SIMILARITY = 0.3
+# Similarity a request needs to reuse an earlier command without the LLM
+DEFAULT_REUSE_THRESHOLD = 0.85
+# Stand-in for the input file name, which changes after every edit (input_1.mp4, input_2.mp4...)
+INPUT_PLACEHOLDER = '{input}'
+
+STOPWORDS = {
+    'a', 'an', 'the', 'to', 'of', 'and', 'in', 'on', 'for', 'it', 'its', 'this', 'that', 'my', 'me', 'i',
+    'please', 'can', 'could', 'you', 'want', 'would', 'like', 'video', 'clip', 'file', 'with', 'by',
+    'from', 'at', 'is', 'be', 'so', 'just', 'make',
+}
+# Words with the same meaning in an edit request
+SYNONYMS = {
+    'cut': 'trim', 'delete': 'remove', 'strip': 'remove', 'drop': 'remove',
+    'sound': 'audio', 'faster': 'speed', 'quicker': 'speed', 'slower': 'slow',
+    'seconds': 'sec', 'second': 'sec', 'secs': 'sec', 's': 'sec', 'minutes': 'min', 'minute': 'min', 'mins': 'min',
+    'counterclockwise': 'ccw', 'anticlockwise': 'ccw', 'clockwise': 'cw',
+}
+# Verbs that carry no meaning of their own next to the edit's parameters ("make it 720p" = "scale to 720p")
+GENERIC_WORDS = {'scale', 'resize', 'convert', 'change', 'set', 'turn', 'export', 'save', 'resolution', 'into', 'as'}
+# Tokens whose value must match exactly for a command to be reused
+PARAMETER_WORDS = {
+    'mp4', 'mov', 'mkv', 'webm', 'avi', 'gif', 'mp3', 'wav', 'm4a', 'aac', 'flac', 'ogg', '4k',
+    'left', 'right', 'top', 'bottom', 'center', 'cw', 'ccw', 'out', 'horizontal', 'horizontally',
+    'vertical', 'vertically', 'first', 'last', 'start', 'end', 'sec', 'min',
+}
+# Filters that use absolute pixel positions, so they only suit inputs of the same size
+GEOMETRY_FILTERS = ('crop=', 'pad=', 'overlay=', 'delogo=', 'drawbox=')
+INPUT_NAME = re.compile(r'input(_\d+)?\.[A-Za-z0-9]+')
+OUTPUT_NAME = re.compile(r'output\.[A-Za-z0-9]+')
+
+_lock = threading.Lock()
+_entries = None   # list of {'query', 'command', 'timestamp'}, oldest first
+_index = None     # (idf, unseen_idf, [(entry, vector, norm)]), rebuilt after changes
+_appended = 0
+
+
+def get_history_path():
+    return os.path.expanduser('~/.video-editor-app/command_history.jsonl')
+
+
+def tokenize(text):
+    """Lowercase word and number tokens without filler words ('720p', '2x' and '1.5' stay whole)"""
+    tokens = re.findall(r'[a-z0-9]+(?:\.[0-9]+)?', (text or '').lower())
+    tokens = [SYNONYMS.get(t, t) for t in tokens]
+    if 'mute' in tokens:
+        tokens = [t for t in tokens if t != 'mute'] + ['remove', 'audio']
+    return [t for t in tokens if t not in STOPWORDS and t not in GENERIC_WORDS]
+
+
+def _parameters(tokens):
+    """Numbers, formats and directions: a different value means a different edit"""
+    return {t for t in tokens if t in PARAMETER_WORDS or any(c.isdigit() for c in t)}
+
+
+def _template(command, input_filename):
+    return command.replace(input_filename, INPUT_PLACEHOLDER) if input_filename else command
+
+
+def _is_user_command(command):
+    """True for a single edit of the project input, not a chunk, pre-flight or merge job"""
+    try:
+        tokens = ffmpeg_command.split(command)
+        inputs = [tokens[i] for i in ffmpeg_command.input_indices(tokens)]
+        out_idx = ffmpeg_command.output_index(tokens)
+    except (ValueError, IndexError):
+        return False
+    return (bool(inputs) and INPUT_NAME.fullmatch(inputs[0]) is not None and out_idx is not None
+            and OUTPUT_NAME.fullmatch(tokens[out_idx]) is not None and validate_ffmpeg_command(command)[0])
+
+
+def _project_pairs(project_dir):
+    """(query, templated command, timestamp) for each checkpoint of a project with a known command"""
+    checkpoints = [meta for _, meta in project_manager.list_checkpoints(project_dir)]
+    checkpoints.sort(key=lambda meta: meta.get('timestamp', 0))
+    jobs = None
+    pairs = []
+    for i, meta in enumerate(checkpoints):
+        query = meta.get('user_command')
+        if not query:
+            continue
+        command = meta.get('ffmpeg_command')
+        if not command:
+            # Older checkpoints: the last successful job before the next checkpoint
+            if jobs is None:
+                jobs = [r for r in metrics.load_records(metrics.get_project_metrics_path(project_dir), kind='ffmpeg_job')
+                        if r.get('status') == 'success' and _is_user_command(r.get('command', ''))]
+            start = meta.get('timestamp', 0)
+            end = checkpoints[i + 1].get('timestamp', float('inf')) if i + 1 < len(checkpoints) else float('inf')
+            window = [r['command'] for r in jobs if start <= r.get('timestamp', 0) < end]
+            command = window[-1] if window else None
+        if command:
+            pairs.append((query, _template(command, meta.get('input_file')), meta.get('timestamp', 0)))
+    return pairs
+
+
+def _backfill():
+    entries = []
+    for project_dir in project_manager.list_projects():
+        try:
+            for query, command, timestamp in _project_pairs(project_dir):
+                entries.append({'query': query, 'command': command, 'timestamp': timestamp})
+        except OSError:
+            continue
+    return entries
+
+
+def _load():
+    global _entries
+    if _entries is not None:
+        return _entries
+    entries = []
+    path = get_history_path()
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError as e:
+            print(f"[WARNING] Failed to load command history: {e}")
+    else:
+        entries = sorted(_backfill(), key=lambda e: e['timestamp'])
+        if entries:
+            print(f"[INFO] Indexed {len(entries)} past commands from existing projects")
+            _rewrite(entries[-MAX_ENTRIES:])
+    _entries = entries[-MAX_ENTRIES:]
+    return _entries
+
+
+def _rewrite(entries):
+    path = get_history_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.writelines(json.dumps(e) + '\n' for e in entries)
+    except OSError as e:
+        print(f"[WARNING] Failed to save command history: {e}")
+
+
+def record(user_query, command, input_filename, analysis=None):
+    """Add a request and the command that carried it out successfully on an input with `analysis`"""
+    global _index, _appended
+    if not user_query or not command or not _is_user_command(command):
+        return
+    entry = {'query': user_query, 'command': _template(command, input_filename), 'timestamp': time.time()}
+    if analysis:
+        # Only entries with a known input can be reused without the LLM
+        entry['input_ext'] = os.path.splitext(input_filename)[1][1:].lower()
+        entry['spec'] = video_analyzer.get_spec(analysis)
+    with _lock:
+        entries = _load()
+        entries.append(entry)
+        _appended += 1
+        if len(entries) > MAX_ENTRIES:
+            del entries[:len(entries) - MAX_ENTRIES]
+        if _appended >= MAX_ENTRIES:
+            _rewrite(entries)
+            _appended = 0
+        else:
+            try:
+                os.makedirs(os.path.dirname(get_history_path()), exist_ok=True)
+                with open(get_history_path(), 'a') as f:
+                    f.write(json.dumps(entry) + '\n')
+            except OSError as e:
+                print(f"[WARNING] Failed to save command history: {e}")
+        _index = None
+
+
+def _build_index(entries):
+    # The latest command per distinct request
+    latest = {}
+    for entry in entries:
+        latest[(' '.join(tokenize(entry['query'])), entry['command'])] = entry
+    documents = [(entry, tokenize(entry['query'])) for entry in latest.values()]
+    documents = [(entry, tokens) for entry, tokens in documents if tokens]
+    df = {}
+    for _, tokens in documents:
+        for token in set(tokens):
+            df[token] = df.get(token, 0) + 1
+    idf = {token: math.log((len(documents) + 1) / (count + 1)) + 1 for token, count in df.items()}
+    # A word no stored request uses is the rarest there is, and usually what makes the request different
+    unseen_idf = math.log(len(documents) + 1) + 1
+    vectors = []
+    for entry, tokens in documents:
+        vector = _vector(tokens, idf, unseen_idf)
+        vectors.append((entry, vector, math.sqrt(sum(w * w for w in vector.values()))))
+    return idf, unseen_idf, vectors
+
+
+def _vector(tokens, idf, unseen_idf):
+    counts = {}
+    for token in tokens:
+        counts[token] = counts.get(token, 0) + 1
+    return {token: (1 + math.log(count)) * idf.get(token, unseen_idf) for token, count in counts.items()}
+
+
+def discard(user_query):
+    """Forget the commands stored for a request, e.g. after a reused one failed"""
+    global _index
+    with _lock:
+        entries = _load()
+        kept = [e for e in entries if e['query'] != user_query]
+        if len(kept) != len(entries):
+            entries[:] = kept
+            _rewrite(entries)
+            _index = None
+            print(f"[INFO] Dropped the stored command for \"{user_query}\" from the history")
+
+
+def _scored(user_query):
+    """(similarity, entry) pairs for user_query, best first"""
+    global _index
+    tokens = tokenize(user_query)
+    if not tokens:
+        return []
+    with _lock:
+        if _index is None:
+            _index = _build_index(_load())
+        idf, unseen_idf, vectors = _index
+    query_vector = _vector(tokens, idf, unseen_idf)
+    query_norm = math.sqrt(sum(w * w for w in query_vector.values()))
+    if not query_norm:
+        return []
+    scored = []
+    for entry, vector, norm in vectors:
+        if norm:
+            score = sum(weight * vector.get(token, 0) for token, weight in query_vector.items()) / (query_norm * norm)
+            scored.append((score, entry))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return scored
+
+
+def find_examples(user_query, input_filename, limit=None, allow_assets=False):
+    """
+    Up to `limit` (request, command) pairs most similar to user_query, best
+    first, with the current input file name filled in.
+    """
+    limit = int(config.get_config().get('few_shot_examples', DEFAULT_EXAMPLES)) if limit is None else limit
+    if limit <= 0:
+        return []
+    matches = [entry for score, entry in _scored(user_query)
+               if score >= MIN_SIMILARITY and (allow_assets or 'assets/' not in entry['command'])]
+    return [(entry['query'], entry['command'].replace(INPUT_PLACEHOLDER, input_filename))
+            for entry in matches[:limit]]
+
+
+def _compatible(entry, spec, input_ext):
+    """True if the entry's command can run unchanged (apart from file names) on an input with `spec`"""
+    old = entry.get('spec')
+    if not old or not spec:
+        return False
+    command = entry['command']
+    if bool(old['video_codec']) != bool(spec['video_codec']) or bool(old['audio_codec']) != bool(spec['audio_codec']):
+        return False
+    tokens = ffmpeg_command.split(command)
+    # Copied streams must have the codec the command was proven with
+    copies_all = ffmpeg_command.get_option(tokens, ('-c', '-codec')) == 'copy'
+    if (copies_all or ffmpeg_command.get_option(tokens, ('-c:v', '-vcodec', '-codec:v')) == 'copy') and old['video_codec'] != spec['video_codec']:
+        return False
+    if (copies_all or ffmpeg_command.get_option(tokens, ('-c:a', '-acodec', '-codec:a')) == 'copy') and old['audio_codec'] != spec['audio_codec']:
+        return False
+    if any(name in command for name in GEOMETRY_FILTERS) and (old['width'], old['height']) != (spec['width'], spec['height']):
+        return False
+    if entry.get('input_ext') != input_ext:
+        # A different container only works if FFmpeg picks the encoders
+        if any(t in tokens for t in ('-c', '-codec', '-c:v', '-vcodec', '-codec:v', '-c:a', '-acodec', '-codec:a')):
+            return False
+    seek = ffmpeg_command.get_option(tokens, ('-ss',))
+    if seek is not None and spec['duration'] and (parse_ffmpeg_time(seek) or 0) >= spec['duration']:
+        return False
+    return True
+
+
+def _reparameterize(entry, input_filename, input_ext):
+    """The entry's command for the current input name, keeping 'same format as the input' outputs in step"""
+    tokens = ffmpeg_command.split(entry['command'].replace(INPUT_PLACEHOLDER, input_filename))
+    out_idx = ffmpeg_command.output_index(tokens)
+    if out_idx is not None and tokens[out_idx] == f"output.{entry.get('input_ext')}":
+        tokens[out_idx] = f"output.{input_ext}"
+    return ffmpeg_command.join(tokens)
+
+
+def find_reusable(user_query, input_filename, input_ext, analysis):
+    """
+    (command, matched_request, similarity) for a near-identical earlier request
+    whose command suits this input, or None.
+    """
+    settings = config.get_config()
+    if not settings.get('fuzzy_reuse', True) or not analysis:
+        return None
+    threshold = float(settings.get('fuzzy_reuse_threshold', DEFAULT_REUSE_THRESHOLD))
+    tokens = set(tokenize(user_query))
+    parameters = _parameters(tokens)
+    spec = video_analyzer.get_spec(analysis)
+    input_ext = (input_ext or '').lower()
+    for score, entry in _scored(user_query):
+        if score < threshold:
+            break
+        entry_tokens = set(tokenize(entry['query']))
+        if 'assets/' in entry['command'] or _parameters(entry_tokens) != parameters:
+            continue
+        # Every word of the request must appear in the earlier one ("decrease volume" is not "increase volume")
+        if not tokens <= entry_tokens:
+            continue
+        try:
+            if not _compatible(entry, spec, input_ext):
+                continue
+            command = _reparameterize(entry, input_filename, input_ext)
+        except ValueError:
+            continue
+        if validate_ffmpeg_command(command)[0]:
+            return command, entry['query'], score
+    return None
@@ -0,0 +1,196 @@
+"""
+Rewrites LLM-generated FFmpeg commands to avoid needless work:
+- streams that are not filtered or re-parameterized are stream copied
+  (-c:v copy / -c:a copy) when the output container accepts the input codec
+- an output-side -ss is moved before -i so FFmpeg seeks instead of decoding
+  everything up to the cut point
+Only single-input commands are touched, and every rewrite is reported.
+"""
+import os
+from . import ffmpeg_command
+from .ffmpeg_runner import parse_ffmpeg_time
+
+ANY_CODEC = None
+
+# Codecs each output container can hold without re-encoding (None = anything)
+CONTAINER_VIDEO_CODECS = {
+    'mp4': {'h264', 'hevc', 'mpeg4', 'av1'},
+    'm4v': {'h264', 'hevc', 'mpeg4', 'av1'},
+    'mov': {'h264', 'hevc', 'mpeg4', 'prores', 'mjpeg', 'av1'},
+    'mkv': ANY_CODEC,
+    'webm': {'vp8', 'vp9', 'av1'},
+    'avi': {'h264', 'mpeg4', 'mjpeg', 'msmpeg4v3'},
+    'ts': {'h264', 'hevc', 'mpeg2video'},
+    'flv': {'h264'},
+}
+CONTAINER_AUDIO_CODECS = {
+    'mp4': {'aac', 'mp3', 'ac3', 'eac3', 'alac', 'opus'},
+    'm4v': {'aac', 'mp3', 'ac3', 'eac3', 'alac'},
+    'mov': {'aac', 'mp3', 'ac3', 'alac', 'pcm_s16le', 'pcm_s24le'},
+    'mkv': ANY_CODEC,
+    'webm': {'opus', 'vorbis'},
+    'avi': {'mp3', 'ac3', 'pcm_s16le'},
+    'ts': {'aac', 'mp3', 'ac3'},
+    'flv': {'aac', 'mp3'},
+    'm4a': {'aac', 'alac'},
+    'aac': {'aac'},
+    'mp3': {'mp3'},
+    'opus': {'opus'},
+    'ogg': {'vorbis', 'opus'},
+    'wav': {'pcm_s16le', 'pcm_s24le', 'pcm_f32le'},
+    'flac': {'flac'},
+}
+
+# Encoders that merely re-encode to the codec the input already has
+SAME_CODEC_ENCODERS = {
+    'h264': {'libx264', 'h264', 'h264_videotoolbox', 'h264_nvenc'},
+    'hevc': {'libx265', 'hevc', 'hevc_videotoolbox', 'hevc_nvenc'},
+    'vp9': {'libvpx-vp9', 'vp9'},
+    'vp8': {'libvpx', 'vp8'},
+    'av1': {'libaom-av1', 'libsvtav1', 'av1'},
+    'mpeg4': {'mpeg4'},
+    'aac': {'aac', 'libfdk_aac'},
+    'mp3': {'libmp3lame', 'mp3'},
+    'opus': {'libopus', 'opus'},
+    'vorbis': {'libvorbis', 'vorbis'},
+    'flac': {'flac'},
+}
+
+VIDEO_CODEC_OPTIONS = ('-c:v', '-vcodec', '-codec:v')
+AUDIO_CODEC_OPTIONS = ('-c:a', '-acodec', '-codec:a')
+GENERIC_CODEC_OPTIONS = ('-c', '-codec')
+# Options that change the decoded video and therefore need an encode
+VIDEO_ENCODE_OPTIONS = {
+    '-vf', '-filter:v', '-s', '-r', '-pix_fmt', '-aspect', '-crf', '-qp', '-b:v',
+    '-maxrate', '-bufsize', '-tune', '-profile:v', '-level', '-g', '-q:v', '-qscale:v',
+    '-x264-params', '-x265-params', '-x264opts', '-vsync', '-fps_mode', '-vframes',
+}
+# Encoder settings that are harmless to drop once the stream is copied
+VIDEO_ENCODER_ONLY_OPTIONS = {'-preset'}
+AUDIO_ENCODE_OPTIONS = {'-af', '-filter:a', '-ar', '-ac', '-b:a', '-q:a', '-qscale:a', '-aq'}
+COMPLEX_OPTIONS = {'-filter_complex', '-lavfi', '-filter_complex_script', '-copyts', '-map'}
+
+# Filters that do not depend on timestamps, so an input seek does not change their result
+TIMELESS_FILTERS = {
+    'scale', 'crop', 'pad', 'hflip', 'vflip', 'transpose', 'format', 'setsar', 'setdar',
+    'volume', 'aresample', 'aformat', 'null', 'anull', 'pan',
+}
+
+
+def _ext(path):
+    return os.path.splitext(path)[1][1:].lower()
+
+
+def _first_stream(analysis, kind):
+    streams = (analysis or {}).get(f'{kind}_streams') or []
+    return streams[0] if streams else None
+
+
+def _container_accepts(table, ext, codec):
+    if ext not in table or not codec:
+        return False
+    allowed = table[ext]
+    return allowed is ANY_CODEC or codec in allowed
+
+
+def _is_same_codec(encoder, codec):
+    return encoder is None or encoder in SAME_CODEC_ENCODERS.get(codec, {codec})
+
+
+def _format_seconds(seconds):
+    return f"{seconds:.3f}".rstrip('0').rstrip('.')
+
+
+def _move_seek_before_input(tokens, input_idx, out_idx, rewrites):
+    """Move an output-side -ss before -i, converting -to into -t. Returns new tokens."""
+    ss_idx = ffmpeg_command.find_option(tokens, ('-ss',), input_idx + 1, out_idx)
+    if ss_idx is None or ffmpeg_command.find_option(tokens, ('-ss', '-sseof'), 0, input_idx) is not None:
+        return tokens
+    filters = (ffmpeg_command.video_filters(tokens) or '') + ',' + (ffmpeg_command.audio_filters(tokens) or '')
+    names = ffmpeg_command.filter_names(filters)
+    if 'enable=' in filters or any(name not in TIMELESS_FILTERS for name in names):
+        # Time-based filter expressions would shift with the seek
+        return tokens
+    start = parse_ffmpeg_time(tokens[ss_idx + 1])
+    if start is None:
+        return tokens
+    tokens = list(tokens)
+    to_idx = ffmpeg_command.find_option(tokens, ('-to',), input_idx + 1, out_idx)
+    if to_idx is not None:
+        if ffmpeg_command.find_option(tokens, ('-t',), input_idx + 1, out_idx) is not None:
+            return tokens
+        end = parse_ffmpeg_time(tokens[to_idx + 1])
+        if end is None or end <= start:
+            return tokens
+        # After an input seek output timestamps start at 0, so the end point becomes a duration
+        tokens[to_idx:to_idx + 2] = ['-t', _format_seconds(end - start)]
+        rewrites.append(f"converted -to {_format_seconds(end)} into -t {_format_seconds(end - start)}")
+    seek = tokens[ss_idx:ss_idx + 2]
+    del tokens[ss_idx:ss_idx + 2]
+    input_flag_idx = input_idx - 1
+    tokens[input_flag_idx:input_flag_idx] = seek
+    rewrites.append(f"moved -ss {seek[1]} before the input (seek instead of decoding to the cut point)")
+    return tokens
+
+
+def _set_codec(tokens, options, value):
+    """Replace any of the codec options with `<options[0]> value` just before the output"""
+    tokens = ffmpeg_command.remove_option(tokens, options)
+    out_idx = ffmpeg_command.output_index(tokens)
+    tokens[out_idx:out_idx] = [options[0], value]
+    return tokens
+
+
+def optimize_command(cmd, analysis):
+    """
+    Return (optimized_cmd, rewrites) where rewrites is a list of human-readable
+    descriptions. The command is returned unchanged if nothing applies.
+    """
+    try:
+        tokens = ffmpeg_command.split(cmd)
+    except ValueError:
+        return cmd, []
+    inputs = ffmpeg_command.input_indices(tokens)
+    out_idx = ffmpeg_command.output_index(tokens)
+    if len(inputs) != 1 or out_idx is None or not analysis:
+        return cmd, []
+    if any(option in tokens for option in COMPLEX_OPTIONS):
+        return cmd, []
+    generic_codec = ffmpeg_command.get_option(tokens, GENERIC_CODEC_OPTIONS)
+    if generic_codec is not None:
+        # '-c copy' is already optimal, and any other '-c' value is ambiguous
+        return cmd, []
+
+    rewrites = []
+    tokens = _move_seek_before_input(tokens, inputs[0], out_idx, rewrites)
+    out_ext = _ext(tokens[ffmpeg_command.output_index(tokens)])
+    copied = False
+
+    video = _first_stream(analysis, 'video')
+    video_encoder = ffmpeg_command.get_option(tokens, VIDEO_CODEC_OPTIONS)
+    if (video and '-vn' not in tokens and video_encoder != 'copy'
+            and not any(option in tokens for option in VIDEO_ENCODE_OPTIONS)
+            and _is_same_codec(video_encoder, video.get('codec_name'))
+            and _container_accepts(CONTAINER_VIDEO_CODECS, out_ext, video.get('codec_name'))):
+        tokens = ffmpeg_command.remove_option(tokens, VIDEO_ENCODER_ONLY_OPTIONS)
+        tokens = _set_codec(tokens, VIDEO_CODEC_OPTIONS, 'copy')
+        rewrites.append(f"video is not modified: copying the {video.get('codec_name')} stream instead of re-encoding ({video_encoder or 'default encoder'})")
+        copied = True
+
+    audio = _first_stream(analysis, 'audio')
+    audio_encoder = ffmpeg_command.get_option(tokens, AUDIO_CODEC_OPTIONS)
+    if (audio and '-an' not in tokens and audio_encoder != 'copy'
+            and not any(option in tokens for option in AUDIO_ENCODE_OPTIONS)
+            and _is_same_codec(audio_encoder, audio.get('codec_name'))
+            and _container_accepts(CONTAINER_AUDIO_CODECS, out_ext, audio.get('codec_name'))):
+        tokens = _set_codec(tokens, AUDIO_CODEC_OPTIONS, 'copy')
+        rewrites.append(f"audio is not modified: copying the {audio.get('codec_name')} stream instead of re-encoding ({audio_encoder or 'default encoder'})")
+        copied = True
+
+    if copied and ffmpeg_command.find_option(tokens, ('-ss',)) is not None and '-avoid_negative_ts' not in tokens:
+        out_idx = ffmpeg_command.output_index(tokens)
+        tokens[out_idx:out_idx] = ['-avoid_negative_ts', 'make_zero']
+
+    if not rewrites:
+        return cmd, []
+    return ffmpeg_command.join(tokens), rewrites
@@ -0,0 +1,108 @@
+"""
+Helpers for inspecting and rewriting FFmpeg command lines as token lists.
+"""
+import re
+import shlex
+
+# Options that do not take a value
+FLAG_OPTIONS = {
+    '-y', '-n', '-an', '-vn', '-sn', '-dn', '-nostdin', '-nostats', '-stats',
+    '-hide_banner', '-shortest', '-copyts', '-start_at_zero', '-re', '-accurate_seek',
+    '-noaccurate_seek', '-autorotate', '-noautorotate', '-ignore_unknown', '-copyinkf',
+}
+
+# Filters whose output for a frame depends on other frames or on absolute timestamps;
+# commands using them cannot be split into independently processed chunks
+TEMPORAL_FILTERS = {
+    'fps', 'framerate', 'setpts', 'asetpts', 'trim', 'atrim', 'select', 'aselect',
+    'reverse', 'areverse', 'loop', 'aloop', 'tpad', 'apad', 'minterpolate', 'tblend',
+    'tmix', 'deflicker', 'deshake', 'vidstabdetect', 'vidstabtransform', 'fade', 'afade',
+    'xfade', 'acrossfade', 'concat', 'framestep', 'decimate', 'mpdecimate', 'telecine',
+    'fieldmatch', 'yadif', 'bwdif', 'w3fdif', 'tinterlace', 'interlace', 'atempo',
+    'hqdn3d', 'nlmeans', 'atadenoise', 'drawtext', 'subtitles', 'ass',
+    'palettegen', 'paletteuse', 'thumbnail', 'freezedetect', 'blackdetect',
+}
+
+
+def split(cmd):
+    """Split a command string into tokens"""
+    return shlex.split(cmd)
+
+
+def join(tokens):
+    """Join tokens back into a shell-safe command string"""
+    return ' '.join(shlex.quote(t) for t in tokens)
+
+
+def takes_value(token):
+    return token.startswith('-') and token not in FLAG_OPTIONS and len(token) > 1
+
+
+def input_indices(tokens):
+    """Indices of the tokens that are input file names (the values of -i)"""
+    return [i + 1 for i, t in enumerate(tokens[:-1]) if t == '-i']
+
+
+def output_index(tokens):
+    """Index of the output file: the last token that is neither an option nor an option's value"""
+    idx = None
+    i = 1
+    while i < len(tokens):
+        token = tokens[i]
+        if takes_value(token):
+            i += 2
+            continue
+        if not token.startswith('-'):
+            idx = i
+        i += 1
+    return idx
+
+
+def find_option(tokens, names, start=0, end=None):
+    """Index of the first option in `names` between start and end, or None"""
+    end = len(tokens) if end is None else end
+    for i in range(start, end):
+        if tokens[i] in names:
+            return i
+    return None
+
+
+def get_option(tokens, names, start=0, end=None):
+    """Value of the first option in `names` between start and end, or None"""
+    idx = find_option(tokens, names, start, end)
+    if idx is None or idx + 1 >= len(tokens):
+        return None
+    return tokens[idx + 1]
+
+
+def remove_option(tokens, names):
+    """Return tokens without any occurrence of the options in `names` (and their values)"""
+    result = []
+    i = 0
+    while i < len(tokens):
+        if tokens[i] in names:
+            i += 2 if takes_value(tokens[i]) else 1
+            continue
+        result.append(tokens[i])
+        i += 1
+    return result
+
+
+def filter_names(filtergraph):
+    """Names of the filters used in a filtergraph string"""
+    names = []
+    for chain in re.split(r'[;,]', filtergraph or ''):
+        chain = re.sub(r'\[[^\]]*\]', '', chain).strip()
+        if chain:
+            names.append(chain.split('=', 1)[0].split('@', 1)[0].strip())
+    return names
+
+
+def video_filters(tokens):
+    """The -vf/-filter:v filtergraph of the command, or None"""
+    return get_option(tokens, ('-vf', '-filter:v'))
+
+
+def audio_filters(tokens):
+    """The -af/-filter:a filtergraph of the command, or None"""
+    return get_option(tokens, ('-af', '-filter:a'))
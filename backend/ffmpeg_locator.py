@@ -0,0 +1,108 @@
+"""
+Process-wide resolver for the FFmpeg and ffprobe executables.
+Each binary is probed once and the resolved path and version are cached until
+invalidate() is called (e.g. after the FFmpeg path setting changes).
+"""
+import os
+import subprocess
+import threading
+from . import config
+
+# Common installation paths, checked after PATH
+COMMON_PATHS = {
+    'ffmpeg': [
+        '/usr/local/bin/ffmpeg',
+        '/opt/homebrew/bin/ffmpeg',  # Apple Silicon Homebrew
+        '/usr/bin/ffmpeg',
+        '/opt/local/bin/ffmpeg',     # MacPorts
+        'C:\\ffmpeg\\bin\\ffmpeg.exe',  # Windows
+        'C:\\Program Files\\ffmpeg\\bin\\ffmpeg.exe',  # Windows
+    ],
+    'ffprobe': [
+        '/usr/local/bin/ffprobe',
+        '/opt/homebrew/bin/ffprobe',  # Apple Silicon Homebrew
+        '/usr/bin/ffprobe',
+        '/opt/local/bin/ffprobe',     # MacPorts
+        'C:\\ffmpeg\\bin\\ffprobe.exe',  # Windows
+        'C:\\Program Files\\ffmpeg\\bin\\ffprobe.exe',  # Windows
+    ],
+}
+
+_lock = threading.Lock()
+_resolved = {}  # name -> {'path': str or None, 'version': str or None}
+
+
+def _probe(path):
+    """Run `<path> -version` and return the version line, or None if it does not run"""
+    try:
+        result = subprocess.run([path, '-version'],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                encoding='utf-8', errors='replace', timeout=5)
+        if result.returncode == 0:
+            first_line = result.stdout.split('\n')[0].strip()
+            return first_line or 'unknown'
+    except (subprocess.TimeoutExpired, FileNotFoundError, PermissionError, OSError):
+        pass
+    return None
+
+
+def _configured_candidate(name):
+    """Path derived from the ffmpeg_path setting, or None if it is unset or the default"""
+    try:
+        configured = (config.get_config().get('ffmpeg_path') or '').strip()
+    except Exception as e:
+        print(f"[WARNING] Could not read FFmpeg path from config: {e}")
+        return None
+    if not configured or configured == 'ffmpeg':
+        return None
+    if name == 'ffmpeg':
+        return configured
+    # ffprobe is expected to sit next to the configured ffmpeg binary
+    exe = '.exe' if configured.lower().endswith('.exe') else ''
+    return os.path.join(os.path.dirname(configured), name + exe)
+
+
+def _candidates(name):
+    configured = _configured_candidate(name)
+    if configured:
+        yield configured
+    # PATH lookup
+    yield name
+    for path in COMMON_PATHS.get(name, []):
+        if os.path.exists(path):
+            yield path
+
+
+def _resolve_entry(name):
+    with _lock:
+        entry = _resolved.get(name)
+        if entry is not None:
+            return entry
+        entry = {'path': None, 'version': None}
+        for candidate in _candidates(name):
+            version = _probe(candidate)
+            if version:
+                entry = {'path': candidate, 'version': version}
+                break
+        if entry['path']:
+            print(f"[INFO] Resolved {name}: {entry['path']} ({entry['version']})")
+        else:
+            print(f"[WARNING] {name} not found")
+        _resolved[name] = entry
+        return entry
+
+
+def resolve(name):
+    """Return the path of the 'ffmpeg' or 'ffprobe' executable, or None if not found"""
+    return _resolve_entry(name)['path']
+
+
+def get_version(name):
+    """Return the `-version` banner line of the resolved binary, or None"""
+    return _resolve_entry(name)['version']
+
+
+def invalidate():
+    """Forget resolved binaries so the next lookup probes again"""
+    with _lock:
+        _resolved.clear()
@@ -2,7 +2,20 @@ import subprocess
 import re
 import shlex
 import os
+import glob
+import itertools
 import platform
+import signal
+import sys
+import threading
+import time
+from collections import deque
+import json
+from . import ffmpeg_locator, ffmpeg_command, config, metrics
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 def validate_ffmpeg_command(cmd):
     """
@@ -53,73 +66,646 @@ def validate_ffmpeg_command(cmd):
     return True, ''
 
 def find_ffmpeg():
-    """Find FFmpeg executable in common locations"""
-    # Common FFmpeg installation paths
-    common_paths = [
-        '/usr/local/bin/ffmpeg',
-        '/opt/homebrew/bin/ffmpeg',  # Apple Silicon Homebrew
-        '/usr/bin/ffmpeg',
-        '/opt/local/bin/ffmpeg',     # MacPorts
-        'C:\\ffmpeg\\bin\\ffmpeg.exe',  # Windows
-        'C:\\Program Files\\ffmpeg\\bin\\ffmpeg.exe',  # Windows
-    ]
-    
-    # First check if ffmpeg is in PATH
+    """Find FFmpeg executable (resolved once per process, honours the configured path)"""
+    return ffmpeg_locator.resolve('ffmpeg')
+
+def parse_ffmpeg_time(value):
+    """Parse an FFmpeg timestamp like '00:01:02.500000' to seconds"""
     try:
-        result = subprocess.run(['ffmpeg', '-version'], 
-                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, 
-                              text=True, timeout=5)
-        if result.returncode == 0:
-            return 'ffmpeg'
-    except (subprocess.TimeoutExpired, FileNotFoundError):
-        pass
-    
-    # Check common installation paths
-    for path in common_paths:
-        if os.path.exists(path):
-            return path
-    
-    return None
+        parts = value.strip().split(':')
+        seconds = 0.0
+        for part in parts:
+            seconds = seconds * 60 + float(part)
+        return max(seconds, 0.0)
+    except (ValueError, AttributeError):
+        return None
+
+class ProgressTracker:
+    """
+    Accumulates the key=value lines written by `ffmpeg -progress pipe:1`.
+    Each block ends with a `progress=continue|end` line, at which point a
+    snapshot with percent-complete and ETA (if the duration is known) is returned.
+    """
+    def __init__(self, duration=None):
+        self.duration = duration if duration and duration > 0 else None
+        self.current = {}
+        self.last = None
+
+    def feed(self, line):
+        key, sep, value = line.strip().partition('=')
+        if not sep:
+            return None
+        self.current[key] = value.strip()
+        if key != 'progress':
+            return None
+        self.last = self._snapshot(self.current)
+        self.current = {}
+        return self.last
+
+    def _snapshot(self, block):
+        out_time = None
+        # out_time_us and out_time_ms are both in microseconds
+        for key in ('out_time_us', 'out_time_ms'):
+            if block.get(key, 'N/A') not in ('N/A', ''):
+                try:
+                    out_time = max(int(block[key]) / 1000000.0, 0.0)
+                    break
+                except ValueError:
+                    pass
+        if out_time is None and 'out_time' in block:
+            out_time = parse_ffmpeg_time(block['out_time'])
+
+        speed = None
+        speed_str = block.get('speed', 'N/A').rstrip('x').strip()
+        try:
+            speed = float(speed_str)
+        except ValueError:
+            pass
+
+        fps = None
+        try:
+            fps = float(block.get('fps', ''))
+        except ValueError:
+            pass
+
+        try:
+            frame = int(block.get('frame', ''))
+        except ValueError:
+            frame = None
+
+        try:
+            total_size = int(block.get('total_size', ''))
+        except ValueError:
+            total_size = None
+
+        percent = None
+        eta = None
+        if self.duration and out_time is not None:
+            percent = min(out_time / self.duration * 100.0, 100.0)
+            if speed and speed > 0:
+                eta = max(self.duration - out_time, 0.0) / speed
+        if block.get('progress') == 'end' and self.duration:
+            percent = 100.0
+            eta = 0.0
+
+        return {
+            'out_time': out_time,
+            'frame': frame,
+            'total_size': total_size,
+            'fps': fps,
+            'speed': speed,
+            'bitrate': block.get('bitrate', 'N/A'),
+            'percent': percent,
+            'eta': eta,
+            'status': block.get('progress'),
+        }
+
+def format_progress(progress):
+    """Return a short human-readable progress line for the UI"""
+    parts = []
+    if progress.get('percent') is not None:
+        parts.append(f"{progress['percent']:.0f}%")
+    if progress.get('out_time') is not None:
+        mins, secs = divmod(int(progress['out_time']), 60)
+        parts.append(f"at {mins:02d}:{secs:02d}")
+    if progress.get('speed') is not None:
+        parts.append(f"{progress['speed']:.2f}x")
+    if progress.get('fps') is not None:
+        parts.append(f"{progress['fps']:.0f} fps")
+    if progress.get('bitrate') and progress['bitrate'] != 'N/A':
+        parts.append(progress['bitrate'])
+    if progress.get('eta') is not None:
+        mins, secs = divmod(int(progress['eta']), 60)
+        parts.append(f"ETA {mins:02d}:{secs:02d}")
+    return " | ".join(parts)
+
+# Per-thread FFmpeg thread budget, set by the job scheduler on its workers
+_thread_budget = threading.local()
+
+def set_thread_budget(threads):
+    """Limit FFmpeg jobs started from the calling thread to `threads` threads (None for no limit)"""
+    _thread_budget.threads = threads
 
-def run_ffmpeg_command(cmd, workdir):
+def get_thread_budget():
+    return getattr(_thread_budget, 'threads', None)
+
+def _output_index(args):
+    """Index of the output file argument (output.ext, otherwise the last argument)"""
+    for i in range(len(args) - 1, 0, -1):
+        if re.search(r'(^|[/\\])output\.[A-Za-z0-9]+$', args[i]):
+            return i
+    return len(args) - 1
+
+def _inject_thread_args(args, threads):
+    """Cap encoder and filtergraph threads unless the command already sets them"""
+    if not threads:
+        return args
+    args = list(args)
+    if '-threads' not in args:
+        idx = _output_index(args)
+        args[idx:idx] = ['-threads', str(threads)]
+    if '-filter_complex_threads' not in args:
+        args[1:1] = ['-filter_complex_threads', str(threads)]
+    return args
+
+def _inject_progress_args(args):
+    """Ask FFmpeg for machine-readable progress on stdout instead of the stats line on stderr"""
+    return [args[0], '-progress', 'pipe:1', '-nostats'] + args[1:]
+
+# Lines that look like errors are kept even after they scroll out of the stderr tail
+ERROR_LINE_PATTERN = re.compile(r'error|invalid|failed|not found|no such|unrecognized|unknown|cannot|could not|unable|does not|mismatch', re.IGNORECASE)
+
+class StderrCapture:
+    """
+    Consumes FFmpeg's stderr with bounded memory: the full log is streamed to a
+    file while only the last `tail_lines` lines and up to `max_error_lines`
+    error-looking lines are kept in memory.
+    """
+    def __init__(self, log_path=None, tail_lines=40, max_error_lines=20):
+        self.log_path = log_path
+        self.tail = deque(maxlen=tail_lines)
+        self.error_lines = deque(maxlen=max_error_lines)
+        self.total_lines = 0
+        # Set if reading stderr raised; the rest of the output is drained unread
+        self.failure = None
+
+    def consume(self, stream):
+        log_file = None
+        if self.log_path:
+            try:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                log_file = open(self.log_path, 'w', encoding='utf-8', errors='replace')
+            except OSError as e:
+                print(f"[WARNING] Could not open FFmpeg log {self.log_path}: {e}")
+                self.log_path = None
+        try:
+            for line in stream:
+                if log_file:
+                    log_file.write(line)
+                line = line.rstrip()
+                if not line:
+                    continue
+                self.total_lines += 1
+                self.tail.append(line)
+                if ERROR_LINE_PATTERN.search(line):
+                    self.error_lines.append(line)
+        except Exception as e:
+            self.failure = f"{type(e).__name__}: {e}"
+            print(f"[ERROR] Reading FFmpeg stderr failed, the rest of the log is lost: {self.failure}")
+            if log_file:
+                log_file.write(f"\n[stderr reader failed: {self.failure}]\n")
+            # Keep the pipe flowing so FFmpeg never blocks on a full stderr buffer
+            self._drain(stream)
+        finally:
+            if log_file:
+                log_file.close()
+
+    @staticmethod
+    def _drain(stream):
+        raw = getattr(stream, 'buffer', stream)
+        try:
+            while raw.read(65536):
+                pass
+        except (OSError, ValueError):
+            pass
+
+    def text(self):
+        """Error lines that scrolled out of the tail, followed by the tail"""
+        tail = list(self.tail)
+        tail_set = set(tail)
+        earlier_errors = [line for line in self.error_lines if line not in tail_set]
+        lines = []
+        if earlier_errors:
+            lines.extend(earlier_errors)
+            lines.append('...')
+        elif self.total_lines > len(tail):
+            lines.append('...')
+        lines.extend(tail)
+        if self.failure:
+            lines.append(f"(stderr reader failed: {self.failure}; the output above is incomplete)")
+        return '\n'.join(lines)
+
+# Number of per-job FFmpeg logs kept in each project's logs directory
+MAX_JOB_LOGS = 20
+_log_ids = itertools.count(1)
+
+def _job_log_path(workdir):
+    log_dir = os.path.join(workdir, 'logs')
+    _prune_job_logs(log_dir)
+    return os.path.join(log_dir, f"ffmpeg_{time.strftime('%Y%m%d_%H%M%S')}_{next(_log_ids)}.log")
+
+def _prune_job_logs(log_dir):
+    logs = sorted(glob.glob(os.path.join(log_dir, 'ffmpeg_*.log')), key=os.path.getmtime)
+    for path in logs[:-(MAX_JOB_LOGS - 1)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+# Watchdog defaults
+DEFAULT_STALL_TIMEOUT = 120   # seconds without out_time, frame or size advancing
+DEFAULT_TIMEOUT = 1800        # overall deadline when the media duration is unknown
+MIN_DEADLINE = 120            # fixed startup/finalization allowance added to every deadline
+DEADLINE_SPEED_MARGIN = 0.5   # allow jobs to run at half the slow end of historical speed
+DEFAULT_EXPECTED_SPEED = 0.1  # assumed encode speed (x realtime) before any history exists
+SPEED_HISTORY_SIZE = 20
+# Filters that consume the whole input before emitting a frame, so out_time legitimately stands still
+BUFFERING_FILTERS = ('palettegen', 'reverse', 'areverse')
+# Filters that can decode and drop a long stretch of input before the first output
+SKIPPING_FILTERS = ('trim', 'atrim', 'select', 'aselect')
+
+_speed_lock = threading.Lock()
+
+def _speed_history_path():
+    return os.path.expanduser('~/.video-editor-app/encode_speed.json')
+
+def _load_speed_history():
     try:
-        # Find FFmpeg executable
+        with open(_speed_history_path(), 'r') as f:
+            return json.load(f).get('speeds', [])
+    except (OSError, ValueError):
+        return []
+
+def record_encode_speed(speed):
+    """Remember the speed (media seconds per wall second) of a finished encode"""
+    with _speed_lock:
+        speeds = (_load_speed_history() + [round(speed, 4)])[-SPEED_HISTORY_SIZE:]
+        try:
+            os.makedirs(os.path.dirname(_speed_history_path()), exist_ok=True)
+            with open(_speed_history_path(), 'w') as f:
+                json.dump({'speeds': speeds}, f)
+        except OSError as e:
+            print(f"[WARNING] Could not save encode speed history: {e}")
+
+def expected_encode_speed():
+    """Slow end (10th percentile) of recent encode speeds, so deadlines err on the long side"""
+    with _speed_lock:
+        speeds = sorted(_load_speed_history())
+    if not speeds:
+        return DEFAULT_EXPECTED_SPEED
+    return max(speeds[len(speeds) // 10], 0.01)
+
+def compute_deadline(duration):
+    """Overall time limit in seconds for encoding `duration` seconds of media"""
+    if not duration:
+        return DEFAULT_TIMEOUT
+    return MIN_DEADLINE + duration / (expected_encode_speed() * DEADLINE_SPEED_MARGIN)
+
+def _format_clock(seconds):
+    mins, secs = divmod(int(seconds or 0), 60)
+    hours, mins = divmod(mins, 60)
+    return f"{hours:d}:{mins:02d}:{secs:02d}"
+
+def _uses_filters(cmd, names):
+    """True if any filtergraph option of cmd uses one of the named filters"""
+    try:
+        tokens = ffmpeg_command.split(cmd)
+    except ValueError:
+        return False
+    graphs = [tokens[i + 1] for i, t in enumerate(tokens[:-1])
+              if t in ('-vf', '-af', '-filter:v', '-filter:a', '-filter_complex', '-lavfi')]
+    return any(name in names for graph in graphs for name in ffmpeg_command.filter_names(graph))
+
+def _skips_input(cmd):
+    """True if cmd may decode for a long time before writing anything (output-side seek, trim/select)"""
+    try:
+        tokens = ffmpeg_command.split(cmd)
+    except ValueError:
+        return False
+    inputs = ffmpeg_command.input_indices(tokens)
+    if inputs and ffmpeg_command.find_option(tokens, ('-ss', '-sseof'), start=inputs[0] + 1) is not None:
+        return True
+    return _uses_filters(cmd, SKIPPING_FILTERS)
+
+def _rss_kb(maxrss):
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return maxrss // 1024 if sys.platform == 'darwin' else maxrss
+
+def _error_result(message, **extra):
+    result = {
+        'success': False,
+        'stdout': '',
+        'stderr': message,
+        'returncode': -1
+    }
+    result.update(extra)
+    return result
+
+class FFmpegJob:
+    """
+    Handle for a single FFmpeg process.
+    The process runs in its own process group so cancel() can stop FFmpeg and
+    anything it spawned, escalating from 'q' on stdin to SIGTERM to SIGKILL.
+    """
+    # Seconds to wait after each cancellation step before escalating
+    CANCEL_GRACE = 3
+
+    def __init__(self, cmd, workdir, progress_callback=None, duration=None, partial_outputs=None, threads=None, log_path=None, stall_timeout=None, deadline=None, record_speed=True):
+        self.cmd = cmd
+        self.workdir = workdir
+        self.progress_callback = progress_callback
+        self.duration = duration
+        # Files removed if the job is cancelled (defaults to output.* in workdir)
+        self.partial_outputs = partial_outputs
+        # FFmpeg thread cap; defaults to the budget of the scheduler worker creating the job
+        self.threads = threads if threads is not None else get_thread_budget()
+        # Full stderr goes to a per-job log file in the project; only a tail stays in memory
+        self.stderr = StderrCapture(log_path or _job_log_path(workdir))
+        self.process = None
+        self.tracker = ProgressTracker(duration)
+        # Watchdog: kill the job if progress stops advancing or the duration-derived deadline passes
+        if stall_timeout is None:
+            stall_timeout = config.get_config().get('ffmpeg_stall_timeout', DEFAULT_STALL_TIMEOUT)
+        if _uses_filters(cmd, BUFFERING_FILTERS):
+            stall_timeout = 0
+        self.stall_timeout = stall_timeout
+        # Decoding up to an output-side seek or a trim shows no progress; only the deadline applies until output starts
+        self.quiet_start = _skips_input(cmd)
+        self.deadline = deadline if deadline is not None else compute_deadline(duration)
+        # Off for partial jobs (e.g. chunks) whose speed says nothing about a full-file encode
+        self.record_speed = record_speed
+        self._cancelled = threading.Event()
+        self._timed_out = threading.Event()
+        self._stalled = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def start(self):
+        """Start FFmpeg. Returns None on success or an error result dict."""
         ffmpeg_path = find_ffmpeg()
-        
         if not ffmpeg_path:
-            return {
-                'success': False,
-                'stdout': '',
-                'stderr': 'FFmpeg not found. Please install FFmpeg and ensure it is in your PATH or in a common installation location.',
-                'returncode': -1
-            }
+            return _error_result('FFmpeg not found. Please install FFmpeg and ensure it is in your PATH or in a common installation location.')
         
-        # Replace 'ffmpeg' with the full path if needed
-        if cmd.strip().startswith('ffmpeg'):
-            cmd = cmd.replace('ffmpeg', ffmpeg_path, 1)
+        args = shlex.split(self.cmd)
+        # Replace 'ffmpeg' with the full path after splitting, so spaces or backslashes in it survive
+        if args and args[0] == 'ffmpeg':
+            args[0] = ffmpeg_path
+        args = _inject_progress_args(_inject_thread_args(args, self.threads))
         
-        args = shlex.split(cmd)
+        popen_kwargs = {}
+        if platform.system() == 'Windows':
+            popen_kwargs['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            popen_kwargs['start_new_session'] = True
         
-        # Add timeout to prevent hanging (30 minutes for video processing)
-        result = subprocess.run(args, cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=1800)
+        with self._lock:
+            if self.cancelled:
+                return self._cancelled_result()
+            self.process = subprocess.Popen(args, cwd=self.workdir, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding='utf-8', errors='replace', **popen_kwargs)
+        return None
+
+    def wait(self):
+        """Stream progress until FFmpeg exits and return the result dict"""
+        self._usage = None
+        result = self._wait()
+        self._record_metrics(result)
+        return result
+
+    def _wait(self):
+        process = self.process
+        # Drain stderr on its own thread so a chatty encoder cannot block on a full pipe
+        stderr_thread = threading.Thread(target=self.stderr.consume, args=(process.stderr,), daemon=True)
+        stderr_thread.start()
+        
+        started = time.monotonic()
+        last_advance = [started]
+        last_marks = [(-1.0, -1, -1)]
+        output_started = [False]
+        done = threading.Event()
+        def _watchdog():
+            while not done.wait(1.0):
+                now = time.monotonic()
+                watching = self.stall_timeout and (output_started[0] or not self.quiet_start)
+                if watching and now - last_advance[0] > self.stall_timeout:
+                    self._stalled.set()
+                elif self.deadline and now - started > self.deadline:
+                    self._timed_out.set()
+                else:
+                    continue
+                self._terminate()
+                return
+        watchdog = threading.Thread(target=_watchdog, daemon=True)
+        watchdog.start()
+        
+        try:
+            for line in process.stdout:
+                progress = self.tracker.feed(line)
+                if not progress:
+                    continue
+                # Any of output position, frames or bytes written moving counts as progress
+                marks = (progress.get('out_time') or 0.0, progress.get('frame') or 0, progress.get('total_size') or 0)
+                if any(new > old for new, old in zip(marks, last_marks[0])):
+                    last_marks[0] = tuple(max(new, old) for new, old in zip(marks, last_marks[0]))
+                    last_advance[0] = time.monotonic()
+                    if marks[0] > 0 or marks[1] > 0:
+                        output_started[0] = True
+                if self.progress_callback:
+                    try:
+                        self.progress_callback(progress)
+                    except Exception as e:
+                        print(f"[WARNING] Progress callback failed: {e}")
+            returncode = self._reap(process)
+        finally:
+            done.set()
+        stderr_thread.join(timeout=5)
+        self._close_pipes(process, stderr_closable=not stderr_thread.is_alive())
+        elapsed = time.monotonic() - started
+        self._elapsed = elapsed
+        
+        if self.cancelled:
+            self._remove_partial_outputs()
+            return self._cancelled_result()
+        last = self.tracker.last or {}
+        if self.stderr.failure and returncode != 0:
+            # A broken reader, not FFmpeg, is the likely cause; don't report it as a stall
+            self._remove_partial_outputs()
+            message = f"Reading FFmpeg's output failed ({self.stderr.failure}), so the job could not be monitored."
+            return _error_result(f"{message}\n{self.stderr.text()}", reader_failed=True, progress=self.tracker.last, log_path=self.stderr.log_path)
+        if self._stalled.is_set():
+            self._remove_partial_outputs()
+            message = (f"FFmpeg stalled: no progress for {self.stall_timeout:.0f}s "
+                       f"(last position {_format_clock(last.get('out_time'))}, speed {last.get('speed') or 'N/A'}).")
+            return _error_result(f"{message}\n{self.stderr.text()}", stalled=True, progress=self.tracker.last, log_path=self.stderr.log_path)
+        if self._timed_out.is_set():
+            self._remove_partial_outputs()
+            message = (f"FFmpeg command timed out after {_format_clock(self.deadline)} "
+                       f"(last position {_format_clock(last.get('out_time'))}). The operation may have failed or taken too long.")
+            return _error_result(f"{message}\n{self.stderr.text()}", timed_out=True, progress=self.tracker.last, log_path=self.stderr.log_path)
+        
+        if returncode == 0 and self.record_speed and self.duration and (last.get('out_time') or 0) > 5 and ' copy' not in self.cmd:
+            # Stream copies would skew the history towards unrealistically fast speeds
+            record_encode_speed(last['out_time'] / max(elapsed, 0.001))
         
         return {
-            'success': result.returncode == 0,
-            'stdout': result.stdout,
-            'stderr': result.stderr,
-            'returncode': result.returncode
-        }
-    except subprocess.TimeoutExpired:
-        return {
-            'success': False,
+            'success': returncode == 0,
             'stdout': '',
-            'stderr': 'FFmpeg command timed out after 30 minutes. The operation may have failed or taken too long.',
-            'returncode': -1
+            'stderr': self.stderr.text(),
+            'error_lines': list(self.stderr.error_lines),
+            'log_path': self.stderr.log_path,
+            'returncode': returncode,
+            'progress': self.tracker.last
         }
-    except Exception as e:
-        return {
-            'success': False,
-            'stdout': '',
-            'stderr': str(e),
-            'returncode': -1
-        } 
\ No newline at end of file
+
+    @staticmethod
+    def _close_pipes(process, stderr_closable=True):
+        """Close our ends of FFmpeg's pipes (stderr only once its reader has finished)"""
+        pipes = [process.stdin, process.stdout] + ([process.stderr] if stderr_closable else [])
+        for pipe in pipes:
+            try:
+                if pipe:
+                    pipe.close()
+            except (OSError, ValueError):
+                pass
+
+    def _reap(self, process):
+        """
+        Wait for FFmpeg and capture its own resource usage with wait4. If another
+        thread (e.g. cancellation) reaped it first, fall back to the RUSAGE_CHILDREN
+        delta, which also counts any FFmpeg that finished concurrently.
+        """
+        before = resource.getrusage(resource.RUSAGE_CHILDREN) if resource else None
+        if hasattr(os, 'wait4'):
+            try:
+                _, status, usage = os.wait4(process.pid, 0)
+                process.returncode = os.waitstatus_to_exitcode(status)
+                self._usage = {'source': 'wait4', 'user_cpu': usage.ru_utime, 'sys_cpu': usage.ru_stime,
+                               'max_rss_kb': _rss_kb(usage.ru_maxrss)}
+                return process.returncode
+            except ChildProcessError:
+                pass
+        returncode = process.wait()
+        if resource:
+            after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            self._usage = {'source': 'rusage_children', 'user_cpu': after.ru_utime - before.ru_utime,
+                           'sys_cpu': after.ru_stime - before.ru_stime, 'max_rss_kb': None}
+        return returncode
+
+    def _record_metrics(self, result):
+        """Append wall/CPU time, peak memory, sizes and speed of this job to the metrics logs"""
+        try:
+            tokens = ffmpeg_command.split(self.cmd)
+            inputs = [os.path.join(self.workdir, tokens[i]) for i in ffmpeg_command.input_indices(tokens)]
+            out_idx = ffmpeg_command.output_index(tokens)
+            output = os.path.join(self.workdir, tokens[out_idx]) if out_idx is not None else None
+            graphs = [tokens[i + 1] for i, t in enumerate(tokens[:-1])
+                      if t in ('-vf', '-af', '-filter:v', '-filter:a', '-filter_complex', '-lavfi')]
+            filters = sorted({name for graph in graphs for name in ffmpeg_command.filter_names(graph)})
+        except ValueError:
+            inputs, output, filters = [], None, []
+        usage = self._usage or {}
+        elapsed = getattr(self, '_elapsed', None)
+        out_time = (self.tracker.last or {}).get('out_time')
+        if result.get('success'):
+            status = 'success'
+        elif result.get('cancelled'):
+            status = 'cancelled'
+        elif result.get('reader_failed'):
+            status = 'reader_failed'
+        elif result.get('stalled'):
+            status = 'stalled'
+        elif result.get('timed_out'):
+            status = 'timed_out'
+        else:
+            status = 'failed'
+        metrics.append_record({
+            'kind': 'ffmpeg_job',
+            'command': self.cmd,
+            'filters': filters,
+            'status': status,
+            'returncode': result.get('returncode'),
+            'wall_time': round(elapsed, 3) if elapsed is not None else None,
+            'user_cpu': usage.get('user_cpu'),
+            'sys_cpu': usage.get('sys_cpu'),
+            'max_rss_kb': usage.get('max_rss_kb'),
+            'rusage_source': usage.get('source'),
+            'threads': self.threads,
+            'input_bytes': sum(os.path.getsize(p) for p in inputs if os.path.isfile(p)),
+            'output_bytes': os.path.getsize(output) if output and os.path.isfile(output) else None,
+            'media_duration': out_time,
+            'speed': round(out_time / elapsed, 3) if out_time and elapsed else None,
+        }, project_dir=self.workdir)
+
+    def run(self):
+        """Start FFmpeg and block until it finishes"""
+        try:
+            error = self.start()
+            if error:
+                return error
+            return self.wait()
+        except Exception as e:
+            return _error_result(str(e))
+
+    def cancel(self):
+        """Request cancellation. Returns immediately; escalation runs in the background."""
+        with self._lock:
+            if self.cancelled:
+                return
+            self._cancelled.set()
+            process = self.process
+        if process is None or process.poll() is not None:
+            return
+        threading.Thread(target=self._terminate, daemon=True).start()
+
+    def _terminate(self):
+        process = self.process
+        # 1. Ask FFmpeg to quit cleanly
+        try:
+            process.stdin.write('q')
+            process.stdin.flush()
+            process.stdin.close()
+        except (OSError, ValueError):
+            pass
+        if self._wait_exit(self.CANCEL_GRACE):
+            return
+        # 2. SIGTERM the whole process group
+        self._signal_group(signal.SIGTERM)
+        if self._wait_exit(self.CANCEL_GRACE):
+            return
+        # 3. SIGKILL
+        self._signal_group(getattr(signal, 'SIGKILL', signal.SIGTERM))
+
+    def _wait_exit(self, timeout):
+        try:
+            self.process.wait(timeout=timeout)
+            return True
+        except subprocess.TimeoutExpired:
+            return False
+
+    def _signal_group(self, sig):
+        try:
+            if platform.system() == 'Windows':
+                if sig == signal.SIGTERM:
+                    self.process.terminate()
+                else:
+                    self.process.kill()
+            else:
+                os.killpg(os.getpgid(self.process.pid), sig)
+        except (ProcessLookupError, PermissionError, OSError):
+            pass
+
+    def _remove_partial_outputs(self):
+        paths = self.partial_outputs
+        if paths is None:
+            paths = glob.glob(os.path.join(self.workdir, 'output.*'))
+        for path in paths:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                print(f"[WARNING] Could not remove partial output {path}: {e}")
+
+    def _cancelled_result(self):
+        return _error_result('FFmpeg job was cancelled.', cancelled=True, progress=self.tracker.last)
+
+def run_ffmpeg_command(cmd, workdir, progress_callback=None, duration=None):
+    """
+    Run an FFmpeg command, streaming progress while it runs.
+    progress_callback(progress) is called from this thread with a dict of
+    out_time, fps, speed, bitrate, percent and eta for every progress block.
+    duration (seconds) of the source media enables percent and ETA.
+    Use FFmpegJob directly when the caller needs to cancel the job.
+    """
+    return FFmpegJob(cmd, workdir, progress_callback, duration).run()
@@ -0,0 +1,63 @@
+"""
+Shared HTTP sessions for LLM providers.
+One pooled requests.Session per scheme+host keeps connections alive between
+calls, so commands and retries reuse the TCP/TLS connection instead of paying
+a new handshake every time.
+Connections are HTTP/1.1: requests has no HTTP/2 support. Calls to one host
+rarely overlap (a hedged backup goes to a different provider; only batch
+retries can run side by side, each on its own pooled connection), so HTTP/2
+multiplexing would not remove handshakes that keep-alive does not already save.
+"""
+import threading
+import urllib.parse
+import requests
+from requests.adapters import HTTPAdapter
+from . import config
+
+DEFAULT_POOL_SIZE = 4
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+def _host_key(url):
+    parts = urllib.parse.urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _pool_size():
+    try:
+        return max(1, int(config.get_config().get('http_pool_size', DEFAULT_POOL_SIZE)))
+    except (TypeError, ValueError):
+        return DEFAULT_POOL_SIZE
+
+
+def get_session(url):
+    """Return the keep-alive session for url's host, creating it on first use"""
+    key = _host_key(url)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            # pool_maxsize bounds concurrent connections to this host (e.g. parallel retries)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_pool_size())
+            session.mount(key + '/', adapter)
+            _sessions[key] = session
+            print(f"[INFO] Opened HTTP session for {key}")
+        return session
+
+
+def post(url, **kwargs):
+    return get_session(url).post(url, **kwargs)
+
+
+def get(url, **kwargs):
+    return get_session(url).get(url, **kwargs)
+
+
+def close_all():
+    """Close every pooled session (e.g. after the pool size setting changes)"""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
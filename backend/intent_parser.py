@@ -0,0 +1,196 @@
+"""
+Deterministic fast path for common edit requests.
+Simple requests (trim, mute, extract audio, scale, gif, speed, rotate) are
+matched against anchored patterns and turned into known-good FFmpeg commands
+without an LLM call. Anything that does not match a pattern in full returns
+None and goes to the LLM as before.
+"""
+import re
+from . import ffmpeg_command, video_analyzer
+from .ffmpeg_runner import parse_ffmpeg_time
+
+# A timestamp: 90, 90s, 1.5 min, 1:30, 00:01:30.5
+TIME = r'(\d+(?::\d{1,2}){0,2}(?:\.\d+)?)\s*(s|sec|secs|seconds?|m|mins?|minutes?)?'
+# A speed factor: 2x, 2, 1.5x, 0.5
+FACTOR = r'(\d+(?:\.\d+)?)\s*x?'
+
+RESOLUTIONS = {'2160p': 2160, '4k': 2160, '1440p': 1440, '1080p': 1080, '720p': 720, '480p': 480, '360p': 360, '240p': 240}
+
+AUDIO_FORMATS = {
+    'mp3': ['-c:a', 'libmp3lame', '-q:a', '2'],
+    'wav': ['-c:a', 'pcm_s16le'],
+    'm4a': ['-c:a', 'aac', '-b:a', '192k'],
+    'aac': ['-c:a', 'aac', '-b:a', '192k'],
+    'flac': ['-c:a', 'flac'],
+    'ogg': ['-c:a', 'libvorbis', '-q:a', '5'],
+}
+
+GIF_MAX_WIDTH = 480
+GIF_FPS = 12
+
+_FILLER = re.compile(r'^(please\s+|can you\s+|could you\s+|just\s+)+|(\s+please)$')
+
+
+def _normalize(text):
+    text = re.sub(r'\s+', ' ', (text or '').strip().lower()).rstrip(' .!')
+    text = _FILLER.sub('', text)
+    # "the video", "this clip", "it" carry no information for these edits
+    return re.sub(r'\b(the|this|my) (video|clip|file)\b|\bit\b', '', text).replace('  ', ' ').strip()
+
+
+def _seconds(value, unit):
+    seconds = parse_ffmpeg_time(value)
+    if seconds is None:
+        return None
+    if unit and unit.startswith('m') and ':' not in value:
+        seconds *= 60
+    return seconds
+
+
+def _fmt(seconds):
+    return f"{seconds:.3f}".rstrip('0').rstrip('.')
+
+
+def _video(analysis):
+    streams = (analysis or {}).get('video_streams') or []
+    return streams[0] if streams else None
+
+
+def _has_audio(analysis):
+    return bool((analysis or {}).get('audio_streams'))
+
+
+def _command(input_filename, args, output_ext, pre_input=None):
+    tokens = ['ffmpeg', '-y'] + (pre_input or []) + ['-i', input_filename] + args + [f'output.{output_ext}']
+    return ffmpeg_command.join(tokens)
+
+
+def _trim(text, input_filename, input_ext, analysis):
+    duration = video_analyzer.get_duration(analysis)
+    match = re.fullmatch(rf'(?:trim|cut|keep|clip)(?: from)? {TIME} (?:to|-|until|and) {TIME}', text)
+    if match:
+        start, end = _seconds(*match.group(1, 2)), _seconds(*match.group(3, 4))
+    else:
+        match = re.fullmatch(rf'(?:trim to |cut to |keep )?(?:the )?first {TIME}', text)
+        if not match:
+            return None
+        start, end = 0, _seconds(*match.group(1, 2))
+    if start is None or end is None or end <= start:
+        return None
+    if duration:
+        if start >= duration:
+            return None
+        end = min(end, duration)
+    pre_input = ['-ss', _fmt(start)] if start else []
+    return (_command(input_filename, ['-t', _fmt(end - start)], input_ext, pre_input),
+            f"trim {_fmt(start)}s to {_fmt(end)}s")
+
+
+def _mute(text, input_filename, input_ext, analysis):
+    if not re.fullmatch(r'mute(?: audio)?|(?:remove|strip|drop|delete) (?:the )?(?:audio|sound)(?: track)?|no (?:audio|sound)|make silent', text):
+        return None
+    return _command(input_filename, ['-c:v', 'copy', '-an'], input_ext), "remove audio"
+
+
+def _extract_audio(text, input_filename, input_ext, analysis):
+    match = re.fullmatch(r'(?:extract|export|save|get|rip) (?:the )?audio(?: track)?(?: (?:as|to|in(?:to)?) (?:an? )?(mp3|wav|m4a|aac|flac|ogg)(?: file)?)?', text)
+    if not match or not _has_audio(analysis):
+        return None
+    fmt = match.group(1) or 'mp3'
+    return _command(input_filename, ['-vn'] + AUDIO_FORMATS[fmt], fmt), f"extract audio as {fmt}"
+
+
+def _scale(text, input_filename, input_ext, analysis):
+    match = re.fullmatch(r'(?:scale|resize|downscale|upscale|convert|make|export|change resolution)(?: to)? (\d{3,4}p|4k|\d{2,4} ?x ?\d{2,4})(?: resolution)?', text)
+    video = _video(analysis)
+    if not match or not video:
+        return None
+    target = match.group(1).replace(' ', '')
+    if 'x' in target and target != '4k':
+        width, height = target.split('x')
+        scale = f"scale={width}:{height}"
+    else:
+        lines = RESOLUTIONS.get(target)
+        if not lines:
+            return None
+        # "720p" is the short side, so portrait videos are scaled by width
+        if video.get('height', 0) > video.get('width', 0):
+            scale = f"scale={lines}:-2"
+        else:
+            scale = f"scale=-2:{lines}"
+    return _command(input_filename, ['-vf', scale, '-c:a', 'copy'], input_ext), f"scale to {target}"
+
+
+def _gif(text, input_filename, input_ext, analysis):
+    match = re.fullmatch(r'(?:convert|turn|make|export|save)?(?: (?:to|into|as))? ?(?:an? )?(?:animated )?gif(?: (?:at|with) (\d+) ?fps)?', text)
+    video = _video(analysis)
+    if not match or not video:
+        return None
+    fps = int(match.group(1)) if match.group(1) else GIF_FPS
+    width = min(GIF_MAX_WIDTH, video.get('width') or GIF_MAX_WIDTH)
+    graph = f"fps={fps},scale={width}:-1:flags=lanczos,split[s0][s1];[s0]palettegen[p];[s1][p]paletteuse"
+    return _command(input_filename, ['-vf', graph, '-loop', '0'], 'gif'), f"convert to gif ({width}px, {fps}fps)"
+
+
+def atempo_chain(factor):
+    """atempo only accepts 0.5-2.0 per instance, so larger changes are chained"""
+    stages = []
+    while factor > 2.0:
+        stages.append('atempo=2.0')
+        factor /= 2.0
+    while factor < 0.5:
+        stages.append('atempo=0.5')
+        factor /= 0.5
+    stages.append(f"atempo={_fmt(factor)}")
+    return ','.join(stages)
+
+
+def _speed(text, input_filename, input_ext, analysis):
+    factor = None
+    match = re.fullmatch(rf'(?:speed up|make faster|fast forward|accelerate)(?: by)? {FACTOR}|{FACTOR} (?:speed|faster)|(?:change |set )?speed(?: to)? {FACTOR}', text)
+    if match:
+        factor = float(next(g for g in match.groups() if g))
+    else:
+        match = re.fullmatch(rf'(?:slow down|make slower|slow motion|slow-?mo)(?: by)? {FACTOR}|{FACTOR} slower', text)
+        if match:
+            value = float(next(g for g in match.groups() if g))
+            factor = 1 / value if value > 1 else value
+        elif text in ('half speed', 'slow motion', 'slow down'):
+            factor = 0.5
+        elif text in ('double speed', 'speed up'):
+            factor = 2.0
+    if not factor or factor == 1 or not 0.1 <= factor <= 10 or not _video(analysis):
+        return None
+    args = ['-vf', f"setpts=PTS/{_fmt(factor)}"]
+    args += ['-af', atempo_chain(factor)] if _has_audio(analysis) else ['-an']
+    return _command(input_filename, args, input_ext), f"change speed to {_fmt(factor)}x"
+
+
+def _rotate(text, input_filename, input_ext, analysis):
+    match = re.fullmatch(r'rotate(?: by)?(?: (90|180|270)(?: ?(?:degrees|deg|°))?)?(?: (clockwise|cw|counter ?clockwise|anti ?clockwise|ccw|left|right))?', text)
+    if not match or not _video(analysis) or not (match.group(1) or match.group(2)):
+        return None
+    angle = int(match.group(1) or 90)
+    counter = (match.group(2) or 'clockwise') in ('counterclockwise', 'counter clockwise', 'anticlockwise', 'anti clockwise', 'ccw', 'left')
+    transpose = {90: 'transpose=1', 180: 'transpose=1,transpose=1', 270: 'transpose=2'}[360 - angle if counter else angle]
+    return (_command(input_filename, ['-vf', transpose, '-c:a', 'copy'], input_ext),
+            f"rotate {angle}° {'counterclockwise' if counter else 'clockwise'}")
+
+
+PARSERS = (_trim, _mute, _extract_audio, _scale, _gif, _speed, _rotate)
+
+
+def parse_intent(user_text, input_filename, input_ext, analysis):
+    """
+    Return (ffmpeg_command, description) for a request the fast path fully
+    understands, or None to fall through to the LLM.
+    """
+    text = _normalize(user_text)
+    for parser in PARSERS:
+        try:
+            result = parser(text, input_filename, input_ext, analysis)
+        except (ValueError, ZeroDivisionError):
+            result = None
+        if result:
+            return result
+    return None
@@ -0,0 +1,118 @@
+"""
+Central scheduler for background work (edits, retries, merges).
+Jobs run on a bounded pool of worker threads sized from the CPU count. A job
+that starts alone gets every core; one that starts next to others gets an equal
+share as its FFmpeg thread budget, so concurrent encodes do not oversubscribe
+the machine. Job state changes and failures are exposed as Qt
+signals; finished jobs are forgotten, so state() returns None for them.
+"""
+import os
+import queue
+import threading
+import itertools
+import traceback
+from PyQt6.QtCore import QObject, pyqtSignal
+from . import ffmpeg_runner, config
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+def thread_budget(cpu_count, running):
+    """FFmpeg threads for a job starting while `running` jobs (itself included) run; None for no cap"""
+    if running <= 1:
+        return None
+    return max(1, cpu_count // running)
+
+
+def default_worker_count(cpu_count=None):
+    """One concurrent job per 4 cores, between 1 and 4 jobs"""
+    cpu_count = cpu_count or os.cpu_count() or 2
+    return max(1, min(4, cpu_count // 4))
+
+
+class JobScheduler(QObject):
+    job_state_changed = pyqtSignal(str, str)  # (job_id, state)
+    job_failed = pyqtSignal(str, str)  # (job_id, traceback), emitted before the FAILED state
+
+    def __init__(self, max_workers=None, parent=None):
+        super().__init__(parent)
+        self.cpu_count = os.cpu_count() or 2
+        self.max_workers = max_workers or default_worker_count(self.cpu_count)
+        self._queue = queue.Queue()
+        self._states = {}  # job_id -> state of queued and running jobs
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        # Daemon workers, like the threads they replace, so quitting never waits on an encode
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._worker, name=f"ffmigo-job-{i}", daemon=True)
+            worker.start()
+        print(f"[INFO] Job scheduler: {self.max_workers} workers for {self.cpu_count} cores")
+
+    def submit(self, fn, *args, name=None, **kwargs):
+        """Queue fn(*args, **kwargs) and return its job id"""
+        job_id = f"{name or getattr(fn, '__name__', 'job')}-{next(self._ids)}"
+        self._set_state(job_id, QUEUED)
+        self._queue.put((job_id, fn, args, kwargs))
+        return job_id
+
+    def cancel(self, job_id):
+        """Drop a job that has not started yet. Returns True if it was still queued."""
+        with self._lock:
+            if self._states.get(job_id) != QUEUED:
+                return False
+            self._states[job_id] = CANCELLED
+        self.job_state_changed.emit(job_id, CANCELLED)
+        return True
+
+    def state(self, job_id):
+        with self._lock:
+            return self._states.get(job_id)
+
+    def running_count(self):
+        with self._lock:
+            return sum(1 for s in self._states.values() if s == RUNNING)
+
+    def _set_state(self, job_id, state):
+        with self._lock:
+            if state in (DONE, FAILED, CANCELLED):
+                self._states.pop(job_id, None)
+            else:
+                self._states[job_id] = state
+        self.job_state_changed.emit(job_id, state)
+
+    def _worker(self):
+        while True:
+            job_id, fn, args, kwargs = self._queue.get()
+            with self._lock:
+                if self._states.get(job_id) == CANCELLED:
+                    # Cancelled while queued; it is done with now
+                    del self._states[job_id]
+                    continue
+            self._set_state(job_id, RUNNING)
+            ffmpeg_runner.set_thread_budget(thread_budget(self.cpu_count, self.running_count()))
+            try:
+                fn(*args, **kwargs)
+                self._set_state(job_id, DONE)
+            except Exception as e:
+                print(f"[ERROR] Job {job_id} failed: {e}")
+                self.job_failed.emit(job_id, traceback.format_exc())
+                self._set_state(job_id, FAILED)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the process-wide scheduler, creating it on first use"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            # Optional override of the CPU-derived pool size
+            max_workers = config.get_config().get('max_concurrent_jobs')
+            _scheduler = JobScheduler(max_workers=max_workers)
+        return _scheduler
@@ -0,0 +1,136 @@
+"""
+On-disk cache of LLM-generated FFmpeg commands.
+Commands are keyed on everything that goes into the prompt (provider, model,
+normalized request, input extension, video summary and attachments) and only
+stored once they have run successfully. Entries expire after a TTL, the least
+recently used are evicted beyond a size cap, and a cached command that fails is
+dropped.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from . import config
+
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_TTL_DAYS = 7
+# Stand-in for the input file name, which changes after every edit (input_1.mp4, input_2.mp4...)
+INPUT_PLACEHOLDER = '{input}'
+
+_lock = threading.Lock()
+_entries = None
+_stats = {'hits': 0, 'misses': 0}
+
+
+def get_cache_path():
+    return os.path.expanduser('~/.video-editor-app/llm_cache.json')
+
+
+def _ttl_seconds():
+    return float(config.get_config().get('llm_cache_ttl_days', DEFAULT_TTL_DAYS)) * 86400
+
+
+def _load():
+    global _entries
+    if _entries is None:
+        _entries = {}
+        try:
+            if os.path.exists(get_cache_path()):
+                with open(get_cache_path(), 'r') as f:
+                    _entries = json.load(f)
+        except Exception as e:
+            print(f"[WARNING] Failed to load LLM cache: {e}")
+            _entries = {}
+    return _entries
+
+
+def _save():
+    try:
+        os.makedirs(os.path.dirname(get_cache_path()), exist_ok=True)
+        with open(get_cache_path(), 'w') as f:
+            json.dump(_entries, f, indent=2)
+    except Exception as e:
+        print(f"[WARNING] Failed to save LLM cache: {e}")
+
+
+def normalize_query(query):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    query = re.sub(r'\s+', ' ', (query or '').strip().lower())
+    return query.rstrip(' .!?')
+
+
+def make_key(provider, model, user_query, input_ext, input_video_info=None, attachments=None):
+    """Cache key for a command request, or None if the cache is disabled"""
+    if not config.get_config().get('llm_cache', True):
+        return None
+    attachment_descriptors = sorted(f"{a.get('type', 'file')}:{a.get('rel_path', '')}" for a in attachments or [])
+    material = json.dumps([provider, model, normalize_query(user_query), (input_ext or '').lower(),
+                           input_video_info or '', attachment_descriptors])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def lookup(key, input_filename):
+    """Cached command for key with the current input file name filled in, or None"""
+    if not key:
+        return None
+    with _lock:
+        entries = _load()
+        entry = entries.get(key)
+        if entry and time.time() - entry['created'] > _ttl_seconds():
+            del entries[key]
+            _save()
+            entry = None
+        if not entry:
+            _stats['misses'] += 1
+            return None
+        entry['last_used'] = time.time()
+        entry['hits'] = entry.get('hits', 0) + 1
+        _save()
+        _stats['hits'] += 1
+        print(f"[INFO] LLM cache hit (hits={_stats['hits']}, misses={_stats['misses']})")
+        return entry['command'].replace(INPUT_PLACEHOLDER, input_filename)
+
+
+def store(key, command, input_filename):
+    """Remember a command that ran successfully"""
+    if not key or not command:
+        return
+    with _lock:
+        entries = _load()
+        now = time.time()
+        templated = command.replace(input_filename, INPUT_PLACEHOLDER) if input_filename else command
+        previous = entries.get(key)
+        entries[key] = {
+            'command': templated,
+            'created': previous['created'] if previous and previous['command'] == templated else now,
+            'last_used': now,
+            'hits': previous.get('hits', 0) if previous else 0,
+        }
+        _evict(entries)
+        _save()
+
+
+def evict(key):
+    """Drop a cached command, e.g. after it failed on a new input"""
+    if not key:
+        return
+    with _lock:
+        entries = _load()
+        if entries.pop(key, None):
+            print("[INFO] Evicted failing command from LLM cache")
+            _save()
+
+
+def _evict(entries):
+    max_entries = int(config.get_config().get('llm_cache_max_entries', DEFAULT_MAX_ENTRIES))
+    expired = time.time() - _ttl_seconds()
+    for key in [k for k, e in entries.items() if e['created'] < expired]:
+        del entries[key]
+    for key, _ in sorted(entries.items(), key=lambda item: item[1]['last_used'])[:max(0, len(entries) - max_entries)]:
+        del entries[key]
+
+
+def get_stats():
+    return dict(_stats)
@@ -1,116 +1,327 @@
-import requests
 import re
+import json
+import time
+import queue
+import threading
+from . import http_client, ffmpeg_runner, stderr_analyzer, plan_compiler, command_history, metrics, llm_stats, config
 
+# Seconds to wait for the primary provider before also asking the hedge provider
+DEFAULT_HEDGE_DELAY = 8
+# How long Ollama keeps the model loaded after each request
+DEFAULT_OLLAMA_KEEP_ALIVE = '30m'
+# Seconds an /api/tags listing is reused
+MODEL_LIST_TTL = 30
+# A load_duration above this counts as a cold start
+COLD_START_SECONDS = 1.0
 
-def get_ffmpeg_command(user_query, input_filename, input_ext, endpoint, model, provider='Ollama', api_key=None, attachments=None, input_video_info=None, attachment_video_info=None):
-    attachments = attachments or []
-    # Build attachments section for the prompt (relative paths usable by ffmpeg working dir)
-    attachments_section = "\n".join([f"- {att.get('type','file')}: {att.get('rel_path','')} (name: {att.get('name','')})" for att in attachments])
-    attachments_block = f"\n\n**Attached Files (relative paths):**\n{attachments_section}\n" if attachments_section else "\n"
-    
-    # Build video information section
-    video_info_block = ""
-    if input_video_info or attachment_video_info:
-        video_info_block = "\n\n**Video Technical Information:**\n"
-        if input_video_info:
-            video_info_block += f"Primary input '{input_filename}': {input_video_info}\n"
-        if attachment_video_info:
-            for rel_path, info in attachment_video_info.items():
-                video_info_block += f"Attached '{rel_path}': {info}\n"
-        video_info_block += "Use this information to ensure compatible parameters when combining videos (matching resolution, frame rate, sample rate).\n"
+# Upper bound on a command's length in tokens; caps generation when output is constrained
+MAX_COMMAND_TOKENS = 300
+# Ollama structured output: a JSON object holding the command
+COMMAND_SCHEMA = {
+    "type": "object",
+    "properties": {"command": {"type": "string"}},
+    "required": ["command"]
+}
+# llama.cpp GBNF: one line starting with "ffmpeg", no markdown
+COMMAND_GRAMMAR = 'root ::= "ffmpeg " [^\\n`]+'
+JSON_OUTPUT_HINT = 'Respond with JSON only: {"command": "<the FFmpeg command>"}'
 
-    prompt = f"""
-You are an expert in FFmpeg. Your task is to convert a user's natural language instruction into a single, executable FFmpeg command.
+_model_lists = {}  # tags_url -> (fetched_at, models)
+
+
+# Static instructions go first and never change between requests; everything
+# request-specific follows them. They are far below the 1024-token minimum for
+# Claude and OpenAI prompt caching, so only a local server reusing its KV cache
+# gains from the order.
+GENERATE_INSTRUCTIONS = """You are an expert in FFmpeg. Your task is to convert a user's natural language instruction into a single, executable FFmpeg command.
 
 **Constraints:**
-1. The input file will always be named '{input_filename}' (the extension will vary).
-2. The output file must always be named 'output.{input_ext}'. You will determine the correct output extension based on the user's request (e.g., 'output.mp4', 'output.gif').
+1. Use the input file name given under **Input File** exactly (the extension will vary).
+2. The output file must be named as given under **Output File**. You will determine the correct output extension based on the user's request (e.g., 'output.mp4', 'output.gif').
 3. Do NOT generate any command that could delete or overwrite files outside of the designated output file (e.g., no 'rm', 'mv' commands).
 4. Do NOT add any explanations, apologies, or extra text. Your response must be ONLY the FFmpeg command.
 5. The command must not require user interaction (`-y` flag should be used to overwrite the output file automatically).
 6. Generate command for only what is asked to you, do not add any additional parameters which are unnecessary neither requested nor necessary.
 
-**User's Request:** "{user_query}"
-{attachments_block}{video_info_block}
 If the user's request references an attached file (e.g., watermark image, secondary video, subtitle or text file or anything else which requires external file input), use the provided relative path(s) exactly as given.
+When video technical information is given, use it to ensure compatible parameters when combining videos (matching resolution, frame rate, sample rate)."""
 
-**FFmpeg Command:**
-"""
-    return _call_llm(prompt, endpoint, model, provider, api_key)
+RETRY_INSTRUCTIONS = """You are an expert in FFmpeg. The previous command failed with an error. Your task is to fix the command and generate a corrected version.
 
-def retry_ffmpeg_command(original_command, error_message, user_query, input_filename, input_ext, endpoint, model, provider='Ollama', api_key=None, attachments=None, input_video_info=None, attachment_video_info=None):
-    """Retry a failed FFmpeg command by asking the LLM to fix it based on the error."""
-    attachments = attachments or []
-    attachments_section = "\n".join([f"- {att.get('type','file')}: {att.get('rel_path','')} (name: {att.get('name','')})" for att in attachments])
-    attachments_block = f"\n\n**Attached Files (relative paths):**\n{attachments_section}\n" if attachments_section else "\n"
-    
-    # Build video information section
-    video_info_block = ""
+**Constraints:**
+1. Use the input file name given under **Input File** exactly (the extension will vary).
+2. The output file must be named as given under **Output File**.
+3. Do NOT generate any command that could delete or overwrite files outside of the designated output file.
+4. Do NOT add any explanations, apologies, or extra text. Your response must be ONLY the corrected FFmpeg command.
+5. The command must not require user interaction (`-y` flag should be used to overwrite the output file automatically).
+
+IMPORTANT: When video technical information is given, use it to fix parameter mismatches. Scale videos to match primary input resolution/fps, resample audio to match sample rates."""
+
+PLAN_INSTRUCTIONS = """You are an expert video editor. Describe the edit the user asks for as a JSON edit plan; a separate tool turns the plan into an FFmpeg command.
+
+**Plan format** (include only the keys the request needs):
+- "trim": {"start": "<seconds or HH:MM:SS>", "end": "<seconds or HH:MM:SS>"}
+- "crop": {"width": <px>, "height": <px>, "x": <px>, "y": <px>}
+- "scale": {"width": <px>, "height": <px>} (give one of them to keep the aspect ratio)
+- "speed": <factor, e.g. 2 for twice as fast, 0.5 for half speed>
+- "overlay": {"file": "<attached file path>", "position": "top-left|top-right|bottom-left|bottom-right|center", "width": <px>, "opacity": <0-1>, "start": "<seconds>", "end": "<seconds>"}
+- "audio": {"mute": true} or {"gain_db": <decibels>}
+- "subtitles": {"file": "<attached subtitle file path>"}
+- "output": {"format": "<mp4|mov|mkv|webm|avi|gif|mp3|wav|m4a|aac|flac|ogg>", "quality": "high|medium|low"}
+
+**Constraints:**
+1. Respond with the JSON object only: no explanations, no code fences.
+2. Use attached files by the relative path given, exactly.
+3. Leave "output" out unless the user asks for another format or quality.
+4. If the request cannot be expressed with these keys, respond with {"unsupported": true}."""
+
+
+def _context_block(input_filename, input_ext, attachments, input_video_info, attachment_video_info):
+    """The request-specific part shared by both prompts: file names, attachments and video info"""
+    block = f"**Input File:** '{input_filename}'\n**Output File:** 'output.{input_ext}'\n"
+    # Attachments as relative paths usable from the ffmpeg working dir
+    attachments_section = "\n".join([f"- {att.get('type','file')}: {att.get('rel_path','')} (name: {att.get('name','')})" for att in attachments or []])
+    if attachments_section:
+        block += f"\n**Attached Files (relative paths):**\n{attachments_section}\n"
     if input_video_info or attachment_video_info:
-        video_info_block = "\n\n**Video Technical Information:**\n"
+        block += "\n**Video Technical Information:**\n"
         if input_video_info:
-            video_info_block += f"Primary input '{input_filename}': {input_video_info}\n"
+            block += f"Primary input '{input_filename}': {input_video_info}\n"
         if attachment_video_info:
             for rel_path, info in attachment_video_info.items():
-                video_info_block += f"Attached '{rel_path}': {info}\n"
-        video_info_block += "IMPORTANT: Use this technical information to fix parameter mismatches. Scale videos to match primary input resolution/fps, resample audio to match sample rates.\n"
-    
-    # Truncate error message if too long (keep it under 1000 chars to save tokens)
-    truncated_error = error_message[:1000] + "..." if len(error_message) > 1000 else error_message
-    
-    prompt = f"""
-You are an expert in FFmpeg. The previous command failed with an error. Your task is to fix the command and generate a corrected version.
+                block += f"Attached '{rel_path}': {info}\n"
+    return block
 
-**Constraints:**
-1. The input file will always be named '{input_filename}' (the extension will vary).
-2. The output file must always be named 'output.{input_ext}'.
-3. Do NOT generate any command that could delete or overwrite files outside of the designated output file.
-4. Do NOT add any explanations, apologies, or extra text. Your response must be ONLY the corrected FFmpeg command.
-5. The command must not require user interaction (`-y` flag should be used to overwrite the output file automatically).
 
+def _examples_block(user_query, input_filename, attachments):
+    """Similar past requests and the commands that worked for them, or an empty string"""
+    try:
+        examples = command_history.find_examples(user_query, input_filename, allow_assets=bool(attachments))
+    except Exception as e:
+        print(f"[WARNING] Failed to look up past commands: {e}")
+        return ""
+    if not examples:
+        return ""
+    print(f"[INFO] Adding {len(examples)} past command(s) as examples")
+    lines = [f"Request: \"{query}\"\nCommand: {command}" for query, command in examples]
+    return "\n**Examples of similar requests that worked before:**\n" + "\n\n".join(lines) + "\n"
+
+
+def get_ffmpeg_command(user_query, input_filename, input_ext, endpoint, model, provider='Ollama', api_key=None, attachments=None, input_video_info=None, attachment_video_info=None, input_analysis=None):
+    context = _context_block(input_filename, input_ext, attachments, input_video_info, attachment_video_info)
+    if config.get_config().get('llm_output_mode', 'command') == 'plan':
+        prompt = f"""{context}
+**User's Request:** "{user_query}"
+
+**Edit Plan (JSON):**
+"""
+        command = _call_llm(PLAN_INSTRUCTIONS, prompt, endpoint, model, provider, api_key,
+                            plan_context=(input_filename, input_analysis))
+        if command:
+            return command
+        print("[INFO] No usable edit plan, asking for a command instead")
+    examples = _examples_block(user_query, input_filename, attachments)
+    prompt = f"""{context}{examples}
+**User's Request:** "{user_query}"
+
+**FFmpeg Command:**
+"""
+    return _call_llm(GENERATE_INSTRUCTIONS, prompt, endpoint, model, provider, api_key)
+
+def retry_ffmpeg_command(original_command, error_message, user_query, input_filename, input_ext, endpoint, model, provider='Ollama', api_key=None, attachments=None, input_video_info=None, attachment_video_info=None):
+    """Retry a failed FFmpeg command by asking the LLM to fix it based on the error."""
+    context = _context_block(input_filename, input_ext, attachments, input_video_info, attachment_video_info)
+    # Keep only the error lines, failing filters and rejected options (the banner and stream dump waste tokens)
+    truncated_error = stderr_analyzer.distill_stderr(error_message)
+
+    prompt = f"""{context}
 **Original User Request:** "{user_query}"
-{attachments_block}{video_info_block}
+
 **Failed Command:** {original_command}
 
 **Error Message:** {truncated_error}
 
 **Corrected FFmpeg Command:**
 """
-    return _call_llm(prompt, endpoint, model, provider, api_key)
+    return _call_llm(RETRY_INSTRUCTIONS, prompt, endpoint, model, provider, api_key)
+
+def _call_llm(system, prompt, endpoint, model, provider, api_key, plan_context=None):
+    """
+    Internal function to make the actual LLM API call. With plan_context
+    (input_filename, input_analysis) the reply is an edit plan, which is
+    compiled into the returned command.
+    """
+    settings = config.get_config()
+    hedge_provider = settings.get('hedge_provider')
+    if hedge_provider and settings.get('hedge_model'):
+        primary = (endpoint, model, provider, api_key)
+        secondary = (settings.get('hedge_endpoint'), settings.get('hedge_model'), hedge_provider, settings.get('hedge_api_key'))
+        return _hedged_call(system, prompt, primary, secondary, float(settings.get('hedge_delay', DEFAULT_HEDGE_DELAY)), plan_context)
+    return _call_provider(system, prompt, endpoint, model, provider, api_key, plan_context=plan_context)
+
+
+def _hedged_call(system, prompt, primary, secondary, delay, plan_context=None):
+    """
+    Ask the primary provider and, if it has not produced a valid command within
+    `delay` seconds (or failed sooner), the secondary too. The first command that
+    passes validation wins and the other request is cancelled.
+    """
+    results = queue.Queue()
+    cancel_event = threading.Event()
+
+    def attempt(target):
+        try:
+            command = _call_provider(system, prompt, *target, cancel_event=cancel_event, plan_context=plan_context)
+        except Exception as e:
+            print(f"[ERROR] LLM request to {target[2]} failed: {e}")
+            command = None
+        results.put((target, command))
+
+    def launch(target):
+        threading.Thread(target=attempt, args=(target,), daemon=True).start()
+
+    launch(primary)
+    pending, hedged = 1, False
+    hedge_at = time.monotonic() + delay
+    while pending:
+        try:
+            target, command = results.get(timeout=None if hedged else max(0, hedge_at - time.monotonic()))
+        except queue.Empty:
+            print(f"[INFO] No answer from {primary[2]}/{primary[1]} after {delay:.1f}s, hedging with {secondary[2]}/{secondary[1]}")
+            launch(secondary)
+            pending, hedged = pending + 1, True
+            continue
+        pending -= 1
+        if command and ffmpeg_runner.validate_ffmpeg_command(command)[0]:
+            cancel_event.set()
+            print(f"[INFO] Using command from {target[2]}/{target[1]}")
+            return command
+        if not hedged:
+            # The primary failed before the budget ran out; don't wait any longer
+            launch(secondary)
+            pending, hedged = pending + 1, True
+    return None
+
+
+def _call_provider(system, prompt, endpoint, model, provider, api_key, cancel_event=None, plan_context=None):
+    """Request a command from one provider and record the call in llm_stats"""
+    stream = config.get_config().get('llm_streaming', True)
+    request = _build_request(system, prompt, endpoint, model, provider, api_key, stream, plan=plan_context is not None)
+    if request is None:
+        return None
+    url, payload, headers, stream = request
+    stats = {'provider': provider, 'model': model, 'prompt_chars': len(system) + len(prompt), 'streamed': stream,
+             'status': None, 'ttfb': None, 'ttft': None, 'prompt_tokens': None, 'completion_tokens': None,
+             'cached_tokens': None, 'completion_chars': 0}
+    command = None
+    started = time.monotonic()
+    try:
+        if stream:
+            command = _stream_command(provider, model, url, payload, headers, started, cancel_event, stats, plan_context)
+            return command
+        resp = http_client.post(url, json=payload, headers=headers, timeout=200)
+        stats['status'] = resp.status_code
+        stats['ttfb'] = resp.elapsed.total_seconds()
+        resp.raise_for_status()
+        if cancel_event is not None and cancel_event.is_set():
+            stats['cancelled'] = True
+            return None
+        data = resp.json()
+        _update_usage(provider, data, stats)
+        raw = _parse_response(provider, data)
+        stats['completion_chars'] = len(raw or '')
+        print(f"[INFO] LLM response after {time.monotonic() - started:.2f}s ({provider}/{model})")
+        if provider == 'Ollama':
+            _record_ollama_load(model, data, 'request')
+        command = _reply_command(raw, plan_context) if raw else None
+        return command
+    except Exception as e:
+        stats['error'] = str(e)
+        print(f"[ERROR] LLM request failed: {e}")
+        return None
+    finally:
+        stats['latency'] = time.monotonic() - started
+        if stats['cached_tokens']:
+            print(f"[INFO] {stats['cached_tokens']} prompt tokens served from the {provider} cache")
+        stats['validated'] = bool(command) and ffmpeg_runner.validate_ffmpeg_command(command)[0]
+        llm_stats.record(stats)
+
 
-def _call_llm(prompt, endpoint, model, provider, api_key):
-    """Internal function to make the actual LLM API call."""
+def _build_request(system, prompt, endpoint, model, provider, api_key, stream=False, plan=False):
+    """
+    Return (url, payload, headers, stream) for the provider, or None if it is
+    unknown. The static system text is sent first and the request-specific
+    prompt after it.
+    """
     headers = {}
     payload = None
     # Provider-specific logic
     if provider == 'Ollama':
         payload = {
             "model": model,
-            "prompt": prompt,
-            "stream": False
+            "stream": stream,
+            "keep_alive": _ollama_keep_alive()
         }
+        constrained = config.get_config().get('llm_constrained_output', False)
+        if _is_ollama_generate(endpoint):
+            payload["system"] = system
+            # The unchanged system prefix lets Ollama reuse its KV cache while the model stays loaded
+            payload["prompt"] = prompt
+            if constrained and plan:
+                payload["format"] = plan_compiler.PLAN_SCHEMA
+                payload["options"] = {"num_predict": MAX_COMMAND_TOKENS}
+                payload["stream"] = stream = False
+            elif constrained:
+                # Decoding can only produce {"command": "..."}; allow for the JSON wrapper
+                payload["prompt"] += f"\n{JSON_OUTPUT_HINT}\n"
+                payload["format"] = COMMAND_SCHEMA
+                payload["options"] = {"num_predict": MAX_COMMAND_TOKENS + 16}
+                payload["stream"] = stream = False
+        else:
+            # Other completion servers behind the Ollama setting only take a prompt
+            payload["prompt"] = f"{system}\n\n{prompt}"
+            if constrained and _is_llama_cpp_completion(endpoint):
+                if plan:
+                    payload["json_schema"] = plan_compiler.PLAN_SCHEMA
+                else:
+                    # The grammar allows exactly one ffmpeg line, so a newline can only mean the end
+                    payload["grammar"] = COMMAND_GRAMMAR
+                    payload["stop"] = ["\n"]
+                payload["n_predict"] = MAX_COMMAND_TOKENS
+                payload["stream"] = stream = False
         url = endpoint
     elif provider == 'OpenAI':
         headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
         payload = {
             "model": model,
             "messages": [
-                {"role": "system", "content": "You are an expert in FFmpeg. Your task is to convert a user's natural language instruction into a single, executable FFmpeg command. Only output the command, no explanation."},
+                {"role": "system", "content": system},
                 {"role": "user", "content": prompt}
             ],
             "temperature": 0.0,
-            "stream": False
+            "stream": stream
         }
+        if stream:
+            # Token counts arrive in a final chunk (only read if the stream is not closed early)
+            payload["stream_options"] = {"include_usage": True}
         url = endpoint
     elif provider == 'Gemini':
-        # Gemini uses API key in URL param
-        import urllib.parse
         url = endpoint
+        if stream:
+            # Streaming is a separate method on the same model resource
+            if ':generateContent' in url:
+                url = url.replace(':generateContent', ':streamGenerateContent')
+            if ':streamGenerateContent' in url:
+                url += ('&' if '?' in url else '?') + 'alt=sse'
+            else:
+                stream = False
+        # Gemini uses API key in URL param
         if "?" in url:
             url += f"&key={api_key}"
         else:
             url += f"?key={api_key}"
         payload = {
+            "systemInstruction": {"parts": [{"text": system}]},
             "contents": [
                 {"role": "user", "parts": [{"text": prompt}]}
             ]
@@ -125,71 +336,264 @@ def _call_llm(prompt, endpoint, model, provider, api_key):
         payload = {
             "model": model,
             "max_tokens": 512,
+            "system": system,
             "messages": [
                 {"role": "user", "content": prompt}
             ]
         }
+        if stream:
+            payload["stream"] = True
         url = endpoint
     else:
         return None
-    try:
-        resp = requests.post(url, json=payload, headers=headers, timeout=200)
-        resp.raise_for_status()
-        data = resp.json()
-        # Provider-specific response parsing
+    return url, payload, headers, stream
+
+
+def _parse_response(provider, data):
+    """Text of a complete (non-streamed) provider response, or None"""
+    if provider == 'Ollama':
+        if 'response' in data:
+            return data['response'].strip()
+        elif 'content' in data:
+            # llama.cpp server /completion
+            return data['content'].strip()
+        elif 'choices' in data and data['choices']:
+            return data['choices'][0]['text'].strip()
+    elif provider == 'OpenAI':
+        # OpenAI: choices[0].message.content
+        if 'choices' in data and data['choices']:
+            return data['choices'][0]['message']['content'].strip()
+    elif provider == 'Gemini':
+        # Gemini: candidates[0].content.parts[0].text
+        candidates = data.get('candidates', [])
+        if candidates and 'content' in candidates[0]:
+            parts = candidates[0]['content'].get('parts', [])
+            if parts and 'text' in parts[0]:
+                return parts[0]['text'].strip()
+    elif provider == 'Claude':
+        # Claude Messages API: content is an array of objects with type and text
+        if 'content' in data and isinstance(data['content'], list) and data['content']:
+            text_parts = [item['text'] for item in data['content'] if item.get('type') == 'text' and 'text' in item]
+            if text_parts:
+                return ''.join(text_parts).strip()
+    return None
+
+
+def _update_usage(provider, data, stats):
+    """Copy the token counts a response or stream event reports into stats"""
+    if stats is None or not isinstance(data, dict):
+        return
+    prompt_tokens = completion_tokens = cached_tokens = None
+    if provider == 'Ollama':
+        prompt_tokens, completion_tokens = data.get('prompt_eval_count'), data.get('eval_count')
+    elif provider == 'Gemini':
+        usage = data.get('usageMetadata') or {}
+        prompt_tokens, completion_tokens = usage.get('promptTokenCount'), usage.get('candidatesTokenCount')
+        cached_tokens = usage.get('cachedContentTokenCount')
+    elif provider == 'Claude':
+        # Streams report input tokens in message_start and output tokens in message_delta
+        usage = data.get('usage') or (data.get('message') or {}).get('usage') or {}
+        prompt_tokens, completion_tokens = usage.get('input_tokens'), usage.get('output_tokens')
+        cached_tokens = usage.get('cache_read_input_tokens')
+        if prompt_tokens is not None:
+            # input_tokens leaves out the cached part of the prompt
+            prompt_tokens += (cached_tokens or 0) + (usage.get('cache_creation_input_tokens') or 0)
+    if provider in ('OpenAI', 'Ollama') and data.get('usage'):
+        # OpenAI and OpenAI-compatible servers
+        prompt_tokens = data['usage'].get('prompt_tokens', prompt_tokens)
+        completion_tokens = data['usage'].get('completion_tokens', completion_tokens)
+        cached_tokens = (data['usage'].get('prompt_tokens_details') or {}).get('cached_tokens')
+    if prompt_tokens is not None:
+        stats['prompt_tokens'] = prompt_tokens
+    if completion_tokens is not None:
+        stats['completion_tokens'] = completion_tokens
+    if cached_tokens is not None:
+        stats['cached_tokens'] = cached_tokens
+
+
+def _stream_deltas(provider, resp, stats=None):
+    """Yield text fragments from a streaming response as they arrive"""
+    # Ollama's application/x-ndjson names no charset, and without one iter_lines yields bytes
+    resp.encoding = 'utf-8'
+    for line in resp.iter_lines(decode_unicode=True):
+        if not line:
+            continue
         if provider == 'Ollama':
+            # Ollama sends newline-delimited JSON; llama.cpp /completion and OpenAI-compatible
+            # /v1/completions send the same kind of objects as server-sent events
+            if line.startswith('data:'):
+                line = line[5:].strip()
+                if line == '[DONE]':
+                    return
+            elif not line.startswith('{'):
+                # SSE comments and event names
+                continue
+            data = json.loads(line)
+            _update_usage(provider, data, stats)
             if 'response' in data:
-                raw = data['response'].strip()
-            elif 'choices' in data and data['choices']:
-                raw = data['choices'][0]['text'].strip()
-            else:
-                return None
-        elif provider == 'OpenAI':
-            # OpenAI: choices[0].message.content
-            if 'choices' in data and data['choices']:
-                raw = data['choices'][0]['message']['content'].strip()
-            else:
-                return None
+                yield data['response']
+            elif 'message' in data:
+                yield data['message'].get('content', '')
+            elif 'content' in data:
+                yield data['content'] or ''
+            elif data.get('choices'):
+                yield data['choices'][0].get('text') or ''
+            if data.get('done') or data.get('stop') is True:
+                return
+            continue
+        # OpenAI, Gemini and Claude use server-sent events
+        if not line.startswith('data:'):
+            continue
+        body = line[5:].strip()
+        if body == '[DONE]':
+            return
+        data = json.loads(body)
+        _update_usage(provider, data, stats)
+        if provider == 'OpenAI':
+            if data.get('choices'):
+                yield data['choices'][0].get('delta', {}).get('content') or ''
         elif provider == 'Gemini':
-            # Gemini: candidates[0].content.parts[0].text
-            candidates = data.get('candidates', [])
-            if candidates and 'content' in candidates[0]:
-                parts = candidates[0]['content'].get('parts', [])
-                if parts and 'text' in parts[0]:
-                    raw = parts[0]['text'].strip()
-                else:
-                    return None
-            else:
-                return None
+            for candidate in data.get('candidates', [])[:1]:
+                for part in candidate.get('content', {}).get('parts', []):
+                    # Skip thought summaries of thinking models
+                    if 'text' in part and not part.get('thought'):
+                        yield part['text']
         elif provider == 'Claude':
-            # Claude Messages API: content is an array of objects with type and text
-            if 'content' in data and isinstance(data['content'], list) and data['content']:
-                # Extract text from content array
-                text_parts = []
-                for item in data['content']:
-                    if item.get('type') == 'text' and 'text' in item:
-                        text_parts.append(item['text'])
-                if text_parts:
-                    raw = ''.join(text_parts).strip()
-                else:
-                    return None
-            else:
+            if data.get('type') == 'content_block_delta':
+                yield data.get('delta', {}).get('text', '')
+            elif data.get('type') == 'message_stop':
+                return
+
+
+def _stream_command(provider, model, url, payload, headers, started, cancel_event=None, stats=None, plan_context=None):
+    """Stream the completion and stop reading as soon as a complete command line is available"""
+    stats = stats if stats is not None else {}
+    text = ''
+    first_token = None
+    resp = http_client.post(url, json=payload, headers=headers, timeout=(10, 200), stream=True)
+    stats['status'] = resp.status_code
+    stats['ttfb'] = resp.elapsed.total_seconds()
+    try:
+        resp.raise_for_status()
+        for delta in _stream_deltas(provider, resp, stats):
+            if cancel_event is not None and cancel_event.is_set():
+                print(f"[INFO] Cancelled LLM request to {provider}/{model} (another provider answered first)")
+                stats['cancelled'] = True
                 return None
-        else:
-            return None
-        # Remove <think>...</think> and similar tags
-        raw = re.sub(r'<think>[\s\S]*?</think>', '', raw, flags=re.IGNORECASE)
-        # Find the first line that starts with ffmpeg
-        for line in raw.splitlines():
-            if line.strip().startswith('ffmpeg'):
-                return line.strip()
-        # Fallback: try to extract ffmpeg command from anywhere
-        match = re.search(r'(ffmpeg[^\n]*)', raw)
-        if match:
-            return match.group(1).strip()
+            if not delta:
+                continue
+            if first_token is None:
+                first_token = time.monotonic() - started
+                stats['ttft'] = first_token
+                print(f"[INFO] LLM first token after {first_token:.2f}s ({provider}/{model})")
+            text += delta
+            stats['completion_chars'] = len(text)
+            # A plan is only usable once the whole JSON object has arrived
+            command = _complete_command(text) if plan_context is None else None
+            if command:
+                print(f"[INFO] LLM command complete after {time.monotonic() - started:.2f}s, closing stream")
+                stats['closed_early'] = True
+                return command
+    finally:
+        # Closing the connection early also stops generation on the server
+        resp.close()
+    print(f"[INFO] LLM stream finished after {time.monotonic() - started:.2f}s ({provider}/{model})")
+    return _reply_command(text, plan_context)
+
+
+def _complete_command(text):
+    """The first finished ffmpeg line outside reasoning blocks, or None while it is still being generated"""
+    text = re.sub(r'<think>[\s\S]*?</think>', '', text, flags=re.IGNORECASE)
+    # Anything after an unterminated <think> is still reasoning
+    text = re.split(r'<think>', text, flags=re.IGNORECASE)[0]
+    lines = text.split('\n')
+    # The last line may still be growing
+    for line in lines[:-1]:
+        line = line.strip()
+        if line.startswith('ffmpeg') and not line.endswith('\\'):
+            return line
+    return None
+
+
+def _reply_command(raw, plan_context=None):
+    """The command in a model reply: extracted as is, or compiled from an edit plan"""
+    if plan_context is None:
+        return _extract_command(raw)
+    input_filename, input_analysis = plan_context
+    plan = plan_compiler.parse_plan(raw)
+    if plan is None:
+        print("[WARNING] The LLM reply is not a JSON edit plan")
         return None
-    except Exception as e:
+    try:
+        command = plan_compiler.compile_plan(plan, input_filename, input_analysis)
+    except ValueError as e:
+        print(f"[WARNING] Could not compile the edit plan: {e}")
         return None
+    print(f"[INFO] Compiled edit plan {json.dumps(plan)} into: {command}")
+    return command
+
+
+def _extract_command(raw):
+    """Pull the FFmpeg command out of a complete model response"""
+    if raw.lstrip().startswith('{'):
+        # Constrained JSON output
+        try:
+            command = json.loads(raw).get('command')
+            if isinstance(command, str) and command.strip().startswith('ffmpeg'):
+                return command.strip()
+        except (ValueError, AttributeError):
+            pass
+    # Remove <think>...</think> and similar tags
+    raw = re.sub(r'<think>[\s\S]*?</think>', '', raw, flags=re.IGNORECASE)
+    # Find the first line that starts with ffmpeg
+    for line in raw.splitlines():
+        if line.strip().startswith('ffmpeg'):
+            return line.strip()
+    # Fallback: try to extract ffmpeg command from anywhere
+    match = re.search(r'(ffmpeg[^\n]*)', raw)
+    if match:
+        return match.group(1).strip()
+    return None
+
+
+def _ollama_keep_alive():
+    return config.get_config().get('ollama_keep_alive', DEFAULT_OLLAMA_KEEP_ALIVE)
+
+
+def _is_ollama_generate(endpoint):
+    return (endpoint or '').rstrip('/').endswith('/api/generate')
+
+
+def _is_llama_cpp_completion(endpoint):
+    return (endpoint or '').rstrip('/').endswith('/completion')
+
+
+def _record_ollama_load(model, data, reason):
+    """Log Ollama's model load time (nanoseconds in the response) and record cold starts in the metrics"""
+    load_seconds = (data.get('load_duration') or 0) / 1e9
+    if load_seconds >= COLD_START_SECONDS:
+        print(f"[INFO] Ollama cold start: loading {model} took {load_seconds:.2f}s ({reason})")
+        metrics.append_record({'kind': 'llm_cold_start', 'provider': 'Ollama', 'model': model,
+                               'load_seconds': round(load_seconds, 3), 'reason': reason})
+
+
+def warm_up_ollama(endpoint, model):
+    """
+    Load the model into memory ahead of the first command. An empty prompt makes
+    Ollama load the model and return without generating anything.
+    """
+    started = time.monotonic()
+    try:
+        resp = http_client.post(endpoint, json={"model": model, "prompt": "", "stream": False,
+                                                "keep_alive": _ollama_keep_alive()}, timeout=300)
+        resp.raise_for_status()
+        data = resp.json()
+    except Exception as e:
+        print(f"[WARNING] Ollama warm-up for {model} failed: {e}")
+        return False
+    print(f"[INFO] Ollama model {model} ready after {time.monotonic() - started:.2f}s")
+    _record_ollama_load(model, data, 'warm-up')
+    return True
 
 
 def list_ollama_models(endpoint):
@@ -197,17 +601,21 @@ def list_ollama_models(endpoint):
     Returns a list of model names available in the local Ollama server.
     endpoint: The base URL of the Ollama API (e.g., http://localhost:11434)
     """
-    import requests
     import urllib.parse
     # Remove trailing /api/generate or /api/chat if present
     base = endpoint.rstrip('/')
     if base.endswith('/api/generate') or base.endswith('/api/chat'):
         base = base[:base.rfind('/api/')]
     tags_url = urllib.parse.urljoin(base + '/', 'api/tags')
+    cached = _model_lists.get(tags_url)
+    if cached and time.monotonic() - cached[0] < MODEL_LIST_TTL:
+        return list(cached[1])
     try:
-        resp = requests.get(tags_url, timeout=5)
+        resp = http_client.get(tags_url, timeout=5)
         resp.raise_for_status()
         data = resp.json()
-        return [m['name'] for m in data.get('models', [])]
+        models = [m['name'] for m in data.get('models', [])]
+        _model_lists[tags_url] = (time.monotonic(), models)
+        return list(models)
     except Exception as e:
         return [] 
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+Rolling log of LLM calls.
+Each request records the provider, model, prompt and completion size, token
+counts when the provider reports them, time to first byte and token, total
+latency, HTTP status and whether the extracted command validated. Only the most
+recent MAX_RECORDS calls are kept. summarize() reduces them to p50/p95 latency
+and validation rate per provider/model, to pick the fastest model that still
+produces valid commands.
+"""
+import os
+import json
+import time
+import threading
+from collections import deque
+
+MAX_RECORDS = 500
+
+_lock = threading.Lock()
+_records = None  # deque of the most recent records, loaded on first use
+_appended = 0    # lines appended since the file was last rewritten
+
+
+def get_stats_path():
+    return os.path.expanduser('~/.video-editor-app/llm_stats.jsonl')
+
+
+def _load():
+    global _records
+    if _records is not None:
+        return _records
+    _records = deque(maxlen=MAX_RECORDS)
+    try:
+        with open(get_stats_path(), 'r') as f:
+            for line in f:
+                try:
+                    _records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return _records
+
+
+def record(entry):
+    """Add a timestamp to entry and append it to the rolling log"""
+    global _appended
+    entry = {'timestamp': time.time(), **entry}
+    path = get_stats_path()
+    with _lock:
+        records = _load()
+        records.append(entry)
+        _appended += 1
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if _appended >= MAX_RECORDS:
+                # Rewrite with only the window so the file stays bounded
+                with open(path, 'w') as f:
+                    f.writelines(json.dumps(r, default=str) + '\n' for r in records)
+                _appended = 0
+            else:
+                with open(path, 'a') as f:
+                    f.write(json.dumps(entry, default=str) + '\n')
+        except OSError as e:
+            print(f"[WARNING] Could not write LLM stats to {path}: {e}")
+
+
+def load_records():
+    """The most recent calls, oldest first"""
+    with _lock:
+        return list(_load())
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def summarize(records=None):
+    """
+    Per "provider/model": number of calls, p50/p95 latency and time to first
+    token of completed calls, validation rate and average token counts.
+    Calls cancelled because a hedged request won are left out.
+    """
+    if records is None:
+        records = load_records()
+    groups = {}
+    for entry in records:
+        if entry.get('cancelled'):
+            continue
+        groups.setdefault(f"{entry.get('provider')}/{entry.get('model')}", []).append(entry)
+    summary = {}
+    for name, entries in groups.items():
+        completed = [e for e in entries if not e.get('error')]
+        latencies = [e['latency'] for e in completed if e.get('latency') is not None]
+        first_tokens = [e['ttft'] for e in completed if e.get('ttft') is not None]
+        completion_tokens = [e['completion_tokens'] for e in completed if e.get('completion_tokens') is not None]
+        prompt_tokens = sum(e.get('prompt_tokens') or 0 for e in completed)
+        cached_tokens = sum(e.get('cached_tokens') or 0 for e in completed)
+        summary[name] = {
+            'calls': len(entries),
+            'errors': len(entries) - len(completed),
+            'p50_latency': _percentile(latencies, 0.5),
+            'p95_latency': _percentile(latencies, 0.95),
+            'p50_ttft': _percentile(first_tokens, 0.5),
+            'valid_rate': sum(1 for e in entries if e.get('validated')) / len(entries),
+            'avg_completion_tokens': sum(completion_tokens) / len(completion_tokens) if completion_tokens else None,
+            'cached_tokens': cached_tokens,
+            'prompt_tokens': prompt_tokens,
+        }
+    return summary
+
+
+def format_summary(summary=None):
+    """One line per provider/model, fastest first"""
+    if summary is None:
+        summary = summarize()
+    if not summary:
+        return "No LLM calls recorded yet."
+    lines = []
+    for name, s in sorted(summary.items(), key=lambda item: item[1]['p50_latency'] if item[1]['p50_latency'] is not None else float('inf')):
+        latency = (f"p50 {s['p50_latency']:.1f}s, p95 {s['p95_latency']:.1f}s"
+                   if s['p50_latency'] is not None else "no completed calls")
+        line = f"{name}: {latency}, {s['valid_rate']:.0%} valid ({s['calls']} calls"
+        if s['errors']:
+            line += f", {s['errors']} failed"
+        line += ")"
+        if s['cached_tokens'] and s['prompt_tokens']:
+            line += f", {s['cached_tokens'] / s['prompt_tokens']:.0%} of prompt tokens cached"
+        lines.append(line)
+    return '\n'.join(lines)
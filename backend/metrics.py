@@ -0,0 +1,67 @@
+"""
+Append-only JSON-lines metrics log.
+Each record is written to the project's logs/metrics.jsonl (when a project
+directory is given) and to the global ~/.video-editor-app/metrics.jsonl, so
+expensive commands and filters can be found per project and across projects.
+"""
+import os
+import json
+import time
+import threading
+
+_lock = threading.Lock()
+
+
+def get_global_metrics_path():
+    return os.path.expanduser('~/.video-editor-app/metrics.jsonl')
+
+
+def get_project_metrics_path(project_dir):
+    return os.path.join(project_dir, 'logs', 'metrics.jsonl')
+
+
+def _append_line(path, line):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as f:
+            f.write(line + '\n')
+    except OSError as e:
+        print(f"[WARNING] Could not write metrics to {path}: {e}")
+
+
+def append_record(record, project_dir=None):
+    """Add a timestamp to record and append it to the project and global metrics logs"""
+    record = {'timestamp': time.time(), **record}
+    line = json.dumps(record, default=str)
+    with _lock:
+        if project_dir and os.path.isdir(project_dir):
+            _append_line(get_project_metrics_path(project_dir), line)
+        _append_line(get_global_metrics_path(), line)
+
+
+def load_records(path=None, kind=None):
+    """Read records back from a metrics log (the global one by default), optionally filtered by kind"""
+    path = path or get_global_metrics_path()
+    records = []
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if kind is None or record.get('kind') == kind:
+                    records.append(record)
+    except OSError:
+        pass
+    return records
+
+
+def cpu_time_by_filter(records):
+    """Total child CPU seconds per filter name across FFmpeg job records, most expensive first"""
+    totals = {}
+    for record in records:
+        cpu = (record.get('user_cpu') or 0) + (record.get('sys_cpu') or 0)
+        for name in record.get('filters') or ['(none)']:
+            totals[name] = totals.get(name, 0) + cpu
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
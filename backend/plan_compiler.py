@@ -0,0 +1,299 @@
+"""
+Compiles a structured edit plan into an FFmpeg command.
+In plan mode the LLM only describes the edit as JSON (trim, crop, scale, speed,
+overlay, audio, subtitles, output). Seek placement, stream copy and encoder
+settings are decided here from the plan and the input's analysis, so the
+efficiency of the command no longer depends on the model.
+"""
+import re
+import json
+from . import ffmpeg_command
+from .command_optimizer import CONTAINER_VIDEO_CODECS, CONTAINER_AUDIO_CODECS, ANY_CODEC
+from .ffmpeg_runner import parse_ffmpeg_time
+from .intent_parser import AUDIO_FORMATS, GIF_FPS, GIF_MAX_WIDTH, atempo_chain
+
+PLAN_KEYS = {'trim', 'crop', 'scale', 'speed', 'overlay', 'audio', 'subtitles', 'output', 'unsupported'}
+VIDEO_FORMATS = {'mp4', 'mov', 'mkv', 'webm', 'avi', 'm4v', 'gif'}
+AUDIO_ONLY_FORMATS = set(AUDIO_FORMATS) | {'opus'}
+
+# x264 / VP9 CRF for each quality level
+X264_CRF = {'high': 18, 'medium': 23, 'low': 28}
+VP9_CRF = {'high': 24, 'medium': 32, 'low': 40}
+DEFAULT_QUALITY = 'medium'
+
+# Audio encoder when the audio has to be re-encoded for a video container
+CONTAINER_AUDIO_ENCODERS = {
+    'webm': ['-c:a', 'libopus', '-b:a', '128k'],
+    'avi': ['-c:a', 'libmp3lame', '-q:a', '2'],
+    'opus': ['-c:a', 'libopus', '-b:a', '128k'],
+}
+DEFAULT_AUDIO_ENCODER = ['-c:a', 'aac', '-b:a', '192k']
+
+OVERLAY_POSITIONS = {
+    'top-left': ('{m}', '{m}'),
+    'top-right': ('W-w-{m}', '{m}'),
+    'bottom-left': ('{m}', 'H-h-{m}'),
+    'bottom-right': ('W-w-{m}', 'H-h-{m}'),
+    'center': ('(W-w)/2', '(H-h)/2'),
+}
+DEFAULT_OVERLAY_MARGIN = 10
+
+# Attached files are referenced by their project-relative path
+ASSET_PATH = re.compile(r'assets/[\w.\- ]+')
+
+# JSON schema of a plan, used to constrain local models' output
+PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "trim": {"type": "object", "properties": {"start": {"type": "string"}, "end": {"type": "string"}}},
+        "crop": {"type": "object", "properties": {"width": {"type": "integer"}, "height": {"type": "integer"},
+                                                  "x": {"type": "integer"}, "y": {"type": "integer"}}},
+        "scale": {"type": "object", "properties": {"width": {"type": "integer"}, "height": {"type": "integer"}}},
+        "speed": {"type": "number"},
+        "overlay": {"type": "object", "properties": {"file": {"type": "string"}, "position": {"type": "string"},
+                                                     "width": {"type": "integer"}, "opacity": {"type": "number"},
+                                                     "start": {"type": "string"}, "end": {"type": "string"}}},
+        "audio": {"type": "object", "properties": {"mute": {"type": "boolean"}, "gain_db": {"type": "number"}}},
+        "subtitles": {"type": "object", "properties": {"file": {"type": "string"}}},
+        "output": {"type": "object", "properties": {"format": {"type": "string"}, "quality": {"type": "string"}}},
+        "unsupported": {"type": "boolean"}
+    }
+}
+
+
+def parse_plan(raw):
+    """The JSON object in a model response (reasoning and code fences are ignored), or None"""
+    raw = re.sub(r'<think>[\s\S]*?</think>', '', raw or '', flags=re.IGNORECASE)
+    start, end = raw.find('{'), raw.rfind('}')
+    if start < 0 or end < start:
+        return None
+    try:
+        plan = json.loads(raw[start:end + 1])
+    except ValueError:
+        return None
+    return plan if isinstance(plan, dict) else None
+
+
+def _fmt(seconds):
+    return f"{seconds:.3f}".rstrip('0').rstrip('.')
+
+
+def _section(plan, key):
+    value = plan.get(key)
+    if value is None:
+        return None
+    if not isinstance(value, dict):
+        raise ValueError(f"'{key}' must be an object")
+    return value
+
+
+def _seconds(value, name):
+    seconds = parse_ffmpeg_time(str(value)) if value is not None else None
+    if seconds is None:
+        raise ValueError(f"{name} is not a valid time: {value!r}")
+    return seconds
+
+
+def _integer(value, name, minimum=1):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value) or value < minimum:
+        raise ValueError(f"{name} must be a whole number >= {minimum}: {value!r}")
+    return int(value)
+
+
+def _asset(value, name):
+    if not isinstance(value, str) or not ASSET_PATH.fullmatch(value):
+        raise ValueError(f"{name} must be an attached file (assets/...): {value!r}")
+    return value
+
+
+def _first_stream(analysis, kind):
+    streams = (analysis or {}).get(f'{kind}_streams') or []
+    return streams[0] if streams else None
+
+
+def _can_copy(table, fmt, stream):
+    if not stream or fmt not in table:
+        return False
+    allowed = table[fmt]
+    return allowed is ANY_CODEC or stream.get('codec_name') in allowed
+
+
+def _video_encoder(fmt, quality):
+    if fmt == 'webm':
+        return ['-c:v', 'libvpx-vp9', '-crf', str(VP9_CRF[quality]), '-b:v', '0', '-row-mt', '1',
+                '-deadline', 'good', '-cpu-used', '4']
+    return ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', str(X264_CRF[quality]), '-pix_fmt', 'yuv420p']
+
+
+def _audio_encoder(fmt):
+    if fmt in AUDIO_FORMATS:
+        return list(AUDIO_FORMATS[fmt])
+    return list(CONTAINER_AUDIO_ENCODERS.get(fmt, DEFAULT_AUDIO_ENCODER))
+
+
+def _overlay_chain(overlay):
+    """Filters applied to the overlay input, and the overlay filter itself"""
+    chain = []
+    if overlay.get('width') is not None:
+        chain.append(f"scale={_integer(overlay['width'], 'overlay width')}:-1")
+    opacity = overlay.get('opacity')
+    if opacity is not None:
+        if not isinstance(opacity, (int, float)) or not 0 < opacity <= 1:
+            raise ValueError(f"overlay opacity must be between 0 and 1: {opacity!r}")
+        if opacity < 1:
+            chain.append(f"format=rgba,colorchannelmixer=aa={_fmt(opacity)}")
+    position = overlay.get('position', 'top-right')
+    if position not in OVERLAY_POSITIONS:
+        raise ValueError(f"unknown overlay position {position!r} (use {', '.join(OVERLAY_POSITIONS)})")
+    margin = DEFAULT_OVERLAY_MARGIN
+    x, y = (part.format(m=margin) for part in OVERLAY_POSITIONS[position])
+    overlay_filter = f"overlay={x}:{y}"
+    if overlay.get('start') is not None or overlay.get('end') is not None:
+        # Output timestamps start at 0 after the input seek, so times are relative to the result
+        start = _seconds(overlay.get('start', 0), 'overlay start')
+        end = _seconds(overlay['end'], 'overlay end') if overlay.get('end') is not None else None
+        window = f"between(t,{_fmt(start)},{_fmt(end)})" if end is not None else f"gte(t,{_fmt(start)})"
+        overlay_filter += f":enable='{window}'"
+    return chain or ['null'], overlay_filter
+
+
+def compile_plan(plan, input_filename, analysis=None):
+    """
+    Return the FFmpeg command for an edit plan. Raises ValueError if the plan is
+    malformed or asks for something outside the plan format.
+    """
+    if not isinstance(plan, dict):
+        raise ValueError('the plan must be a JSON object')
+    if plan.get('unsupported'):
+        raise ValueError('the model marked the request as not expressible as a plan')
+    unknown = set(plan) - PLAN_KEYS
+    if unknown:
+        raise ValueError(f"unknown plan keys: {', '.join(sorted(unknown))}")
+
+    input_ext = input_filename.rsplit('.', 1)[-1].lower()
+    output = _section(plan, 'output') or {}
+    fmt = str(output.get('format') or input_ext).lower().lstrip('.')
+    if fmt not in VIDEO_FORMATS | AUDIO_ONLY_FORMATS:
+        raise ValueError(f"unsupported output format {fmt!r}")
+    quality = output.get('quality')
+    if quality is not None and quality not in X264_CRF:
+        raise ValueError(f"quality must be one of {', '.join(X264_CRF)}")
+    audio_only = fmt in AUDIO_ONLY_FORMATS
+
+    pre_input, inputs, out_args = [], [input_filename], []
+
+    # Trim: seek and duration on the input (no decoding up to the cut point), so the
+    # duration is measured on the source timeline, before any speed change
+    trim = _section(plan, 'trim')
+    start = 0.0
+    if trim:
+        start = _seconds(trim.get('start', 0), 'trim start')
+        duration = (analysis or {}).get('format', {}).get('duration')
+        if duration and start >= float(duration):
+            raise ValueError(f"trim start {_fmt(start)}s is past the end of the input")
+        if start:
+            pre_input = ['-ss', _fmt(start)]
+        if trim.get('end') is not None:
+            end = _seconds(trim['end'], 'trim end')
+            if end <= start:
+                raise ValueError('trim end must be after trim start')
+            pre_input += ['-t', _fmt(end - start)]
+
+    speed = plan.get('speed')
+    if speed is not None:
+        if isinstance(speed, bool) or not isinstance(speed, (int, float)) or not 0.1 <= speed <= 10:
+            raise ValueError(f"speed must be a factor between 0.1 and 10: {speed!r}")
+        if speed == 1:
+            speed = None
+
+    # Video filters on the main input, in the order that keeps the work smallest
+    chain = []
+    crop = _section(plan, 'crop')
+    if crop:
+        crop_filter = f"crop={_integer(crop.get('width'), 'crop width')}:{_integer(crop.get('height'), 'crop height')}"
+        if crop.get('x') is not None or crop.get('y') is not None:
+            crop_filter += f":{_integer(crop.get('x', 0), 'crop x', 0)}:{_integer(crop.get('y', 0), 'crop y', 0)}"
+        chain.append(crop_filter)
+    scale = _section(plan, 'scale')
+    if scale:
+        if scale.get('width') is None and scale.get('height') is None:
+            raise ValueError('scale needs a width or a height')
+        width = _integer(scale['width'], 'scale width') if scale.get('width') is not None else -2
+        height = _integer(scale['height'], 'scale height') if scale.get('height') is not None else -2
+        chain.append(f"scale={width}:{height}")
+    subtitles = _section(plan, 'subtitles')
+    if subtitles:
+        path = _asset(subtitles.get('file'), 'subtitles file')
+        if start:
+            # Subtitle times refer to the original timeline, which the input seek resets to 0
+            chain += [f"setpts=PTS+{_fmt(start)}/TB", f"subtitles={path}", "setpts=PTS-STARTPTS"]
+        else:
+            chain.append(f"subtitles={path}")
+    if speed:
+        chain.append(f"setpts=PTS/{_fmt(speed)}")
+    overlay = _section(plan, 'overlay')
+
+    if audio_only:
+        if chain or overlay:
+            raise ValueError(f"video edits cannot apply to an audio-only {fmt} output")
+        out_args.append('-vn')
+    elif fmt == 'gif':
+        video = _first_stream(analysis, 'video')
+        if not scale:
+            chain.append(f"scale={min(GIF_MAX_WIDTH, (video or {}).get('width') or GIF_MAX_WIDTH)}:-1:flags=lanczos")
+        chain.insert(0, f"fps={GIF_FPS}")
+    gif_tail = "split[s0][s1];[s0]palettegen[p];[s1][p]paletteuse"
+
+    video_filtered = bool(chain or overlay)
+    if overlay:
+        inputs.append(_asset(overlay.get('file'), 'overlay file'))
+        overlay_chain, overlay_filter = _overlay_chain(overlay)
+        graph = f"[0:v]{','.join(chain) or 'null'}[base];[1:v]{','.join(overlay_chain)}[ov];[base][ov]{overlay_filter}"
+        graph += f",{gif_tail}[v]" if fmt == 'gif' else "[v]"
+        out_args += ['-filter_complex', graph, '-map', '[v]']
+        if fmt != 'gif':
+            out_args += ['-map', '0:a?']
+    elif chain:
+        out_args += ['-vf', ','.join(chain) + (f",{gif_tail}" if fmt == 'gif' else '')]
+
+    # Video codec: copy what is untouched, otherwise encode with settings chosen here
+    if not audio_only and fmt != 'gif':
+        video = _first_stream(analysis, 'video')
+        if not video_filtered and quality is None and _can_copy(CONTAINER_VIDEO_CODECS, fmt, video):
+            out_args += ['-c:v', 'copy']
+        else:
+            out_args += _video_encoder(fmt, quality or DEFAULT_QUALITY)
+
+    # Audio
+    audio = _section(plan, 'audio') or {}
+    audio_stream = _first_stream(analysis, 'audio')
+    if fmt == 'gif' or audio.get('mute'):
+        if audio_only:
+            raise ValueError('cannot mute an audio-only output')
+        out_args.append('-an')
+    else:
+        audio_chain = []
+        if speed:
+            audio_chain.append(atempo_chain(speed))
+        if audio.get('gain_db') is not None:
+            gain = audio['gain_db']
+            if isinstance(gain, bool) or not isinstance(gain, (int, float)) or not -60 <= gain <= 30:
+                raise ValueError(f"gain_db must be between -60 and 30: {gain!r}")
+            if gain:
+                audio_chain.append(f"volume={_fmt(gain)}dB")
+        if audio_chain:
+            out_args += ['-af', ','.join(audio_chain)] + _audio_encoder(fmt)
+        elif analysis is None or audio_stream:
+            if _can_copy(CONTAINER_AUDIO_CODECS, fmt, audio_stream):
+                out_args += ['-c:a', 'copy']
+            else:
+                out_args += _audio_encoder(fmt)
+
+    if start and 'copy' in out_args:
+        out_args += ['-avoid_negative_ts', 'make_zero']
+
+    tokens = ['ffmpeg', '-y'] + pre_input + ['-i', inputs[0]]
+    for path in inputs[1:]:
+        tokens += ['-i', path]
+    tokens += out_args + [f'output.{fmt}']
+    return ffmpeg_command.join(tokens)
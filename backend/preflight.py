@@ -0,0 +1,103 @@
+"""
+Pre-flight check of a command on a short excerpt.
+Before a long encode, the command is run with every input limited to the first
+couple of seconds and the output redirected to a scratch file, under a tight
+deadline. Syntax, filtergraph, codec and muxer errors show up in seconds instead
+of after a full-length run.
+"""
+import os
+import shutil
+import time
+import threading
+import itertools
+from . import ffmpeg_runner, ffmpeg_command, config
+
+EXCERPT_SECONDS = 2
+# Sources shorter than this are cheap enough to run in full straight away
+MIN_DURATION = 30
+DEADLINE = 30
+STALL_TIMEOUT = 15
+
+_ids = itertools.count(1)
+
+
+def should_preflight(cmd, duration):
+    """True if cmd on a source of `duration` seconds is worth checking on an excerpt first"""
+    if not config.get_config().get('preflight', True):
+        return False
+    return bool(duration and duration > MIN_DURATION)
+
+
+def build_command(cmd, scratch_output):
+    """Return cmd with every input limited to EXCERPT_SECONDS and the output replaced by scratch_output"""
+    tokens = ffmpeg_command.split(cmd)
+    out_idx = ffmpeg_command.output_index(tokens)
+    if out_idx is None:
+        raise ValueError('command has no output file')
+    tokens[out_idx] = scratch_output
+    # Walk inputs from the last one so earlier indices stay valid while inserting
+    inputs = ffmpeg_command.input_indices(tokens)
+    for n in reversed(range(len(inputs))):
+        flag_idx = inputs[n] - 1
+        span_start = inputs[n - 1] + 1 if n else 1
+        t_idx = ffmpeg_command.find_option(tokens, ('-t',), span_start, flag_idx)
+        if t_idx is not None:
+            limit = ffmpeg_runner.parse_ffmpeg_time(tokens[t_idx + 1])
+            if limit is None or limit > EXCERPT_SECONDS:
+                tokens[t_idx + 1] = str(EXCERPT_SECONDS)
+        else:
+            tokens[flag_idx:flag_idx] = ['-t', str(EXCERPT_SECONDS)]
+    return ffmpeg_command.join(tokens)
+
+
+class PreflightCheck:
+    """
+    Runs a command on an excerpt. Exposes the same run()/cancel() interface as
+    ffmpeg_runner.FFmpegJob; run() returns a result marked 'preflight', and
+    'inconclusive' when the excerpt itself stalled or ran out of time.
+    """
+    def __init__(self, cmd, workdir):
+        self.cmd = cmd
+        self.workdir = workdir
+        self.scratch_dir_name = f"preflight_{int(time.time())}_{next(_ids)}"
+        self.scratch_dir = os.path.join(workdir, self.scratch_dir_name)
+        self._job = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self._job:
+            self._job.cancel()
+
+    def run(self):
+        started = time.monotonic()
+        try:
+            tokens = ffmpeg_command.split(self.cmd)
+            ext = os.path.splitext(tokens[ffmpeg_command.output_index(tokens)])[1]
+            scratch_output = os.path.join(self.scratch_dir_name, f"excerpt{ext}")
+            excerpt_cmd = build_command(self.cmd, scratch_output)
+        except (ValueError, TypeError, IndexError) as e:
+            # Leave unusual commands to the full run
+            return {'success': True, 'preflight': True, 'inconclusive': True, 'stderr': str(e)}
+        os.makedirs(self.scratch_dir, exist_ok=True)
+        self._job = ffmpeg_runner.FFmpegJob(
+            excerpt_cmd, self.workdir,
+            duration=EXCERPT_SECONDS,
+            partial_outputs=[],
+            stall_timeout=STALL_TIMEOUT,
+            deadline=DEADLINE
+        )
+        if self._cancelled.is_set():
+            self._job.cancel()
+        try:
+            result = self._job.run()
+        finally:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+        result['preflight'] = True
+        if result.get('stalled') or result.get('timed_out') or result.get('reader_failed'):
+            # A slow or unmonitored excerpt says nothing about correctness
+            result['inconclusive'] = True
+        print(f"[INFO] Pre-flight on {EXCERPT_SECONDS}s excerpt: "
+              f"{'passed' if result.get('success') else 'inconclusive' if result.get('inconclusive') else 'failed'} "
+              f"in {time.monotonic() - started:.1f}s")
+        return result
@@ -141,6 +141,14 @@ def save_checkpoint_metadata(project_dir, checkpoint_num, meta):
     with open(meta_file, 'w') as f:
         json.dump(meta, f, indent=2)
 
+def set_checkpoint_command(project_dir, checkpoint_num, ffmpeg_command):
+    """Record the FFmpeg command that carried out the checkpoint's user command"""
+    meta = load_checkpoint_metadata(project_dir, checkpoint_num)
+    if meta is None:
+        return
+    meta['ffmpeg_command'] = ffmpeg_command
+    save_checkpoint_metadata(project_dir, checkpoint_num, meta)
+
 def load_checkpoint_metadata(project_dir, checkpoint_num):
     """Load checkpoint metadata from JSON file"""
     meta_file = os.path.join(project_dir, f'checkpoint_{checkpoint_num}.json')
@@ -0,0 +1,196 @@
+"""
+Content-addressed cache of FFmpeg command results.
+Outputs are keyed by the input's content hash, the normalized command, the
+hashes of referenced assets and the FFmpeg version, and kept in a size-capped
+LRU directory. A hit is served by hardlink (or copy) instead of an encode.
+"""
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import threading
+from . import ffmpeg_command, ffmpeg_locator, config
+
+DEFAULT_MAX_MB = 2048
+HASH_BLOCK_SIZE = 1024 * 1024
+
+_lock = threading.Lock()
+_index = None
+_hash_cache = {}  # (device, inode, size, mtime_ns) -> sha256
+_stats = {'hits': 0, 'misses': 0}
+
+# Project-relative asset references inside option values (e.g. movie=assets/logo.png)
+ASSET_PATTERN = re.compile(r'assets[/\\][A-Za-z0-9._-]+')
+
+
+def get_cache_dir():
+    return os.path.expanduser('~/.video-editor-app/result_cache')
+
+
+def _index_path():
+    return os.path.join(get_cache_dir(), 'index.json')
+
+
+def _max_bytes():
+    return int(config.get_config().get('result_cache_max_mb', DEFAULT_MAX_MB)) * 1024 * 1024
+
+
+def _load_index():
+    global _index
+    if _index is None:
+        _index = {}
+        try:
+            if os.path.exists(_index_path()):
+                with open(_index_path(), 'r') as f:
+                    _index = json.load(f)
+        except Exception as e:
+            print(f"[WARNING] Failed to load result cache index: {e}")
+            _index = {}
+    return _index
+
+
+def _save_index():
+    try:
+        os.makedirs(get_cache_dir(), exist_ok=True)
+        with open(_index_path(), 'w') as f:
+            json.dump(_index, f, indent=2)
+    except Exception as e:
+        print(f"[WARNING] Failed to save result cache index: {e}")
+
+
+def file_hash(path):
+    """
+    sha256 of a file's full content: a cache that hands back user-visible
+    results cannot key on a sample. Memoized on (device, inode, size,
+    mtime_ns) rather than path, so a file is read once until it changes, even
+    if it is renamed to the next input or hardlinked.
+    """
+    stat = os.stat(path)
+    memo_key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        if memo_key in _hash_cache:
+            return _hash_cache[memo_key]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    with _lock:
+        _hash_cache[memo_key] = digest.hexdigest()
+    return digest.hexdigest()
+
+
+def make_key(cmd, workdir):
+    """
+    Cache key for running cmd in workdir, or None if the command cannot be cached
+    (caching disabled, unparseable command, missing input or unknown FFmpeg version).
+    """
+    if not config.get_config().get('result_cache', True):
+        return None
+    try:
+        tokens = ffmpeg_command.split(cmd)
+    except ValueError:
+        return None
+    version = ffmpeg_locator.get_version('ffmpeg')
+    if not version:
+        return None
+    try:
+        # Input names change between edits (input_3.mp4, input_4.mp4...), so the
+        # command is normalized to placeholders and the content hashes are keyed instead
+        input_hashes = []
+        for n, idx in enumerate(ffmpeg_command.input_indices(tokens)):
+            path = os.path.join(workdir, tokens[idx])
+            if not os.path.isfile(path):
+                return None
+            input_hashes.append(file_hash(path))
+            tokens[idx] = f'{{input{n}}}'
+        asset_hashes = []
+        for rel_path in sorted(set(ASSET_PATTERN.findall(' '.join(tokens)))):
+            path = os.path.join(workdir, rel_path)
+            if not os.path.isfile(path):
+                return None
+            asset_hashes.append(f"{rel_path}={file_hash(path)}")
+    except OSError:
+        return None
+    # Overwrite flags do not change the result
+    normalized = ' '.join(t for t in tokens if t not in ('-y', '-n'))
+    material = json.dumps([input_hashes, normalized, asset_hashes, version])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def fetch(key, dest_path):
+    """Place the cached output for key at dest_path. Returns True on a hit."""
+    if not key:
+        return False
+    with _lock:
+        index = _load_index()
+        entry = index.get(key)
+        cached_path = os.path.join(get_cache_dir(), entry['file']) if entry else None
+        if not entry or not os.path.exists(cached_path):
+            if entry:
+                del index[key]
+                _save_index()
+            _stats['misses'] += 1
+            print(f"[INFO] Result cache miss (hits={_stats['hits']}, misses={_stats['misses']})")
+            return False
+        try:
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            try:
+                os.link(cached_path, dest_path)
+            except OSError:
+                shutil.copy2(cached_path, dest_path)
+        except OSError as e:
+            print(f"[WARNING] Could not restore cached result: {e}")
+            _stats['misses'] += 1
+            return False
+        entry['last_used'] = time.time()
+        _save_index()
+        _stats['hits'] += 1
+        print(f"[INFO] Result cache hit (hits={_stats['hits']}, misses={_stats['misses']})")
+        return True
+
+
+def store(key, output_path):
+    """Add a freshly produced output to the cache and evict least recently used entries"""
+    if not key or not os.path.isfile(output_path):
+        return
+    with _lock:
+        index = _load_index()
+        os.makedirs(get_cache_dir(), exist_ok=True)
+        file_name = key + os.path.splitext(output_path)[1]
+        cached_path = os.path.join(get_cache_dir(), file_name)
+        try:
+            if os.path.exists(cached_path):
+                os.remove(cached_path)
+            try:
+                os.link(output_path, cached_path)
+            except OSError:
+                shutil.copy2(output_path, cached_path)
+        except OSError as e:
+            print(f"[WARNING] Could not store result in cache: {e}")
+            return
+        now = time.time()
+        index[key] = {'file': file_name, 'size': os.path.getsize(cached_path), 'created': now, 'last_used': now}
+        _evict(index)
+        _save_index()
+
+
+def _evict(index):
+    max_bytes = _max_bytes()
+    total = sum(entry['size'] for entry in index.values())
+    for key, entry in sorted(index.items(), key=lambda item: item[1]['last_used']):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(get_cache_dir(), entry['file']))
+        except OSError:
+            pass
+        total -= entry['size']
+        del index[key]
+        print(f"[INFO] Result cache evicted {entry['file']}")
+
+
+def get_stats():
+    return dict(_stats)
@@ -0,0 +1,101 @@
+"""
+Distills FFmpeg stderr into a short digest for retry prompts.
+The banner, build configuration, stream metadata, stream mapping and progress
+lines are dropped; what remains is the error lines, the filters that failed
+and the options FFmpeg rejected.
+"""
+import re
+from .ffmpeg_runner import ERROR_LINE_PATTERN
+
+DEFAULT_MAX_CHARS = 1000
+
+NOISE_PATTERNS = [
+    re.compile(p) for p in (
+        r'^ffmpeg version ',
+        r'^\s+built with ',
+        r'^\s+configuration:',
+        r'^\s+lib\w+\s+\d+\.\s*\d+',
+        r'^(Input|Output) #\d+',
+        r'^\s+(Metadata|Duration|Chapters?|Side data):',
+        r'^\s+Stream #\d+:\d+',
+        r'^Stream mapping:',
+        r'^\s{4,}\S.*:\s',  # metadata key : value
+        r'^\s*(frame|size)=\s*\S+.*(time|bitrate)=',
+        r'^\s*video:\S+ audio:\S+',
+        r'^Press \[q\] to stop',
+        r'^\[\w+ @ 0x[0-9a-f]+\] (using cpu capabilities|profile |264 - core|frame I:|frame P:|frame B:|mb [IPB]|ref [PB]|kb/s|coded y,|i16 v,|i8 v,|Weighted P|consecutive B|final ratefactor|Qavg)',
+    )
+]
+
+# "[Parsed_scale_0 @ 0x55d0c] ..." -> scale
+PARSED_FILTER = re.compile(r'Parsed_([A-Za-z0-9]+)_\d+')
+FILTER_ERRORS = [
+    re.compile(r"No such filter: '([^']+)'"),
+    re.compile(r"Error initializing filter '([^']+)'"),
+    re.compile(r"filter '([^']+)'", re.IGNORECASE),
+]
+OPTION_ERRORS = [
+    re.compile(r"Unrecognized option '-?([^']+)'"),
+    re.compile(r"Option (\S+) not found"),
+    re.compile(r"Codec AVOption (\S+) .* has not been used"),
+    re.compile(r"Unknown encoder '([^']+)'"),
+    re.compile(r"Unknown decoder '([^']+)'"),
+    re.compile(r"Invalid stream specifier: (\S+)"),
+    re.compile(r"Unable to find a suitable output format for '([^']+)'"),
+    re.compile(r"Unable to parse option value \"([^\"]+)\""),
+    re.compile(r"Error parsing option '?(\S+?)'? with argument"),
+    re.compile(r"Undefined constant or missing '\(' in '([^']+)'"),
+]
+# Lines added by our own runner (stall / timeout reports)
+RUNNER_MESSAGE = re.compile(r'^FFmpeg (stalled|command timed out|job was cancelled)')
+
+
+def _clean(line):
+    """Drop memory addresses, which only make identical errors look different"""
+    return re.sub(r' @ 0x[0-9a-f]+\]', ']', line.strip())
+
+
+def _is_noise(line):
+    return any(pattern.search(line) for pattern in NOISE_PATTERNS)
+
+
+def _unique(items):
+    seen = set()
+    return [item for item in items if not (item in seen or seen.add(item))]
+
+
+def distill_stderr(stderr, max_chars=DEFAULT_MAX_CHARS):
+    """Return a compact digest of the errors in FFmpeg's stderr"""
+    lines = [line for line in (stderr or '').splitlines() if line.strip() and line.strip() != '...']
+    errors, filters, options = [], [], []
+    for line in lines:
+        if RUNNER_MESSAGE.search(line):
+            errors.append(line.strip())
+            continue
+        if _is_noise(line) or not ERROR_LINE_PATTERN.search(line):
+            continue
+        errors.append(_clean(line))
+        filters.extend(PARSED_FILTER.findall(line))
+        for pattern in FILTER_ERRORS:
+            filters.extend(pattern.findall(line))
+        for pattern in OPTION_ERRORS:
+            options.extend(pattern.findall(line))
+    if not errors:
+        # Nothing looks like an error: keep the last meaningful lines
+        errors = [_clean(line) for line in lines if not _is_noise(line)][-5:]
+
+    parts = []
+    if filters:
+        parts.append("Failing filters: " + ', '.join(_unique(filters)))
+    if options:
+        parts.append("Offending options/values: " + ', '.join(_unique(options)))
+    header = '\n'.join(parts)
+    budget = max_chars - len(header) - 1
+    body = []
+    for line in _unique(errors):
+        if len(line) + 1 > budget:
+            break
+        body.append(line)
+        budget -= len(line) + 1
+    digest = '\n'.join(body + ([header] if header else []))
+    return digest or (stderr or '')[-max_chars:]
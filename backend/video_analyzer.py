@@ -4,6 +4,7 @@ import os
 import hashlib
 import time
 from pathlib import Path
+from . import ffmpeg_locator
 
 # Global cache for video analysis results
 _analysis_cache = {}
@@ -46,33 +47,8 @@ def _get_file_hash(file_path):
         return hashlib.md5(file_path.encode()).hexdigest()
 
 def find_ffprobe():
-    """Find ffprobe executable (similar to ffmpeg finder)"""
-    # Common ffprobe installation paths
-    common_paths = [
-        '/usr/local/bin/ffprobe',
-        '/opt/homebrew/bin/ffprobe',  # Apple Silicon Homebrew
-        '/usr/bin/ffprobe',
-        '/opt/local/bin/ffprobe',     # MacPorts
-        'C:\\ffmpeg\\bin\\ffprobe.exe',  # Windows
-        'C:\\Program Files\\ffmpeg\\bin\\ffprobe.exe',  # Windows
-    ]
-    
-    # First check if ffprobe is in PATH
-    try:
-        result = subprocess.run(['ffprobe', '-version'], 
-                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, 
-                              text=True, timeout=5)
-        if result.returncode == 0:
-            return 'ffprobe'
-    except (subprocess.TimeoutExpired, FileNotFoundError):
-        pass
-    
-    # Check common installation paths
-    for path in common_paths:
-        if os.path.exists(path):
-            return path
-    
-    return None
+    """Find ffprobe executable (resolved once per process, honours the configured path)"""
+    return ffmpeg_locator.resolve('ffprobe')
 
 def analyze_video(file_path):
     """
@@ -223,4 +199,29 @@ def get_video_summary(analysis):
             audio_info += f" [{stream['codec_name']}]"
         summary.append(audio_info)
     
-    return ", ".join(summary) 
\ No newline at end of file
+    return ", ".join(summary) 
+
+def get_spec(analysis):
+    """The stream properties a command can depend on (the fields of get_video_summary), or None"""
+    if not analysis:
+        return None
+    video = (analysis.get('video_streams') or [None])[0]
+    audio = (analysis.get('audio_streams') or [None])[0]
+    return {
+        'video_codec': video.get('codec_name') if video else None,
+        'width': video.get('width') if video else None,
+        'height': video.get('height') if video else None,
+        'audio_codec': audio.get('codec_name') if audio else None,
+        'duration': get_duration(analysis),
+    }
+
+def get_duration(analysis):
+    """Return the media duration in seconds from an analysis dict, or None if unknown"""
+    if not analysis:
+        return None
+    duration = analysis.get('format', {}).get('duration')
+    if duration:
+        return duration
+    # Fall back to the longest stream duration
+    durations = [s.get('duration') for s in analysis.get('video_streams', []) + analysis.get('audio_streams', []) if s.get('duration')]
+    return max(durations) if durations else None
@@ -9,6 +9,31 @@ class VideoMerger:
     def __init__(self):
         self.ffmpeg_path = ffmpeg_runner.find_ffmpeg()
         self.ffprobe_path = video_analyzer.find_ffprobe()
+        self._current_job = None
+        self._cancelled = threading.Event()
+    
+    def cancel(self):
+        """Cancel the merge, stopping the running FFmpeg job if there is one"""
+        self._cancelled.set()
+        job = self._current_job
+        if job:
+            job.cancel()
+    
+    def _run_job(self, cmd: str, output_path: str, progress_callback, duration: Optional[float]) -> Dict:
+        """Run an FFmpeg merge job that cancel() can stop"""
+        job = ffmpeg_runner.FFmpegJob(
+            cmd, os.path.dirname(output_path),
+            progress_callback=progress_callback,
+            duration=duration,
+            partial_outputs=[output_path]
+        )
+        self._current_job = job
+        if self._cancelled.is_set():
+            job.cancel()
+        try:
+            return job.run()
+        finally:
+            self._current_job = None
     
     def check_video_compatibility(self, video_paths: List[str]) -> Tuple[bool, Dict]:
         """
@@ -80,6 +105,27 @@ class VideoMerger:
         is_compatible = len(compatibility_info["incompatibilities"]) == 0
         return is_compatible, compatibility_info
     
+    def _total_duration(self, video_paths: List[str]) -> Optional[float]:
+        """Sum of the input durations, used to turn FFmpeg progress into a percentage"""
+        total = 0.0
+        for path in video_paths:
+            duration = video_analyzer.get_duration(video_analyzer.analyze_video(path))
+            if not duration:
+                return None
+            total += duration
+        return total
+    
+    def _ffmpeg_progress_callback(self, progress_callback, message):
+        """Map FFmpeg progress (0-100%) onto the 10-99% range of the merge dialog"""
+        if not progress_callback:
+            return None
+        def on_progress(progress):
+            if progress.get('percent') is None:
+                return
+            percent = 10 + int(progress['percent'] * 0.89)
+            progress_callback(percent, f"{message} {ffmpeg_runner.format_progress(progress)}")
+        return on_progress
+    
     def merge_videos_compatible(self, video_paths: List[str], output_path: str, progress_callback=None) -> Dict:
         """
         Merge compatible videos using simple concatenation (lossless)
@@ -100,7 +146,11 @@ class VideoMerger:
             if progress_callback:
                 progress_callback(10, "Starting compatible video merge...")
             
-            result = ffmpeg_runner.run_ffmpeg_command(cmd, os.path.dirname(output_path))
+            result = self._run_job(
+                cmd, output_path,
+                self._ffmpeg_progress_callback(progress_callback, "Merging..."),
+                self._total_duration(video_paths)
+            )
             
             # Clean up file list
             try:
@@ -108,7 +158,7 @@ class VideoMerger:
             except:
                 pass
             
-            if progress_callback:
+            if progress_callback and not result.get('cancelled'):
                 progress_callback(100, "Merge completed" if result['success'] else "Merge failed")
             
             # If failed, include stderr in the error message
@@ -195,9 +245,13 @@ class VideoMerger:
         if progress_callback:
             progress_callback(10, "Starting incompatible video merge...")
         
-        result = ffmpeg_runner.run_ffmpeg_command(cmd, os.path.dirname(output_path))
+        result = self._run_job(
+            cmd, output_path,
+            self._ffmpeg_progress_callback(progress_callback, "Normalizing and merging..."),
+            self._total_duration(video_paths)
+        )
         
-        if progress_callback:
+        if progress_callback and not result.get('cancelled'):
             progress_callback(100, "Merge completed" if result['success'] else "Merge failed")
         
         # If failed, include stderr in the error message
@@ -0,0 +1,41 @@
+import importlib.util
+import unittest
+
+HAS_QT = importlib.util.find_spec('PyQt6') is not None
+if HAS_QT:
+    from backend import batch_runner
+
+
+def analysis(duration):
+    return {'format': {'duration': duration},
+            'video_streams': [{'codec_name': 'h264', 'width': 1280, 'height': 720}],
+            'audio_streams': [{'codec_name': 'aac'}]}
+
+
+@unittest.skipUnless(HAS_QT, 'the job scheduler needs PyQt6')
+class BatchTemplateTest(unittest.TestCase):
+    def runner(self, instruction, template, files=('a.mp4', 'b.mov')):
+        runner = batch_runner.BatchRunner(list(files), instruction, '/nonexistent')
+        runner.settings = {'optimize_commands': False}
+        runner.template = template
+        runner.template_ext = runner.items[0]['ext']
+        return runner
+
+    def test_output_follows_each_file_format(self):
+        runner = self.runner('scale to 720p', 'ffmpeg -i {input} -vf scale=-2:720 output.mp4')
+        self.assertEqual(runner._command_for(runner.items[1]), 'ffmpeg -i input.mov -vf scale=-2:720 output.mov')
+
+    def test_named_format_is_kept(self):
+        runner = self.runner('convert to mp4', 'ffmpeg -i {input} output.mp4')
+        self.assertEqual(runner._command_for(runner.items[1]), 'ffmpeg -i input.mov output.mp4')
+
+    def test_seek_past_a_later_file_is_refused(self):
+        runner = self.runner('trim 40s to 50s', 'ffmpeg -ss 40 -t 10 -i {input} -c copy output.mp4')
+        runner.items[0]['analysis'] = analysis(60)
+        runner.items[1]['analysis'] = analysis(30)
+        self.assertIsNone(runner._check_times(runner._command_for(runner.items[0]), runner.items[0]))
+        self.assertIn('past the end', runner._check_times(runner._command_for(runner.items[1]), runner.items[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from backend import chunked_encoder, ffmpeg_command, ffmpeg_runner
+
+LONG = {
+    'format': {'duration': 600.0},
+    'video_streams': [{'codec_name': 'h264', 'width': 1920, 'height': 1080}],
+    'audio_streams': [{'codec_name': 'aac'}],
+}
+
+
+class FfmpegCommandTest(unittest.TestCase):
+    def test_inputs_output_and_options(self):
+        tokens = ffmpeg_command.split("ffmpeg -y -i input.mp4 -i 'assets/my logo.png' -vf scale=-2:720 output.mp4")
+        self.assertEqual([tokens[i] for i in ffmpeg_command.input_indices(tokens)], ['input.mp4', 'assets/my logo.png'])
+        self.assertEqual(tokens[ffmpeg_command.output_index(tokens)], 'output.mp4')
+        self.assertEqual(ffmpeg_command.video_filters(tokens), 'scale=-2:720')
+        self.assertEqual(ffmpeg_command.remove_option(tokens, ('-vf', '-y')),
+                         ['ffmpeg', '-i', 'input.mp4', '-i', 'assets/my logo.png', 'output.mp4'])
+
+    def test_filter_names(self):
+        self.assertEqual(ffmpeg_command.filter_names('[0:v]scale=640:-2,fps=12[a];[a][1:v]overlay=10:10'),
+                         ['scale', 'fps', 'overlay'])
+
+
+class IsChunkableTest(unittest.TestCase):
+    def setUp(self):
+        ffmpeg_runner.set_thread_budget(8)
+
+    def tearDown(self):
+        ffmpeg_runner.set_thread_budget(None)
+
+    def chunkable(self, cmd, analysis=LONG):
+        return chunked_encoder.is_chunkable(cmd, analysis)[0]
+
+    def test_per_frame_encode_is_chunkable(self):
+        self.assertTrue(self.chunkable('ffmpeg -i input.mp4 -vf scale=-2:720 -c:v libx264 -crf 23 output.mp4'))
+
+    def test_timing_copy_and_temporal_edits_are_not(self):
+        for cmd in ('ffmpeg -ss 10 -i input.mp4 -vf scale=-2:720 output.mp4',
+                    'ffmpeg -i input.mp4 -c:v copy -af volume=2 output.mp4',
+                    'ffmpeg -i input.mp4 -vf fade=in:0:30 output.mp4',
+                    'ffmpeg -i input.mp4 -vf scale=-2:720 output.gif'):
+            with self.subTest(cmd=cmd):
+                self.assertFalse(self.chunkable(cmd))
+
+    def test_short_inputs_are_not(self):
+        short = dict(LONG, format={'duration': 30.0})
+        self.assertFalse(self.chunkable('ffmpeg -i input.mp4 -vf scale=-2:720 output.mp4', short))
+
+
+if __name__ == '__main__':
+    unittest.main()
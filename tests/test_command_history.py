@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from backend import command_history
+
+ANALYSIS = {
+    'format': {'duration': 60.0},
+    'video_streams': [{'codec_name': 'h264', 'width': 1920, 'height': 1080}],
+    'audio_streams': [{'codec_name': 'aac'}],
+}
+
+
+class CommandHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+        self.old_home = os.environ.get('HOME')
+        os.environ['HOME'] = self.home
+        command_history._entries = None
+        command_history._index = None
+        command_history._appended = 0
+
+    def tearDown(self):
+        if self.old_home is None:
+            del os.environ['HOME']
+        else:
+            os.environ['HOME'] = self.old_home
+        command_history._entries = None
+        command_history._index = None
+        shutil.rmtree(self.home, ignore_errors=True)
+
+    def reuse(self, query):
+        return command_history.find_reusable(query, 'input_2.mp4', 'mp4', ANALYSIS)
+
+    def test_tokenize_drops_filler_and_maps_synonyms(self):
+        self.assertEqual(command_history.tokenize('Please cut the first 5 seconds'), ['trim', 'first', '5', 'sec'])
+        self.assertEqual(command_history.tokenize('mute it'), ['remove', 'audio'])
+
+    def test_reworded_request_reuses_command(self):
+        command_history.record('scale to 720p', 'ffmpeg -i input_1.mp4 -vf scale=-2:720 output.mp4', 'input_1.mp4', ANALYSIS)
+        command, matched, score = self.reuse('make it 720p please')
+        self.assertEqual(command, 'ffmpeg -i input_2.mp4 -vf scale=-2:720 output.mp4')
+        self.assertEqual(matched, 'scale to 720p')
+
+    def test_opposite_verb_is_not_reused(self):
+        command_history.record('increase volume by 10 db', 'ffmpeg -i input_1.mp4 -af volume=10dB output.mp4', 'input_1.mp4', ANALYSIS)
+        self.assertIsNone(self.reuse('decrease volume by 10 db'))
+        self.assertIsNone(self.reuse('reduce volume by 10 db'))
+
+    def test_unseen_word_lowers_similarity(self):
+        command_history.record('increase volume by 10 db', 'ffmpeg -i input_1.mp4 -af volume=10dB output.mp4', 'input_1.mp4', ANALYSIS)
+        score = command_history._scored('decrease volume by 10 db')[0][0]
+        self.assertLess(score, command_history.DEFAULT_REUSE_THRESHOLD)
+
+    def test_different_edit_with_same_parameter_is_not_reused(self):
+        command_history.record('scale to 720p', 'ffmpeg -i input_1.mp4 -vf scale=-2:720 output.mp4', 'input_1.mp4', ANALYSIS)
+        self.assertIsNone(self.reuse('pad to 720p'))
+
+    def test_different_parameter_is_not_reused(self):
+        command_history.record('trim the first 5 seconds', 'ffmpeg -ss 5 -i input_1.mp4 -c copy output.mp4', 'input_1.mp4', ANALYSIS)
+        self.assertIsNone(self.reuse('trim the first 10 seconds'))
+
+    def test_find_examples_fills_in_input(self):
+        command_history.record('scale to 720p', 'ffmpeg -i input_1.mp4 -vf scale=-2:720 output.mp4', 'input_1.mp4', ANALYSIS)
+        examples = command_history.find_examples('scale to 720p and mute', 'input_3.mp4', limit=3)
+        self.assertEqual(examples, [('scale to 720p', 'ffmpeg -i input_3.mp4 -vf scale=-2:720 output.mp4')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from backend.command_optimizer import optimize_command
+
+ANALYSIS = {
+    'format': {'duration': 60.0},
+    'video_streams': [{'codec_name': 'h264', 'width': 1920, 'height': 1080}],
+    'audio_streams': [{'codec_name': 'aac'}],
+}
+
+
+def optimized(cmd):
+    return optimize_command(cmd, ANALYSIS)[0]
+
+
+class CommandOptimizerTest(unittest.TestCase):
+    def test_output_seek_moves_before_input_and_streams_are_copied(self):
+        command, rewrites = optimize_command('ffmpeg -i input.mp4 -ss 10 -t 5 output.mp4', ANALYSIS)
+        self.assertEqual(command, 'ffmpeg -ss 10 -i input.mp4 -t 5 -c:v copy -c:a copy -avoid_negative_ts make_zero output.mp4')
+        self.assertEqual(len(rewrites), 3)
+
+    def test_reencode_to_same_codec_becomes_copy(self):
+        self.assertEqual(optimized('ffmpeg -i input.mp4 -c:v libx264 -an output.mp4'),
+                         'ffmpeg -i input.mp4 -an -c:v copy output.mp4')
+
+    def test_filtered_stream_is_still_encoded(self):
+        self.assertEqual(optimized('ffmpeg -i input.mp4 -vf scale=-2:720 -c:a aac output.mp4'),
+                         'ffmpeg -i input.mp4 -vf scale=-2:720 -c:a copy output.mp4')
+
+    def test_seek_stays_after_input_for_time_based_filters(self):
+        self.assertTrue(optimized('ffmpeg -i input.mp4 -ss 10 -vf fade=in:0:30 output.mp4')
+                        .startswith('ffmpeg -i input.mp4 -ss 10 -vf fade=in:0:30'))
+
+    def test_unchanged_when_container_cannot_hold_the_codec(self):
+        cmd = 'ffmpeg -i input.mp4 -c:v libx264 -preset fast -c:a aac output.webm'
+        self.assertEqual(optimize_command(cmd, ANALYSIS), (cmd, []))
+
+    def test_multiple_inputs_are_left_alone(self):
+        cmd = 'ffmpeg -i input.mp4 -i assets/logo.png -filter_complex overlay output.mp4'
+        self.assertEqual(optimize_command(cmd, ANALYSIS), (cmd, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from backend import ffmpeg_locator, ffmpeg_runner
+
+# Writes a non-UTF-8 metadata line and more stderr than a pipe buffer holds, then reports progress;
+# quiet.mp4 and frames.mp4 outputs first report no position for 2.5s; long.mp4 ends at 10s
+FAKE_FFMPEG = '''#!{python}
+import sys
+import time
+if '-version' in sys.argv:
+    print('ffmpeg version fake')
+    sys.exit(0)
+sys.stderr.buffer.write(b'    title           : Caf\\xe9 del Mar\\n')
+for i in range(5000):
+    sys.stderr.buffer.write(b'frame=%d fps=25 q=28.0 size=1kB time=00:00:01.00\\n' % i)
+sys.stderr.flush()
+output = sys.argv[-1]
+if output in ('quiet.mp4', 'frames.mp4'):
+    # Nothing written for 2.5s (decoding up to a seek), or frames counting while the position is unknown
+    for i in range(12):
+        frame = i if output == 'frames.mp4' else 0
+        sys.stdout.write('frame=%d\\nout_time_us=N/A\\ntotal_size=0\\nprogress=continue\\n' % frame)
+        sys.stdout.flush()
+        time.sleep(0.2)
+position = 10000000 if output == 'long.mp4' else 2000000
+sys.stdout.write('out_time_us=%d\\nspeed=2.0x\\nprogress=end\\n' % position)
+'''
+
+
+class ProgressTrackerTest(unittest.TestCase):
+    def test_block_yields_percent_and_eta(self):
+        tracker = ffmpeg_runner.ProgressTracker(duration=10)
+        for line in ('frame=50', 'fps=25.0', 'out_time_us=2500000', 'speed=1.25x'):
+            self.assertIsNone(tracker.feed(line))
+        progress = tracker.feed('progress=continue')
+        self.assertEqual(progress['out_time'], 2.5)
+        self.assertEqual(progress['percent'], 25.0)
+        self.assertEqual(progress['eta'], 6.0)
+        self.assertEqual(progress['frame'], 50)
+
+    def test_unknown_values_and_end(self):
+        tracker = ffmpeg_runner.ProgressTracker(duration=10)
+        tracker.feed('out_time_us=N/A')
+        tracker.feed('out_time=00:00:04.000000')
+        tracker.feed('speed=N/A')
+        progress = tracker.feed('progress=end')
+        self.assertEqual(progress['out_time'], 4.0)
+        self.assertIsNone(progress['speed'])
+        self.assertEqual((progress['percent'], progress['eta']), (100.0, 0.0))
+
+    def test_parse_ffmpeg_time(self):
+        self.assertEqual(ffmpeg_runner.parse_ffmpeg_time('01:02:03.5'), 3723.5)
+        self.assertIsNone(ffmpeg_runner.parse_ffmpeg_time('N/A'))
+
+
+class StderrCaptureTest(unittest.TestCase):
+    def test_keeps_tail_and_error_lines(self):
+        capture = ffmpeg_runner.StderrCapture(tail_lines=3, max_error_lines=5)
+        lines = ['Invalid data found when processing input'] + [f'frame={i}' for i in range(10)]
+        capture.consume(io.StringIO('\n'.join(lines) + '\n'))
+        self.assertEqual(capture.total_lines, 11)
+        self.assertEqual(capture.text(), 'Invalid data found when processing input\n...\nframe=7\nframe=8\nframe=9')
+
+    def test_reader_failure_is_reported_and_pipe_drained(self):
+        raw = io.BytesIO(b'first line\n' + b'x' * 10000 + b'\n\xe9\n' + b'y' * 100000)
+        capture = ffmpeg_runner.StderrCapture()
+        stream = io.TextIOWrapper(raw, encoding='utf-8')
+        capture.consume(stream)
+        self.assertIn('UnicodeDecodeError', capture.failure)
+        self.assertIn('stderr reader failed', capture.text())
+        self.assertEqual(raw.tell(), len(raw.getvalue()))
+
+
+@unittest.skipIf(os.name == 'nt', 'uses a script as the FFmpeg executable')
+class FFmpegJobTest(unittest.TestCase):
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+        self.old_home = os.environ.get('HOME')
+        os.environ['HOME'] = self.home
+        self.workdir = os.path.join(self.home, 'project')
+        os.makedirs(self.workdir)
+        # A space in the path, as in "C:\\Program Files\\ffmpeg\\bin"
+        os.makedirs(os.path.join(self.home, 'My Tools'))
+        fake = os.path.join(self.home, 'My Tools', 'ffmpeg')
+        with open(fake, 'w') as f:
+            f.write(FAKE_FFMPEG.format(python=sys.executable))
+        os.chmod(fake, 0o755)
+        ffmpeg_locator._resolved['ffmpeg'] = {'path': fake, 'version': 'ffmpeg version fake'}
+
+    def tearDown(self):
+        ffmpeg_locator.invalidate()
+        if self.old_home is None:
+            del os.environ['HOME']
+        else:
+            os.environ['HOME'] = self.old_home
+        shutil.rmtree(self.home, ignore_errors=True)
+
+    def test_non_utf8_stderr_does_not_stop_the_job(self):
+        job = ffmpeg_runner.FFmpegJob('ffmpeg -i input.mp4 output.mp4', self.workdir, duration=2, stall_timeout=10)
+        result = job.run()
+        self.assertTrue(result['success'], result['stderr'])
+        self.assertEqual(result['progress']['percent'], 100.0)
+        with open(result['log_path'], encoding='utf-8') as f:
+            log = f.read()
+        self.assertIn('Caf� del Mar', log)
+        self.assertIn('frame=4999', log)
+        self.assertTrue(all(pipe.closed for pipe in (job.process.stdin, job.process.stdout, job.process.stderr)))
+
+    def test_stall_watchdog_kills_a_job_without_progress(self):
+        job = ffmpeg_runner.FFmpegJob('ffmpeg -i input.mp4 quiet.mp4', self.workdir, duration=2, stall_timeout=1)
+        self.assertTrue(job.run().get('stalled'))
+
+    def test_decoding_up_to_an_output_seek_is_not_a_stall(self):
+        for cmd in ('ffmpeg -i input.mp4 -ss 30 quiet.mp4', 'ffmpeg -i input.mp4 -vf trim=start=30 quiet.mp4'):
+            with self.subTest(cmd=cmd):
+                result = ffmpeg_runner.FFmpegJob(cmd, self.workdir, duration=2, stall_timeout=1).run()
+                self.assertTrue(result['success'], result['stderr'])
+
+    def test_advancing_frames_count_as_progress(self):
+        job = ffmpeg_runner.FFmpegJob('ffmpeg -i input.mp4 frames.mp4', self.workdir, duration=2, stall_timeout=1)
+        self.assertTrue(job.run()['success'])
+
+    def test_only_full_jobs_feed_the_speed_history(self):
+        cmd = 'ffmpeg -i input.mp4 -vf scale=-2:720 long.mp4'
+        ffmpeg_runner.FFmpegJob(cmd, self.workdir, duration=10, record_speed=False).run()
+        self.assertEqual(ffmpeg_runner._load_speed_history(), [])
+        ffmpeg_runner.FFmpegJob(cmd, self.workdir, duration=10).run()
+        self.assertEqual(len(ffmpeg_runner._load_speed_history()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from backend.intent_parser import atempo_chain, parse_intent
+
+ANALYSIS = {
+    'format': {'duration': 60.0},
+    'video_streams': [{'codec_name': 'h264', 'width': 1920, 'height': 1080}],
+    'audio_streams': [{'codec_name': 'aac'}],
+}
+SILENT = {
+    'format': {'duration': 60.0},
+    'video_streams': [{'codec_name': 'h264', 'width': 1920, 'height': 1080}],
+    'audio_streams': [],
+}
+
+
+def command(text, analysis=ANALYSIS):
+    result = parse_intent(text, 'input.mp4', 'mp4', analysis)
+    return result[0] if result else None
+
+
+class IntentParserTest(unittest.TestCase):
+    def test_trim_range_seeks_on_input(self):
+        self.assertEqual(command('Cut from 0:05 to 0:15'), 'ffmpeg -y -ss 5 -i input.mp4 -t 10 output.mp4')
+
+    def test_trim_is_clamped_to_duration(self):
+        self.assertEqual(command('keep the first 90 seconds'), 'ffmpeg -y -i input.mp4 -t 60 output.mp4')
+        self.assertIsNone(command('trim from 70 to 80'))
+
+    def test_mute_copies_video(self):
+        self.assertEqual(command('please remove the audio'), 'ffmpeg -y -i input.mp4 -c:v copy -an output.mp4')
+
+    def test_extract_audio(self):
+        self.assertEqual(command('extract audio as mp3'), 'ffmpeg -y -i input.mp4 -vn -c:a libmp3lame -q:a 2 output.mp3')
+
+    def test_scale_keeps_aspect_ratio(self):
+        self.assertEqual(command('scale to 720p'), 'ffmpeg -y -i input.mp4 -vf scale=-2:720 -c:a copy output.mp4')
+
+    def test_speed_changes_audio_tempo_too(self):
+        self.assertEqual(command('speed up 2x'), 'ffmpeg -y -i input.mp4 -vf setpts=PTS/2 -af atempo=2 output.mp4')
+        self.assertEqual(command('speed up 2x', SILENT), 'ffmpeg -y -i input.mp4 -vf setpts=PTS/2 -an output.mp4')
+        self.assertIn('setpts=PTS/0.5', command('half speed'))
+
+    def test_rotate_direction(self):
+        self.assertIn('transpose=1', command('rotate 90 degrees clockwise'))
+        self.assertIn('transpose=2', command('rotate 90 ccw'))
+
+    def test_atempo_chain_stays_within_filter_limits(self):
+        self.assertEqual(atempo_chain(1.5), 'atempo=1.5')
+        self.assertEqual(atempo_chain(4), 'atempo=2.0,atempo=2')
+        self.assertEqual(atempo_chain(0.25), 'atempo=0.5,atempo=0.5')
+
+    def test_other_requests_fall_through(self):
+        for text in ('add a logo in the corner', 'trim the boring part', 'scale to 720p and mute'):
+            with self.subTest(text=text):
+                self.assertIsNone(command(text))
+
+
+if __name__ == '__main__':
+    unittest.main()
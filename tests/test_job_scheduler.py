@@ -0,0 +1,39 @@
+import importlib.util
+import threading
+import unittest
+
+HAS_QT = importlib.util.find_spec('PyQt6') is not None
+if HAS_QT:
+    from backend import job_scheduler
+
+
+@unittest.skipUnless(HAS_QT, 'the job scheduler needs PyQt6')
+class JobSchedulerTest(unittest.TestCase):
+    def test_default_worker_count(self):
+        self.assertEqual(job_scheduler.default_worker_count(2), 1)
+        self.assertEqual(job_scheduler.default_worker_count(8), 2)
+        self.assertEqual(job_scheduler.default_worker_count(64), 4)
+
+    def test_lone_job_is_not_capped(self):
+        self.assertIsNone(job_scheduler.thread_budget(32, 1))
+        self.assertEqual(job_scheduler.thread_budget(32, 2), 16)
+        self.assertEqual(job_scheduler.thread_budget(2, 4), 1)
+
+    def test_failure_is_reported_and_finished_jobs_are_forgotten(self):
+        scheduler = job_scheduler.JobScheduler(max_workers=1)
+        failures, finished = [], threading.Event()
+        scheduler.job_failed.connect(lambda job_id, error: failures.append((job_id, error)))
+        scheduler.job_state_changed.connect(lambda job_id, state: state == job_scheduler.FAILED and finished.set())
+
+        def broken():
+            raise RuntimeError('boom')
+
+        job_id = scheduler.submit(broken)
+        self.assertTrue(finished.wait(5))
+        self.assertEqual(failures[0][0], job_id)
+        self.assertIn('RuntimeError: boom', failures[0][1])
+        self.assertIsNone(scheduler.state(job_id))
+
+
+if __name__ == '__main__':
+    unittest.main()
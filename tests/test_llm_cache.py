@@ -0,0 +1,65 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from backend import llm_cache
+
+
+class LlmCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+        self.old_home = os.environ.get('HOME')
+        os.environ['HOME'] = self.home
+        llm_cache._entries = None
+
+    def tearDown(self):
+        if self.old_home is None:
+            del os.environ['HOME']
+        else:
+            os.environ['HOME'] = self.old_home
+        llm_cache._entries = None
+        shutil.rmtree(self.home, ignore_errors=True)
+
+    def configure(self, **settings):
+        os.makedirs(os.path.join(self.home, '.video-editor-app'))
+        with open(os.path.join(self.home, '.video-editor-app', 'config.json'), 'w') as f:
+            json.dump(settings, f)
+
+    def key(self, query, ext='mp4'):
+        return llm_cache.make_key('Ollama', 'llama3', query, ext, 'h264 1920x1080')
+
+    def test_key_ignores_case_spacing_and_punctuation(self):
+        self.assertEqual(self.key('Scale  to 720p!'), self.key('scale to 720p'))
+        self.assertNotEqual(self.key('scale to 720p'), self.key('scale to 720p', ext='mov'))
+
+    def test_round_trip_fills_in_the_current_input(self):
+        key = self.key('mute')
+        llm_cache.store(key, 'ffmpeg -i input_1.mp4 -an output.mp4', 'input_1.mp4')
+        self.assertEqual(llm_cache.lookup(key, 'input_4.mp4'), 'ffmpeg -i input_4.mp4 -an output.mp4')
+        llm_cache.evict(key)
+        self.assertIsNone(llm_cache.lookup(key, 'input_4.mp4'))
+
+    def test_expired_entries_miss(self):
+        key = self.key('mute')
+        llm_cache.store(key, 'ffmpeg -i input_1.mp4 -an output.mp4', 'input_1.mp4')
+        llm_cache._entries[key]['created'] = time.time() - (llm_cache.DEFAULT_TTL_DAYS + 1) * 86400
+        self.assertIsNone(llm_cache.lookup(key, 'input_1.mp4'))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.configure(llm_cache_max_entries=2)
+        keys = [self.key(f'request {i}') for i in range(3)]
+        for key in keys:
+            llm_cache.store(key, 'ffmpeg -i input.mp4 output.mp4', 'input.mp4')
+            time.sleep(0.01)
+        self.assertEqual(set(llm_cache._entries), set(keys[1:]))
+
+    def test_disabled_cache_has_no_key(self):
+        self.configure(llm_cache=False)
+        self.assertIsNone(self.key('mute'))
+
+
+if __name__ == '__main__':
+    unittest.main()
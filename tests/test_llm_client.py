@@ -0,0 +1,120 @@
+import io
+import unittest
+
+import requests
+
+from backend import llm_client
+
+
+class FakeStream:
+    """Stands in for a streamed requests.Response"""
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.lines)
+
+
+def response(body, content_type):
+    """A real requests.Response streaming `body` as the server sent it"""
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.headers['Content-Type'] = content_type
+    resp.raw = io.BytesIO(body)
+    return resp
+
+
+def deltas(provider, lines):
+    stats = {}
+    text = ''.join(llm_client._stream_deltas(provider, FakeStream(lines), stats))
+    return text, stats
+
+
+class StreamDeltasTest(unittest.TestCase):
+    def test_ollama_ndjson(self):
+        text, stats = deltas('Ollama', [
+            '{"response": "ffmpeg -i in.mp4", "done": false}',
+            '{"response": " out.mp4", "done": true, "prompt_eval_count": 12, "eval_count": 5}',
+        ])
+        self.assertEqual(text, 'ffmpeg -i in.mp4 out.mp4')
+        self.assertEqual((stats['prompt_tokens'], stats['completion_tokens']), (12, 5))
+
+    def test_ollama_ndjson_bytes_without_charset(self):
+        body = ('{"response": "ffmpeg -i in.mp4 -vf \\"drawtext=text=caf\u00e9\\"", "done": false}\n'
+                '{"response": " out.mp4", "done": true}\n').encode('utf-8')
+        resp = response(body, 'application/x-ndjson')
+        text = ''.join(llm_client._stream_deltas('Ollama', resp, {}))
+        self.assertEqual(text, 'ffmpeg -i in.mp4 -vf "drawtext=text=caf\u00e9" out.mp4')
+
+    def test_sse_bytes_without_charset(self):
+        body = b'data: {"content": "ffmpeg -i a.mp4 b.mp4", "stop": false}\n\ndata: {"content": "", "stop": true}\n\n'
+        resp = response(body, 'text/event-stream')
+        self.assertEqual(''.join(llm_client._stream_deltas('Ollama', resp, {})), 'ffmpeg -i a.mp4 b.mp4')
+
+    def test_llama_cpp_sse(self):
+        text, _ = deltas('Ollama', [
+            'data: {"content": "ffmpeg -i in.mp4", "stop": false}',
+            '',
+            'data: {"content": " out.mp4", "stop": false}',
+            'data: {"content": "", "stop": true}',
+            'data: {"content": "ignored", "stop": false}',
+        ])
+        self.assertEqual(text, 'ffmpeg -i in.mp4 out.mp4')
+
+    def test_openai_compatible_completions_sse(self):
+        text, stats = deltas('Ollama', [
+            ': keep-alive',
+            'data: {"choices": [{"text": "ffmpeg -i in.mp4"}]}',
+            'data: {"choices": [{"text": " out.mp4"}], "usage": {"prompt_tokens": 7, "completion_tokens": 3}}',
+            'data: [DONE]',
+        ])
+        self.assertEqual(text, 'ffmpeg -i in.mp4 out.mp4')
+        self.assertEqual(stats['prompt_tokens'], 7)
+
+    def test_openai_chat_sse(self):
+        text, _ = deltas('OpenAI', [
+            'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+            'data: {"choices": [{"delta": {"content": "ffmpeg -i in.mp4 out.mp4"}}]}',
+            'data: [DONE]',
+        ])
+        self.assertEqual(text, 'ffmpeg -i in.mp4 out.mp4')
+
+    def test_claude_sse(self):
+        text, _ = deltas('Claude', [
+            'event: content_block_delta',
+            'data: {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "ffmpeg -i a.mp4 b.mp4"}}',
+            'data: {"type": "message_stop"}',
+        ])
+        self.assertEqual(text, 'ffmpeg -i a.mp4 b.mp4')
+
+
+class BuildRequestTest(unittest.TestCase):
+    def test_ollama_generate_sends_static_system_prefix_only(self):
+        url, payload, _, _ = llm_client._build_request('SYSTEM', 'request', 'http://localhost:11434/api/generate',
+                                                       'llama3', 'Ollama', None)
+        self.assertEqual((payload['system'], payload['prompt']), ('SYSTEM', 'request'))
+        self.assertNotIn('context', payload)
+
+    def test_claude_sends_static_system_prefix_only(self):
+        _, payload, _, _ = llm_client._build_request('SYSTEM', 'request', 'https://api.anthropic.com/v1/messages',
+                                                     'claude', 'Claude', 'key')
+        self.assertEqual(payload['system'], 'SYSTEM')
+        self.assertEqual(payload['messages'], [{'role': 'user', 'content': 'request'}])
+
+
+class ExtractCommandTest(unittest.TestCase):
+    def test_skips_reasoning_and_prose(self):
+        raw = '<think>maybe ffmpeg -i x</think>\nHere you go:\nffmpeg -i input.mp4 -an output.mp4\n'
+        self.assertEqual(llm_client._extract_command(raw), 'ffmpeg -i input.mp4 -an output.mp4')
+
+    def test_constrained_json(self):
+        self.assertEqual(llm_client._extract_command('{"command": "ffmpeg -i input.mp4 output.webm"}'),
+                         'ffmpeg -i input.mp4 output.webm')
+
+    def test_no_command(self):
+        self.assertIsNone(llm_client._extract_command('I cannot help with that.'))
+
+
+if __name__ == '__main__':
+    unittest.main()
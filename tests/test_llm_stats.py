@@ -0,0 +1,35 @@
+import unittest
+
+from backend import llm_stats
+
+
+def call(latency, validated=True, **extra):
+    return dict({'provider': 'Ollama', 'model': 'llama3', 'latency': latency, 'ttft': latency and latency / 2,
+                 'validated': validated, 'prompt_tokens': 100, 'cached_tokens': 0}, **extra)
+
+
+class SummarizeTest(unittest.TestCase):
+    def test_percentiles_and_validation_rate(self):
+        records = [call(t) for t in (1, 2, 3, 4)] + [call(9, validated=False)]
+        summary = llm_stats.summarize(records)['Ollama/llama3']
+        self.assertEqual(summary['calls'], 5)
+        self.assertEqual(summary['p50_latency'], 3)
+        self.assertEqual(summary['p95_latency'], 9)
+        self.assertEqual(summary['valid_rate'], 0.8)
+
+    def test_errors_and_cancelled_calls(self):
+        records = [call(1), call(None, validated=False, error='timeout'), call(5, cancelled=True)]
+        summary = llm_stats.summarize(records)['Ollama/llama3']
+        self.assertEqual((summary['calls'], summary['errors']), (2, 1))
+        self.assertEqual(summary['p95_latency'], 1)
+
+    def test_format_summary_lists_fastest_first_with_cache_share(self):
+        records = [call(5, provider='OpenAI', model='gpt', cached_tokens=50), call(1)]
+        lines = llm_stats.format_summary(llm_stats.summarize(records)).splitlines()
+        self.assertTrue(lines[0].startswith('Ollama/llama3: p50 1.0s'))
+        self.assertIn('50% of prompt tokens cached', lines[1])
+        self.assertEqual(llm_stats.format_summary({}), 'No LLM calls recorded yet.')
+
+
+if __name__ == '__main__':
+    unittest.main()
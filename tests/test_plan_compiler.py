@@ -0,0 +1,46 @@
+import unittest
+
+from backend.plan_compiler import compile_plan, parse_plan
+
+ANALYSIS = {
+    'format': {'duration': 60.0},
+    'video_streams': [{'codec_name': 'h264', 'width': 1920, 'height': 1080}],
+    'audio_streams': [{'codec_name': 'aac'}],
+}
+
+
+class PlanCompilerTest(unittest.TestCase):
+    def test_parse_plan_ignores_fences_and_reasoning(self):
+        self.assertEqual(parse_plan('<think>hmm {}</think>```json\n{"speed": 2}\n```'), {'speed': 2})
+        self.assertIsNone(parse_plan('no plan here'))
+
+    def test_trim_copies_streams_with_input_seek(self):
+        self.assertEqual(compile_plan({'trim': {'start': 5, 'end': 15}}, 'input.mp4', ANALYSIS),
+                         'ffmpeg -y -ss 5 -t 10 -i input.mp4 -c:v copy -c:a copy -avoid_negative_ts make_zero output.mp4')
+
+    def test_trim_duration_is_taken_before_speed_change(self):
+        command = compile_plan({'trim': {'start': '10', 'end': '20'}, 'speed': 0.5}, 'input.mp4', ANALYSIS)
+        self.assertTrue(command.startswith('ffmpeg -y -ss 10 -t 10 -i input.mp4 '))
+        self.assertIn('-vf setpts=PTS/0.5', command)
+        self.assertIn('-af atempo=0.5', command)
+        self.assertNotIn('-t 10 -vf', command)
+
+    def test_scale_reencodes_video_and_copies_audio(self):
+        self.assertEqual(compile_plan({'scale': {'height': 720}}, 'input.mp4', ANALYSIS),
+                         'ffmpeg -y -i input.mp4 -vf scale=-2:720 -c:v libx264 -preset veryfast -crf 23 '
+                         '-pix_fmt yuv420p -c:a copy output.mp4')
+
+    def test_audio_only_output(self):
+        self.assertEqual(compile_plan({'output': {'format': 'mp3'}}, 'input.mp4', ANALYSIS),
+                         'ffmpeg -y -i input.mp4 -vn -c:a libmp3lame -q:a 2 output.mp3')
+
+    def test_invalid_plans_raise(self):
+        for plan in ({'trim': {'start': 70}}, {'speed': 50}, {'rotate': 90}, {'unsupported': True},
+                     {'trim': {'start': 10, 'end': 5}}, {'scale': {'width': 0}}):
+            with self.subTest(plan=plan):
+                with self.assertRaises(ValueError):
+                    compile_plan(plan, 'input.mp4', ANALYSIS)
+
+
+if __name__ == '__main__':
+    unittest.main()
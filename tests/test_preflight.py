@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from backend import preflight
+
+
+class BuildCommandTest(unittest.TestCase):
+    def test_limits_input_and_redirects_output(self):
+        self.assertEqual(preflight.build_command('ffmpeg -y -i input.mp4 -vf scale=-2:720 output.mp4', 'scratch.mp4'),
+                         'ffmpeg -y -t 2 -i input.mp4 -vf scale=-2:720 scratch.mp4')
+
+    def test_longer_input_duration_is_shortened(self):
+        self.assertEqual(preflight.build_command('ffmpeg -ss 10 -t 30 -i input.mp4 -c copy output.mp4', 'scratch.mp4'),
+                         'ffmpeg -ss 10 -t 2 -i input.mp4 -c copy scratch.mp4')
+
+    def test_every_input_is_limited_and_shorter_limits_kept(self):
+        self.assertEqual(
+            preflight.build_command('ffmpeg -t 1 -i input.mp4 -i assets/logo.png -filter_complex overlay output.mp4', 'scratch.mp4'),
+            'ffmpeg -t 1 -i input.mp4 -t 2 -i assets/logo.png -filter_complex overlay scratch.mp4')
+
+    def test_command_without_output_is_rejected(self):
+        with self.assertRaises(ValueError):
+            preflight.build_command('ffmpeg -i input.mp4', 'scratch.mp4')
+
+
+class ShouldPreflightTest(unittest.TestCase):
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+        self.old_home = os.environ.get('HOME')
+        os.environ['HOME'] = self.home
+
+    def tearDown(self):
+        if self.old_home is None:
+            del os.environ['HOME']
+        else:
+            os.environ['HOME'] = self.old_home
+        shutil.rmtree(self.home, ignore_errors=True)
+
+    def test_only_long_sources_are_checked(self):
+        self.assertTrue(preflight.should_preflight('ffmpeg -i input.mp4 output.mp4', 600))
+        self.assertFalse(preflight.should_preflight('ffmpeg -i input.mp4 output.mp4', 10))
+        self.assertFalse(preflight.should_preflight('ffmpeg -i input.mp4 output.mp4', None))
+
+
+if __name__ == '__main__':
+    unittest.main()
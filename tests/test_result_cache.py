@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from backend import result_cache
+
+
+class FileHashTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def write(self, name, data):
+        path = os.path.join(self.dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_same_content_at_another_path_matches(self):
+        data = os.urandom(3 * result_cache.HASH_BLOCK_SIZE)
+        self.assertEqual(result_cache.file_hash(self.write('input_1.mp4', data)),
+                         result_cache.file_hash(self.write('copy.mp4', data)))
+
+    def test_same_size_files_differing_anywhere_do_not_match(self):
+        size = 5 * result_cache.HASH_BLOCK_SIZE
+        base = result_cache.file_hash(self.write('base.wav', bytes(size)))
+        for offset in (result_cache.HASH_BLOCK_SIZE + 17, size // 3, size - result_cache.HASH_BLOCK_SIZE - 1):
+            changed = bytearray(size)
+            changed[offset] = 1
+            with self.subTest(offset=offset):
+                self.assertNotEqual(base, result_cache.file_hash(self.write(f'changed_{offset}.wav', bytes(changed))))
+
+    def test_rewritten_file_is_hashed_again(self):
+        path = self.write('input.mp4', b'first')
+        first = result_cache.file_hash(path)
+        mtime_ns = os.stat(path).st_mtime_ns
+        self.write('input.mp4', b'other')
+        os.utime(path, ns=(mtime_ns + 1000, mtime_ns + 1000))
+        self.assertNotEqual(first, result_cache.file_hash(path))
+
+    def test_unchanged_file_is_not_read_again(self):
+        path = self.write('input.mp4', b'content')
+        first = result_cache.file_hash(path)
+        with mock.patch('builtins.open', side_effect=AssertionError('file read again')):
+            self.assertEqual(first, result_cache.file_hash(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
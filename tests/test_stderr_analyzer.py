@@ -0,0 +1,44 @@
+import unittest
+
+from backend.stderr_analyzer import distill_stderr
+
+STDERR = """ffmpeg version 6.1 Copyright (c) 2000-2023 the FFmpeg developers
+  built with Apple clang version 15.0.0
+  configuration: --enable-gpl --enable-libx264
+  libavutil      58. 29.100 / 58. 29.100
+Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'input.mp4':
+  Metadata:
+    major_brand     : isom
+  Duration: 00:01:00.00, start: 0.000000, bitrate: 1000 kb/s
+  Stream #0:0[0x1](und): Video: h264 (High), yuv420p, 1920x1080, 25 fps
+[Parsed_scale_0 @ 0x600001a2c000] Invalid size 'abc'
+[AVFilterGraph @ 0x600001a2c0c0] Error initializing filter 'scale' with args 'abc'
+Error reinitializing filters!
+Unrecognized option 'crf2'.
+Error splitting the argument list: Option not found
+"""
+
+
+class DistillStderrTest(unittest.TestCase):
+    def test_keeps_errors_and_names_filters_and_options(self):
+        digest = distill_stderr(STDERR)
+        self.assertNotIn('ffmpeg version', digest)
+        self.assertNotIn('Stream #0:0', digest)
+        self.assertIn("[Parsed_scale_0] Invalid size 'abc'", digest)
+        self.assertIn('Failing filters: scale', digest)
+        self.assertIn('Offending options/values: crf2', digest)
+
+    def test_respects_the_size_budget(self):
+        stderr = '\n'.join(f'Error number {i} while processing' for i in range(200))
+        self.assertLessEqual(len(distill_stderr(stderr, max_chars=300)), 300)
+
+    def test_runner_messages_are_kept(self):
+        digest = distill_stderr('FFmpeg stalled: no progress for 120s (last position 0:00:10, speed N/A).\n...\nframe=  250 fps=25 q=28.0 size=1kB time=00:00:10.00 bitrate=1kbits/s')
+        self.assertEqual(digest, 'FFmpeg stalled: no progress for 120s (last position 0:00:10, speed N/A).')
+
+    def test_falls_back_to_last_lines_without_errors(self):
+        self.assertEqual(distill_stderr('ffmpeg version 6.1\nsomething odd happened'), 'something odd happened')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,214 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QFileDialog,
+                             QTableWidget, QTableWidgetItem, QProgressBar, QHeaderView, QAbstractItemView)
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtGui import QFont
+import os
+from backend import batch_runner, job_scheduler, config
+
+STATE_LABELS = {
+    job_scheduler.QUEUED: "Queued",
+    job_scheduler.RUNNING: "Running",
+    job_scheduler.DONE: "Done",
+    job_scheduler.FAILED: "Failed",
+    job_scheduler.CANCELLED: "Cancelled",
+}
+
+
+class BatchDialog(QDialog):
+    """Apply one instruction to many files, with per-file progress and retry"""
+    item_updated = pyqtSignal(int)          # Emitted from worker threads when a file's state changes
+    template_resolved = pyqtSignal(bool, str)  # (ok, source or error)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.files = []
+        self.assets = []
+        self.runner = None
+        app_config = config.get_config()
+        self.output_dir = app_config.get('export_dir') or os.path.expanduser('~')
+
+        self.setWindowTitle("Batch Edit")
+        self.setMinimumSize(720, 480)
+        self.setObjectName("BatchDialog")
+        self.setup_ui()
+        self.item_updated.connect(self._refresh_row)
+        self.template_resolved.connect(self._on_template_resolved)
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(24, 24, 24, 24)
+        layout.setSpacing(12)
+
+        title = QLabel("Batch Edit")
+        title.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+        layout.addWidget(title)
+
+        label_instruction = QLabel("Instruction (applied to every file):")
+        label_instruction.setObjectName("SettingsLabel")
+        layout.addWidget(label_instruction)
+        self.instruction = QLineEdit()
+        self.instruction.setObjectName("BatchInstructionInput")
+        self.instruction.setPlaceholderText("e.g. add the watermark in the top right corner and scale to 1080p")
+        layout.addWidget(self.instruction)
+
+        file_row = QHBoxLayout()
+        self.add_files_btn = QPushButton("Add Files...")
+        self.add_files_btn.clicked.connect(self.add_files)
+        file_row.addWidget(self.add_files_btn)
+        self.add_asset_btn = QPushButton("Add Asset...")
+        self.add_asset_btn.setToolTip("Images or audio the instruction refers to (e.g. a watermark)")
+        self.add_asset_btn.clicked.connect(self.add_asset)
+        file_row.addWidget(self.add_asset_btn)
+        self.output_btn = QPushButton("Output Folder...")
+        self.output_btn.clicked.connect(self.choose_output_dir)
+        file_row.addWidget(self.output_btn)
+        file_row.addStretch(1)
+        layout.addLayout(file_row)
+
+        self.assets_label = QLabel("")
+        self.assets_label.setObjectName("BatchDetailsLabel")
+        layout.addWidget(self.assets_label)
+        self.output_label = QLabel(f"Output: {self.output_dir}")
+        self.output_label.setObjectName("BatchDetailsLabel")
+        layout.addWidget(self.output_label)
+
+        self.table = QTableWidget(0, 3)
+        self.table.setObjectName("BatchFileTable")
+        self.table.setHorizontalHeaderLabels(["File", "Status", "Progress"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table, stretch=1)
+
+        self.status_label = QLabel("Add files and an instruction to start.")
+        self.status_label.setObjectName("BatchDetailsLabel")
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+
+        btn_row = QHBoxLayout()
+        btn_row.addStretch(1)
+        self.start_btn = QPushButton("Start")
+        self.start_btn.setObjectName("SaveSettingsButton")
+        self.start_btn.clicked.connect(self.start)
+        btn_row.addWidget(self.start_btn)
+        self.retry_btn = QPushButton("Retry Selected")
+        self.retry_btn.setToolTip("Ask the LLM to correct the command for the selected failed files and run them again")
+        self.retry_btn.clicked.connect(self.retry_selected)
+        self.retry_btn.setEnabled(False)
+        btn_row.addWidget(self.retry_btn)
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setObjectName("CancelSettingsButton")
+        self.cancel_btn.clicked.connect(self.cancel)
+        self.cancel_btn.setEnabled(False)
+        btn_row.addWidget(self.cancel_btn)
+        self.close_btn = QPushButton("Close")
+        self.close_btn.clicked.connect(self.close)
+        btn_row.addWidget(self.close_btn)
+        layout.addLayout(btn_row)
+
+    def add_files(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "Select Videos", "", "Videos (*.mp4 *.mov *.avi *.mkv *.webm *.flv *.wmv *.m4v);;All Files (*)")
+        for path in paths:
+            if path in self.files:
+                continue
+            self.files.append(path)
+            row = self.table.rowCount()
+            self.table.insertRow(row)
+            self.table.setItem(row, 0, QTableWidgetItem(os.path.basename(path)))
+            self.table.setItem(row, 1, QTableWidgetItem(""))
+            bar = QProgressBar()
+            bar.setRange(0, 100)
+            bar.setObjectName("FfmpegProgressBar")
+            self.table.setCellWidget(row, 2, bar)
+
+    def add_asset(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Select Asset")
+        if path and path not in self.assets:
+            self.assets.append(path)
+            self.assets_label.setText("Assets: " + ", ".join(f"assets/{os.path.basename(p)}" for p in self.assets))
+
+    def choose_output_dir(self):
+        path = QFileDialog.getExistingDirectory(self, "Select Output Folder", self.output_dir)
+        if path:
+            self.output_dir = path
+            self.output_label.setText(f"Output: {self.output_dir}")
+
+    def _set_running(self, running):
+        for widget in (self.start_btn, self.add_files_btn, self.add_asset_btn, self.output_btn, self.instruction):
+            widget.setEnabled(not running)
+        self.cancel_btn.setEnabled(running)
+
+    def start(self):
+        instruction = self.instruction.text().strip()
+        if not instruction or not self.files:
+            self.status_label.setText("Add at least one file and an instruction.")
+            return
+        self.runner = batch_runner.BatchRunner(self.files, instruction, self.output_dir, self.assets,
+                                               on_update=self.item_updated.emit)
+        self._set_running(True)
+        self.status_label.setText("Resolving the instruction to a command template...")
+        job_scheduler.get_scheduler().submit(self._resolve_template, name="batch-template")
+
+    def _resolve_template(self):
+        try:
+            ok, message = self.runner.resolve_template()
+        except Exception as e:
+            ok, message = False, str(e)
+        self.template_resolved.emit(ok, message)
+
+    def _on_template_resolved(self, ok, message):
+        if self.runner.cancelled:
+            self.status_label.setText("Cancelled.")
+            self._set_running(False)
+            return
+        if not ok:
+            self.status_label.setText(f"Could not build a command: {message}")
+            self._set_running(False)
+            return
+        if self.runner.template == batch_runner.INPUT_PLACEHOLDER:
+            self.status_label.setText(f"Handled {message}: commands are built per file without the LLM.")
+        else:
+            command = self.runner.template.replace(batch_runner.INPUT_PLACEHOLDER, '<file>')
+            self.status_label.setText(f"Command from {message} (one request for all files): {command}")
+        self.runner.start()
+
+    def _refresh_row(self, index):
+        item = self.runner.items[index]
+        status = STATE_LABELS.get(item['state'], item['state'])
+        if item['state'] == job_scheduler.FAILED and item['error']:
+            status += f": {item['error'].strip().splitlines()[-1][:120] if item['error'].strip() else ''}"
+        status_item = QTableWidgetItem(status)
+        status_item.setToolTip(item['error'] or item['output'] or item['command'] or '')
+        self.table.setItem(index, 1, status_item)
+        self.table.cellWidget(index, 2).setValue(item['percent'])
+        failed = [i for i in self.runner.items if i['state'] in (job_scheduler.FAILED, job_scheduler.CANCELLED)]
+        self.retry_btn.setEnabled(bool(failed))
+        if self.runner.is_finished():
+            done = sum(1 for i in self.runner.items if i['state'] == job_scheduler.DONE)
+            self.status_label.setText(f"Finished: {done}/{len(self.runner.items)} files written to {self.output_dir}."
+                                      + (f" {len(failed)} failed; select them and press Retry." if failed else ""))
+            self._set_running(False)
+            self.close_btn.setEnabled(True)
+
+    def retry_selected(self):
+        rows = sorted({index.row() for index in self.table.selectionModel().selectedRows()})
+        if not rows:
+            rows = [i for i, item in enumerate(self.runner.items) if item['state'] in (job_scheduler.FAILED, job_scheduler.CANCELLED)]
+        for row in rows:
+            self.runner.retry(row)
+        # Rows that were not failed are skipped, so there may be nothing to cancel
+        self._set_running(not self.runner.is_finished())
+
+    def cancel(self):
+        if self.runner:
+            self.runner.cancel()
+        self.status_label.setText("Cancelling...")
+
+    def closeEvent(self, event):
+        if self.runner and not self.runner.is_finished():
+            self.runner.cancel()
+        elif self.runner:
+            # Failed files can no longer be retried once the dialog is gone
+            self.runner.cleanup()
+        super().closeEvent(event)
@@ -5,6 +5,7 @@ from PyQt6.QtWidgets import QStyle
 from PyQt6.QtGui import QShortcut, QKeySequence
 import os
 import time
+import re
 from PyQt6.QtWidgets import QPushButton, QLineEdit, QProgressBar
 from PyQt6.QtCore import pyqtSignal,QThread
 import yt_dlp
@@ -12,7 +13,7 @@ import threading
 from backend import project_manager, thumbnailer, video_analyzer
 from ui.checkpoint_dialog import CheckpointDialog
 from backend.icon_utils import load_app_icon
-from backend import llm_client, ffmpeg_runner
+from backend import llm_client, llm_cache, command_history, intent_parser, preflight, http_client, ffmpeg_runner, ffmpeg_locator, job_scheduler, chunked_encoder, result_cache, command_optimizer
 import threading
 from ui.settings_dialog import SettingsDialog
 from backend import config
@@ -529,6 +530,7 @@ class YouTubeDownloader(QThread):
                 print(f"[WARNING] Ignoring additional download #{self._download_count}")
 class MainWindow(QMainWindow):
     process_result_ready = pyqtSignal(dict)
+    ffmpeg_progress = pyqtSignal(dict)
 
     def __init__(self):
         super().__init__()
@@ -720,6 +722,15 @@ class MainWindow(QMainWindow):
         self.chat_log.setContentsMargins(0, 0, 0, 0)
         self.terminal_layout.addWidget(self.chat_log, stretch=1)
         
+        # FFmpeg progress (shown only while a command is running)
+        self.ffmpeg_progress_bar = QProgressBar()
+        self.ffmpeg_progress_bar.setObjectName("FfmpegProgressBar")
+        self.ffmpeg_progress_bar.setRange(0, 100)
+        self.ffmpeg_progress_bar.setValue(0)
+        self.ffmpeg_progress_bar.setMinimumHeight(22)
+        self.ffmpeg_progress_bar.hide()
+        self.terminal_layout.addWidget(self.ffmpeg_progress_bar)
+        
         # Add both widgets to the splitter
         self.main_content_splitter.addWidget(self.video_player_widget)
         self.main_content_splitter.addWidget(self.terminal_widget)
@@ -896,6 +907,16 @@ class MainWindow(QMainWindow):
         self.send_btn.setCursor(Qt.CursorShape.PointingHandCursor)
         button_layout.addWidget(self.send_btn)
         
+        # Cancel button (replaces send while a command is running)
+        self.cancel_btn = QPushButton("■")
+        self.cancel_btn.setObjectName("ChatCancelButton")
+        self.cancel_btn.setFixedSize(32, 32)
+        self.cancel_btn.setToolTip("Cancel running command")
+        self.cancel_btn.clicked.connect(self.cancel_current_command)
+        self.cancel_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.cancel_btn.hide()
+        button_layout.addWidget(self.cancel_btn)
+        
         input_layout.addWidget(button_footer)
         
         chat_layout.addWidget(self.action_separator)  # Add separator above action buttons
@@ -911,8 +932,16 @@ class MainWindow(QMainWindow):
         self.processed_path_file = None
         self.pending_attachments = []  # list of dicts: {name, type, abs_path, rel_path}
         self.input_video_analysis = None  # Cache for input video analysis
+        self._current_job = None  # Running FFmpegJob, if any
+        self._cancel_event = threading.Event()
+        self._job_ids = set()  # Scheduler jobs submitted by this window
+        self.scheduler = job_scheduler.get_scheduler()
+        self.scheduler.job_state_changed.connect(self.on_job_state_changed)
+        self.scheduler.job_failed.connect(self.on_job_failed)
         self.process_result_ready.connect(self.on_process_result_ready)
+        self.ffmpeg_progress.connect(self.on_ffmpeg_progress)
         self.refresh_project_list()
+        self.warm_up_llm()
         splitter.addWidget(self.main_area)  # <-- Ensure main area is visible
         splitter.setStretchFactor(0, 0)
         splitter.setStretchFactor(1, 1)
@@ -1058,6 +1087,7 @@ class MainWindow(QMainWindow):
         merge_dialog = MergeProgressDialog(file_paths, output_path, self)
         merge_dialog.merge_completed.connect(self._on_merge_completed)
         merge_dialog.merge_failed.connect(self._on_merge_failed)
+        merge_dialog.merge_cancelled.connect(self._on_merge_cancelled)
         merge_dialog.exec()
     
     def _on_merge_completed(self, output_path):
@@ -1092,6 +1122,18 @@ class MainWindow(QMainWindow):
         self.processed_path_file = None
         self.input_video_analysis = None
 
+    def _on_merge_cancelled(self):
+        """Handle a cancelled video merge by discarding the half-created project"""
+        if self.project_dir and os.path.isdir(self.project_dir):
+            import shutil
+            shutil.rmtree(self.project_dir, ignore_errors=True)
+        self.project_dir = None
+        self.input_path = None
+        self.input_ext = None
+        self.processed_path_file = None
+        self.input_video_analysis = None
+        self.refresh_project_list()
+
     def download_youtube_video(self):
         url = self.youtube_input.text().strip()
         if not url:
@@ -1414,15 +1456,65 @@ class MainWindow(QMainWindow):
         self.append_chat_log("User", user_text)
         self.chat_input.clear()
         self.chat_input.setDisabled(True)
+        self._cancel_event.clear()
+        self.send_btn.hide()
+        self.cancel_btn.setEnabled(True)
+        self.cancel_btn.show()
         self.append_chat_log("Processing", "Analyzing your request...")
         # Run in background thread to keep UI responsive
-        threading.Thread(target=self.process_command, args=(user_text,), daemon=True).start()
+        self._submit_job(self.process_command, user_text)
+
+    def warm_up_llm(self):
+        """Load the local Ollama model in the background so the first command does not pay for it"""
+        if self.app_config.get("provider", "Ollama") != 'Ollama':
+            return
+        endpoint = self.app_config.get("llm_endpoint", "http://localhost:11434/api/generate")
+        model = self.app_config.get("llm_model", "llama3")
+        threading.Thread(target=llm_client.warm_up_ollama, args=(endpoint, model), daemon=True).start()
+
+    def _submit_job(self, fn, *args):
+        """Run fn on the shared job scheduler instead of a dedicated thread"""
+        job_id = self.scheduler.submit(fn, *args)
+        self._job_ids.add(job_id)
+        return job_id
+
+    def on_job_state_changed(self, job_id, state):
+        """Report scheduler state for this window's jobs (called on the main thread via signal)"""
+        if job_id not in self._job_ids:
+            return
+        print(f"[INFO] Job {job_id}: {state}")
+        if state == job_scheduler.QUEUED and self.scheduler.running_count() >= self.scheduler.max_workers:
+            self.append_chat_log("Processing", "Waiting for a running job to finish...")
+        elif state in (job_scheduler.DONE, job_scheduler.FAILED, job_scheduler.CANCELLED):
+            self._job_ids.discard(job_id)
+
+    def on_job_failed(self, job_id, error):
+        """Show an unexpected exception from one of this window's jobs"""
+        if job_id not in self._job_ids:
+            return
+        print(f"[ERROR] Job {job_id} raised:\n{error}")
+        self.append_chat_log("Error", f"Background job failed: {error.strip().splitlines()[-1]}")
+        self.enable_chat_input()
+
+    def cancel_current_command(self):
+        """Stop the running command; process_command reports the cancellation"""
+        self._cancel_event.set()
+        self.cancel_btn.setEnabled(False)
+        job = self._current_job
+        if job:
+            job.cancel()
+        self.append_chat_log("Warning", "Cancelling command...")
 
     def open_settings(self):
         dlg = SettingsDialog(self.app_config, self)
         dlg.settings_saved.connect(self.save_settings)
         dlg.exec()
 
+    def open_batch_dialog(self):
+        from ui.batch_dialog import BatchDialog
+        dlg = BatchDialog(self)
+        dlg.exec()
+
     def open_help(self):
         """Open the help/about dialog"""
         from ui.about_dialog import AboutDialog
@@ -1504,8 +1596,14 @@ class MainWindow(QMainWindow):
         self.append_chat_log("Success", f"Restored to Checkpoint {checkpoint_num}. Ready for new commands.")
 
     def save_settings(self, settings):
-        self.app_config = settings
-        config.save_config(settings)
+        # Merge so options that are not shown in the dialog are kept
+        self.app_config = {**self.app_config, **settings}
+        config.save_config(self.app_config)
+        # The FFmpeg path may have changed
+        ffmpeg_locator.invalidate()
+        # Reopen provider connections with the current pool size
+        http_client.close_all()
+        self.warm_up_llm()
         self.append_chat_log("Success", "Settings updated.")
 
     def update_processed_video(self, video_path):
@@ -1619,6 +1717,10 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "Export Failed", str(e))
 
     def process_command(self, user_text, retry_count=0):
+        # A leading "!" skips local handling and command reuse, and always asks the LLM
+        force_llm = user_text.startswith('!')
+        if force_llm:
+            user_text = user_text[1:].strip()
         # Use config values
         print(f"[INFO] User command: {user_text} (retry #{retry_count})")
         provider = self.app_config.get("provider", "Ollama")
@@ -1628,6 +1730,8 @@ class MainWindow(QMainWindow):
         ffmpeg_path = self.app_config.get("ffmpeg_path", "ffmpeg")
         
         # Create checkpoint before processing (only on first attempt)
+        if retry_count == 0:
+            self._checkpoint_num = None
         if retry_count == 0 and self.project_dir and self.input_path:
             try:
                 checkpoint_num = project_manager.create_checkpoint(
@@ -1636,6 +1740,7 @@ class MainWindow(QMainWindow):
                     f"Before: {user_text[:50]}{'...' if len(user_text) > 50 else ''}", 
                     user_text
                 )
+                self._checkpoint_num = checkpoint_num
                 print(f"[INFO] Created checkpoint {checkpoint_num} before processing")
             except Exception as e:
                 print(f"[WARNING] Failed to create checkpoint: {e}")
@@ -1689,20 +1794,45 @@ class MainWindow(QMainWindow):
                     attachment_video_info=attachment_video_info if attachment_video_info else None
                 )
             else:
-                self.append_chat_log("Processing", "Generating FFmpeg command...")
-                # First attempt - use normal function
-                ffmpeg_cmd = llm_client.get_ffmpeg_command(
-                    user_text,
-                    input_filename,
-                    self.input_ext,
-                    endpoint,
-                    model,
-                    provider,
-                    api_key,
-                    attachments=attachments_payload,
-                    input_video_info=input_video_info,
-                    attachment_video_info=attachment_video_info if attachment_video_info else None
-                )
+                # Simple edits are turned into commands locally, without an LLM call
+                intent = None
+                if not force_llm and self.app_config.get('intent_fast_path', True) and not attachments_payload:
+                    intent = intent_parser.parse_intent(user_text, input_filename, self.input_ext, self.input_video_analysis)
+                # Repeated requests on similar inputs reuse a command that already worked
+                self._llm_cache_key = None if intent else llm_cache.make_key(
+                    provider, model, user_text, self.input_ext, input_video_info, attachments_payload)
+                ffmpeg_cmd = intent[0] if intent else None if force_llm else llm_cache.lookup(self._llm_cache_key, input_filename)
+                self._llm_cache_hit = bool(ffmpeg_cmd) and not intent
+                # Differently worded requests for the same edit reuse the earlier command too
+                self._history_reuse = None
+                if not ffmpeg_cmd and not force_llm and not attachments_payload:
+                    self._history_reuse = command_history.find_reusable(user_text, input_filename, self.input_ext, self.input_video_analysis)
+                    if self._history_reuse:
+                        ffmpeg_cmd = self._history_reuse[0]
+                if intent:
+                    self.append_chat_log("System", f"Handled locally: {intent[1]} (no LLM call).")
+                elif self._history_reuse:
+                    _, matched_request, similarity = self._history_reuse
+                    self.append_chat_log("System", f"Reusing the command from the similar request \"{matched_request}\" "
+                                                   f"({similarity:.0%} match, no LLM call). Start a request with ! to ask the LLM instead.")
+                elif ffmpeg_cmd:
+                    self.append_chat_log("System", "Reusing a previously successful command for this request (no LLM call).")
+                else:
+                    self.append_chat_log("Processing", f"Generating FFmpeg command with {provider} ({model})...")
+                    # First attempt - use normal function
+                    ffmpeg_cmd = llm_client.get_ffmpeg_command(
+                        user_text,
+                        input_filename,
+                        self.input_ext,
+                        endpoint,
+                        model,
+                        provider,
+                        api_key,
+                        attachments=attachments_payload,
+                        input_video_info=input_video_info,
+                        attachment_video_info=attachment_video_info if attachment_video_info else None,
+                        input_analysis=self.input_video_analysis
+                    )
         except Exception as e:
             print(f"[ERROR] Exception in get_ffmpeg_command: {e}")
             self.process_result_ready.emit({'error': f'LLM error: {e}'})
@@ -1714,6 +1844,9 @@ class MainWindow(QMainWindow):
                 # Update chips UI on main thread
                 from PyQt6.QtCore import QTimer
                 QTimer.singleShot(0, self.refresh_attachment_chips)
+        if self._cancel_event.is_set():
+            self.process_result_ready.emit({'cancelled': True, 'ffmpeg_cmd': ffmpeg_cmd, 'retry_count': retry_count})
+            return
         if not ffmpeg_cmd:
             print("[ERROR] Failed to get command from LLM.")
             self.process_result_ready.emit({'error': 'Failed to get command from LLM.'})
@@ -1730,18 +1863,101 @@ class MainWindow(QMainWindow):
             print(f"[ERROR] Invalid FFmpeg command: {reason}")
             self.process_result_ready.emit({'error': f'Invalid FFmpeg command: {reason}', 'ffmpeg_cmd': ffmpeg_cmd})
             return
+        # Turn needless re-encodes into stream copies and move seeks before the input
+        if self.app_config.get('optimize_commands', True):
+            try:
+                optimized_cmd, rewrites = command_optimizer.optimize_command(ffmpeg_cmd, self.input_video_analysis)
+                if rewrites and ffmpeg_runner.validate_ffmpeg_command(optimized_cmd)[0]:
+                    for rewrite in rewrites:
+                        print(f"[INFO] Command rewrite: {rewrite}")
+                        self.append_chat_log("System", f"Optimized: {rewrite}")
+                    ffmpeg_cmd = optimized_cmd
+                    print(f"[INFO] Optimized FFmpeg command: {ffmpeg_cmd}")
+            except Exception as e:
+                print(f"[WARNING] Command optimization failed: {e}")
         # Run FFmpeg (use ffmpeg_path if needed in ffmpeg_runner)
+        # Serve repeated commands on identical inputs from the result cache
+        cache_key = None
+        output_match = re.search(r'output\.([a-zA-Z0-9]+)', ffmpeg_cmd)
+        cache_output = os.path.join(self.project_dir, f"output.{output_match.group(1) if output_match else self.input_ext}")
+        try:
+            cache_key = result_cache.make_key(ffmpeg_cmd, self.project_dir)
+            if result_cache.fetch(cache_key, cache_output):
+                self.append_chat_log("Success", "Identical edit found in result cache, skipping encode.")
+                self._finish_command(user_text, ffmpeg_cmd, retry_count,
+                                     {'success': True, 'stdout': '', 'stderr': '', 'returncode': 0, 'cached': True})
+                return
+        except Exception as e:
+            print(f"[WARNING] Result cache lookup failed: {e}")
+        # Catch broken commands on a short excerpt before committing to a long run
+        if preflight.should_preflight(ffmpeg_cmd, video_analyzer.get_duration(self.input_video_analysis)):
+            self.append_chat_log("Processing", f"Checking the command on a {preflight.EXCERPT_SECONDS}s excerpt...")
+            check = preflight.PreflightCheck(ffmpeg_cmd, self.project_dir)
+            self._current_job = check
+            if self._cancel_event.is_set():
+                check.cancel()
+            try:
+                check_result = check.run()
+            finally:
+                self._current_job = None
+            if check_result.get('cancelled') or not (check_result.get('success') or check_result.get('inconclusive')):
+                self._finish_command(user_text, ffmpeg_cmd, retry_count, check_result)
+                return
         print(f"[INFO] Running FFmpeg command...")
         self.append_chat_log("Processing", "Executing FFmpeg command...")
         try:
-            result = ffmpeg_runner.run_ffmpeg_command(ffmpeg_cmd, self.project_dir)
+            chunkable, reason = False, 'disabled in settings'
+            if self.app_config.get('chunked_encoding', False) and self.input_video_analysis:
+                chunkable, reason = chunked_encoder.is_chunkable(ffmpeg_cmd, self.input_video_analysis)
+            if chunkable:
+                self.append_chat_log("Processing", "Encoding in parallel chunks...")
+                job = chunked_encoder.ChunkedEncode(
+                    ffmpeg_cmd,
+                    self.project_dir,
+                    self.input_video_analysis,
+                    progress_callback=self.ffmpeg_progress.emit
+                )
+            else:
+                print(f"[INFO] Single-pass encode ({reason})")
+                job = ffmpeg_runner.FFmpegJob(
+                    ffmpeg_cmd,
+                    self.project_dir,
+                    progress_callback=self.ffmpeg_progress.emit,
+                    duration=video_analyzer.get_duration(self.input_video_analysis)
+                )
+            self._current_job = job
+            if self._cancel_event.is_set():
+                job.cancel()
+            result = job.run()
         except Exception as e:
             print(f"[ERROR] Exception in run_ffmpeg_command: {e}")
             self.process_result_ready.emit({'error': f'FFmpeg run error: {e}', 'ffmpeg_cmd': ffmpeg_cmd})
             return
+        finally:
+            self._current_job = None
         print(f"[INFO] FFmpeg finished. Success: {result.get('success')}")
+        if result.get('success'):
+            try:
+                result_cache.store(cache_key, cache_output)
+            except Exception as e:
+                print(f"[WARNING] Could not store result in cache: {e}")
+        self._finish_command(user_text, ffmpeg_cmd, retry_count, result)
+
+    def _finish_command(self, user_text, ffmpeg_cmd, retry_count, result):
+        """Handle an FFmpeg result: schedule a retry, or promote output.ext to the next input"""
         emit_data = {'ffmpeg_cmd': ffmpeg_cmd, 'ffmpeg_result': result, 'user_text': user_text, 'retry_count': retry_count}
-        if not result.get('success'):
+        if result.get('cancelled'):
+            print("[INFO] FFmpeg job cancelled by user")
+            emit_data['cancelled'] = True
+        elif not result.get('success'):
+            if getattr(self, '_llm_cache_hit', False):
+                # The cached command does not suit this input; forget it
+                llm_cache.evict(getattr(self, '_llm_cache_key', None))
+                self._llm_cache_hit = False
+            if getattr(self, '_history_reuse', None):
+                # The earlier command does not suit this input after all
+                command_history.discard(self._history_reuse[1])
+                self._history_reuse = None
             # Store failed command and error for potential retry
             self._last_failed_command = ffmpeg_cmd
             self._last_error = result.get('stderr', 'Unknown error')
@@ -1751,13 +1967,27 @@ class MainWindow(QMainWindow):
                 print(f"[INFO] FFmpeg failed, attempting retry #{retry_count + 1}")
                 emit_data['retry_attempt'] = True
                 self.process_result_ready.emit(emit_data)
-                # Schedule retry in background thread
-                threading.Thread(target=self.process_command, args=(user_text, retry_count + 1), daemon=True).start()
+                # Schedule retry on the job scheduler
+                self._submit_job(self.process_command, user_text, retry_count + 1)
                 return
             else:
                 print(f"[ERROR] FFmpeg failed after {retry_count + 1} attempts, giving up")
                 emit_data['error'] = f"FFmpeg error: {result.get('stderr')}"
+                if result.get('log_path'):
+                    emit_data['error'] += f"\n(full log: {result['log_path']})"
         else:
+            # Remember the working command (the corrected one after a retry) for this request
+            try:
+                llm_cache.store(getattr(self, '_llm_cache_key', None), ffmpeg_cmd, os.path.basename(self.input_path))
+            except Exception as e:
+                print(f"[WARNING] Failed to update LLM cache: {e}")
+            # Keep the request -> command pair for checkpoints and few-shot retrieval
+            try:
+                if getattr(self, '_checkpoint_num', None):
+                    project_manager.set_checkpoint_command(self.project_dir, self._checkpoint_num, ffmpeg_cmd)
+                command_history.record(user_text, ffmpeg_cmd, os.path.basename(self.input_path), self.input_video_analysis)
+            except Exception as e:
+                print(f"[WARNING] Failed to record command history: {e}")
             # Clear retry state on success
             if hasattr(self, '_last_failed_command'):
                 delattr(self, '_last_failed_command')
@@ -1802,6 +2032,8 @@ class MainWindow(QMainWindow):
                     print(f"[ERROR] Exception during thumbnail generation: {e}")
                 emit_data['new_input_file'] = new_input_file
                 emit_data['new_input_ext'] = output_ext
+                # Re-analyze so progress, timeouts and the next prompt see the edited video
+                emit_data['new_input_analysis'] = video_analyzer.analyze_video(new_input_file)
             except Exception as e:
                 print(f"[ERROR] Could not update input file: {e}")
                 emit_data['error'] = f"Could not update input file: {e}"
@@ -1809,7 +2041,22 @@ class MainWindow(QMainWindow):
                 return
         self.process_result_ready.emit(emit_data)
 
+    def on_ffmpeg_progress(self, progress):
+        """Update the progress bar from FFmpeg progress (called on the main thread via signal)"""
+        if progress.get('status') == 'end':
+            self.ffmpeg_progress_bar.hide()
+            return
+        if progress.get('percent') is not None:
+            self.ffmpeg_progress_bar.setRange(0, 100)
+            self.ffmpeg_progress_bar.setValue(int(progress['percent']))
+        else:
+            # Unknown duration: show a busy indicator with the raw stats
+            self.ffmpeg_progress_bar.setRange(0, 0)
+        self.ffmpeg_progress_bar.setFormat(ffmpeg_runner.format_progress(progress))
+        self.ffmpeg_progress_bar.show()
+
     def on_process_result_ready(self, data):
+        self.ffmpeg_progress_bar.hide()
         try:
             user_text = data.get('user_text', None)
             ffmpeg_cmd = data.get('ffmpeg_cmd', None)
@@ -1819,6 +2066,7 @@ class MainWindow(QMainWindow):
             new_input_ext = data.get('new_input_ext', None)
             retry_count = data.get('retry_count', 0)
             retry_attempt = data.get('retry_attempt', False)
+            cancelled = data.get('cancelled', False)
 
             if ffmpeg_cmd:
                 if retry_count > 0:
@@ -1826,8 +2074,17 @@ class MainWindow(QMainWindow):
                 else:
                     self.append_chat_log("Command", ffmpeg_cmd)
                     
+            if cancelled:
+                self.append_chat_log("Warning", "Command cancelled. Partial output was discarded.")
+                self.enable_chat_input()
+                return
+                
             if retry_attempt:
                 # This is a retry notification - show user that we're retrying
+                if ffmpeg_result and (ffmpeg_result.get('stalled') or ffmpeg_result.get('reader_failed')):
+                    self.append_chat_log("Warning", ffmpeg_result.get('stderr', '').split('\n', 1)[0])
+                elif ffmpeg_result and ffmpeg_result.get('preflight'):
+                    self.append_chat_log("Warning", "Command failed on the excerpt check; skipped the full-length run.")
                 self.append_chat_log("Warning", f"Command failed, retrying with corrected command... (attempt {retry_count + 1}/3)")
                 return  # Don't re-enable input yet, retry is in progress
                 
@@ -1842,6 +2099,7 @@ class MainWindow(QMainWindow):
                 if new_input_file and new_input_ext:
                     self.input_path = new_input_file
                     self.input_ext = new_input_ext
+                    self.input_video_analysis = data.get('new_input_analysis')
                     self.update_processed_video(self.input_path)
                 if retry_count > 0:
                     self.append_chat_log("Success", f"Success on retry #{retry_count}!")
@@ -1859,6 +2117,8 @@ class MainWindow(QMainWindow):
             self.enable_chat_input()
 
     def enable_chat_input(self):
+        self.cancel_btn.hide()
+        self.send_btn.show()
         self.chat_input.setDisabled(False)
         self.on_chat_input_changed()
 
@@ -2000,6 +2260,13 @@ class MainWindow(QMainWindow):
         
         main_layout.addWidget(options_container)
         
+        # Batch mode: one instruction over many files, outside of a project
+        batch_btn = QPushButton("Batch edit many files with one instruction...")
+        batch_btn.setObjectName("BatchEditButton")
+        batch_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        batch_btn.clicked.connect(self.open_batch_dialog)
+        main_layout.addWidget(batch_btn, alignment=Qt.AlignmentFlag.AlignHCenter)
+        
         # Add to main layout with stretch after to push content to top
         self.project_stack_layout.addWidget(self.new_project_widget)
         self.project_stack_layout.addStretch(1)  # Add stretch only after content to push it up
@@ -2216,6 +2483,8 @@ class MainWindow(QMainWindow):
         if self.input_video_analysis:
             summary = video_analyzer.get_video_summary(self.input_video_analysis)
             print(f"[INFO] Loaded project input video analysis: {summary}")
+        # The model may have been unloaded while no project was open
+        self.warm_up_llm()
         
         # Set UI state for project loaded
         self.set_ui_state_for_project_loaded()
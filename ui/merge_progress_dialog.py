@@ -1,20 +1,21 @@
 from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QProgressBar, QPushButton, QTextEdit, QFrame
 from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 from PyQt6.QtGui import QFont
-import threading
 import time
+from backend import job_scheduler
 
 class MergeProgressDialog(QDialog):
     merge_completed = pyqtSignal(str)  # Emits the output path when merge is complete
     merge_failed = pyqtSignal(str)     # Emits error message when merge fails
     progress_updated = pyqtSignal(int, str)  # Emits progress updates (percent, message)
+    merge_cancelled = pyqtSignal()     # Emitted once a cancelled merge has stopped
     
     def __init__(self, video_paths, output_path, parent=None):
         super().__init__(parent)
         self.video_paths = video_paths
         self.output_path = output_path
         self.merger = None
-        self.merge_thread = None
+        self.merge_job_id = None
         self.merge_completed_flag = False
         
         self.setWindowTitle("Merging Videos")
@@ -103,14 +104,14 @@ class MergeProgressDialog(QDialog):
         self.progress_updated.connect(self._update_progress)
         self.merge_completed.connect(self._on_merge_completed)
         self.merge_failed.connect(self._on_merge_failed)
+        self.merge_cancelled.connect(self._on_merge_cancelled)
     
     def start_merge(self):
-        """Start the merge process in a background thread"""
+        """Start the merge process on the shared job scheduler"""
         from backend.video_merger import VideoMerger
         
         self.merger = VideoMerger()
-        self.merge_thread = threading.Thread(target=self._run_merge, daemon=True)
-        self.merge_thread.start()
+        self.merge_job_id = job_scheduler.get_scheduler().submit(self._run_merge, name="merge")
     
     def _run_merge(self):
         """Run the merge process in background thread"""
@@ -128,7 +129,9 @@ class MergeProgressDialog(QDialog):
             )
             
             # Emit result
-            if result.get('success'):
+            if result.get('cancelled'):
+                self.merge_cancelled.emit()
+            elif result.get('success'):
                 self.merge_completed.emit(self.output_path)
             else:
                 error_msg = result.get('error', 'Unknown error occurred')
@@ -169,18 +172,29 @@ class MergeProgressDialog(QDialog):
         self.cancel_btn.setObjectName("MergeCloseErrorButton")
         # Don't auto-close on failure, let user read the error
     
+    def _on_merge_cancelled(self):
+        """Handle a cancelled merge once FFmpeg has stopped"""
+        self.merge_completed_flag = True
+        self.reject()
+    
     def cancel_merge(self):
         """Cancel the merge process or close dialog"""
         if self.merge_completed_flag:
             # Merge is done, just close
             self.accept()
+        elif self.merger:
+            # Merge is still running: stop FFmpeg and wait for the thread to report back
+            self.merger.cancel()
+            self.cancel_btn.setEnabled(False)
+            self.status_label.setText("Cancelling merge...")
+            self.details_label.setText("Stopping FFmpeg and removing partial output...")
         else:
-            # Merge is still running, cancel it
             self.reject()
     
     def closeEvent(self, event):
         """Prevent closing during merge"""
-        if not self.merge_completed_flag and self.merge_thread and self.merge_thread.is_alive():
+        merge_state = job_scheduler.get_scheduler().state(self.merge_job_id) if self.merge_job_id else None
+        if not self.merge_completed_flag and merge_state in (job_scheduler.QUEUED, job_scheduler.RUNNING):
             event.ignore()
         else:
             event.accept() 
\ No newline at end of file
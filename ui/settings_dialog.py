@@ -1,8 +1,8 @@
-from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QFileDialog, QMessageBox, QComboBox
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QFileDialog, QMessageBox, QComboBox, QCheckBox
 from PyQt6.QtCore import pyqtSignal
 import subprocess
 import os
-from backend import llm_client
+from backend import llm_client, llm_stats, command_history
 
 PROVIDER_DEFAULTS = {
     'Ollama': {
@@ -70,6 +70,34 @@ class SettingsDialog(QDialog):
         layout.addWidget(self.label_llm_model)
         layout.addWidget(self.llm_model_combo)
         layout.addWidget(self.llm_model)
+        # Backup provider for hedged requests
+        label_hedge = QLabel("Backup LLM (asked when the primary is slow):")
+        label_hedge.setObjectName("SettingsLabel")
+        layout.addWidget(label_hedge)
+        hedge_row = QHBoxLayout()
+        self.hedge_provider = QComboBox()
+        self.hedge_provider.setObjectName("ProviderComboBox")
+        self.hedge_provider.addItems(["None", "Ollama", "OpenAI", "Gemini", "Claude"])
+        hedge_row.addWidget(self.hedge_provider)
+        self.hedge_model = QLineEdit()
+        self.hedge_model.setObjectName("LlmModelInput")
+        self.hedge_model.setPlaceholderText("Model")
+        hedge_row.addWidget(self.hedge_model)
+        self.hedge_delay = QLineEdit()
+        self.hedge_delay.setObjectName("LlmModelInput")
+        self.hedge_delay.setPlaceholderText("After (s)")
+        self.hedge_delay.setMaximumWidth(80)
+        hedge_row.addWidget(self.hedge_delay)
+        layout.addLayout(hedge_row)
+        self.hedge_endpoint = QLineEdit()
+        self.hedge_endpoint.setObjectName("LlmEndpointInput")
+        self.hedge_endpoint.setPlaceholderText("Backup endpoint")
+        layout.addWidget(self.hedge_endpoint)
+        self.hedge_api_key = QLineEdit()
+        self.hedge_api_key.setObjectName("ApiKeyInput")
+        self.hedge_api_key.setPlaceholderText("Backup API key")
+        self.hedge_api_key.setEchoMode(QLineEdit.EchoMode.Password)
+        layout.addWidget(self.hedge_api_key)
         # FFmpeg path
         ffmpeg_row = QHBoxLayout()
         label_ffmpeg = QLabel("FFmpeg Path:")
@@ -103,6 +131,61 @@ class SettingsDialog(QDialog):
         browse_export.clicked.connect(self.browse_export)
         export_row.addWidget(browse_export)
         layout.addLayout(export_row)
+        # Performance options
+        label_performance = QLabel("Performance:")
+        label_performance.setObjectName("SettingsLabel")
+        layout.addWidget(label_performance)
+        self.chunked_encoding = QCheckBox("Encode long videos in parallel chunks")
+        self.chunked_encoding.setObjectName("SettingsCheckBox")
+        self.chunked_encoding.setToolTip("Split long inputs at keyframes and encode the pieces in parallel when the command has no temporal filters")
+        layout.addWidget(self.chunked_encoding)
+        self.optimize_commands = QCheckBox("Rewrite commands to avoid needless re-encodes")
+        self.optimize_commands.setObjectName("SettingsCheckBox")
+        self.optimize_commands.setToolTip("Use stream copy for untouched streams and seek before the input when it is safe")
+        self.optimize_commands.setChecked(True)
+        layout.addWidget(self.optimize_commands)
+        self.preflight = QCheckBox("Check commands on a short excerpt before long encodes")
+        self.preflight.setObjectName("SettingsCheckBox")
+        self.preflight.setToolTip("Run the command on the first 2 seconds of inputs longer than 30 seconds and retry right away if it fails")
+        self.preflight.setChecked(True)
+        layout.addWidget(self.preflight)
+        self.llm_streaming = QCheckBox("Stream LLM responses and stop at the first complete command")
+        self.llm_streaming.setObjectName("SettingsCheckBox")
+        self.llm_streaming.setToolTip("Start FFmpeg as soon as the command is generated instead of waiting for the full reply")
+        self.llm_streaming.setChecked(True)
+        layout.addWidget(self.llm_streaming)
+        self.intent_fast_path = QCheckBox("Handle simple edits locally (trim, mute, scale, gif...)")
+        self.intent_fast_path.setObjectName("SettingsCheckBox")
+        self.intent_fast_path.setToolTip("Recognise common requests and build the command without asking the LLM")
+        self.intent_fast_path.setChecked(True)
+        layout.addWidget(self.intent_fast_path)
+        self.llm_constrained_output = QCheckBox("Constrain local model output to a single command")
+        self.llm_constrained_output.setObjectName("SettingsCheckBox")
+        self.llm_constrained_output.setToolTip("Send a JSON schema (Ollama 0.5+) or grammar (llama.cpp /completion) so the model can only answer with one FFmpeg command")
+        layout.addWidget(self.llm_constrained_output)
+        self.llm_plan_mode = QCheckBox("Ask the LLM for an edit plan and build the command locally")
+        self.llm_plan_mode.setObjectName("SettingsCheckBox")
+        self.llm_plan_mode.setToolTip("The model describes the edit as JSON; stream copy, seeking and encoder settings are chosen by the app. Falls back to a plain command for edits the plan cannot express")
+        layout.addWidget(self.llm_plan_mode)
+        self.few_shot_examples = QCheckBox("Show the LLM similar past requests as examples")
+        self.few_shot_examples.setObjectName("SettingsCheckBox")
+        self.few_shot_examples.setToolTip(f"Add up to {command_history.DEFAULT_EXAMPLES} earlier requests and the commands that worked for them to the prompt")
+        self.few_shot_examples.setChecked(True)
+        layout.addWidget(self.few_shot_examples)
+        self.fuzzy_reuse = QCheckBox("Reuse commands from near-identical earlier requests")
+        self.fuzzy_reuse.setObjectName("SettingsCheckBox")
+        self.fuzzy_reuse.setToolTip("Run the command of a differently worded request for the same edit on a compatible input without asking the LLM. Start a request with ! to always ask the LLM")
+        self.fuzzy_reuse.setChecked(True)
+        layout.addWidget(self.fuzzy_reuse)
+        # Recent LLM latency and validity per provider/model
+        label_llm_stats = QLabel(f"LLM performance (last {llm_stats.MAX_RECORDS} requests):")
+        label_llm_stats.setObjectName("SettingsLabel")
+        layout.addWidget(label_llm_stats)
+        self.llm_stats_summary = QLabel(llm_stats.format_summary())
+        self.llm_stats_summary.setObjectName("LlmStatsSummary")
+        self.llm_stats_summary.setToolTip("Median and 95th percentile response time, and how often the reply was a valid FFmpeg command")
+        self.llm_stats_summary.setWordWrap(True)
+        layout.addWidget(self.llm_stats_summary)
         # Buttons
         btn_row = QHBoxLayout()
         save_btn = QPushButton("Save")
@@ -123,6 +206,20 @@ class SettingsDialog(QDialog):
             self.api_key.setText(settings.get('api_key', PROVIDER_DEFAULTS[provider]['api_key']))
             self.ffmpeg_path.setText(settings.get('ffmpeg_path', ''))
             self.export_dir.setText(settings.get('export_dir', ''))
+            self.chunked_encoding.setChecked(settings.get('chunked_encoding', False))
+            self.optimize_commands.setChecked(settings.get('optimize_commands', True))
+            self.preflight.setChecked(settings.get('preflight', True))
+            self.llm_streaming.setChecked(settings.get('llm_streaming', True))
+            self.intent_fast_path.setChecked(settings.get('intent_fast_path', True))
+            self.llm_constrained_output.setChecked(settings.get('llm_constrained_output', False))
+            self.llm_plan_mode.setChecked(settings.get('llm_output_mode', 'command') == 'plan')
+            self.few_shot_examples.setChecked(int(settings.get('few_shot_examples', command_history.DEFAULT_EXAMPLES)) > 0)
+            self.fuzzy_reuse.setChecked(settings.get('fuzzy_reuse', True))
+            self.hedge_provider.setCurrentText(settings.get('hedge_provider') or 'None')
+            self.hedge_model.setText(settings.get('hedge_model', ''))
+            self.hedge_endpoint.setText(settings.get('hedge_endpoint', ''))
+            self.hedge_api_key.setText(settings.get('hedge_api_key', ''))
+            self.hedge_delay.setText(str(settings.get('hedge_delay', llm_client.DEFAULT_HEDGE_DELAY)))
         else:
             self.provider.setCurrentText('Ollama')
             self.llm_endpoint.setText(PROVIDER_DEFAULTS['Ollama']['endpoint'])
@@ -130,9 +227,15 @@ class SettingsDialog(QDialog):
             self.api_key.setText('')
         
         # Connect provider change signal and initialize UI state
+        self.hedge_provider.currentTextChanged.connect(self.on_hedge_provider_changed)
         self.provider.currentTextChanged.connect(self.on_provider_changed)
         self.on_provider_changed(self.provider.currentText(), skip_defaults=True)
 
+    def on_hedge_provider_changed(self, provider):
+        if provider in PROVIDER_DEFAULTS:
+            self.hedge_endpoint.setText(PROVIDER_DEFAULTS[provider]['endpoint'])
+            self.hedge_model.setText(PROVIDER_DEFAULTS[provider]['model'])
+
     def on_provider_changed(self, provider, skip_defaults=False):
         # Set sensible defaults only if not skipping (i.e., not during initial load)
         if not skip_defaults:
@@ -200,6 +303,11 @@ class SettingsDialog(QDialog):
             model = self.llm_model_combo.currentText()
         else:
             model = self.llm_model.text().strip()
+        hedge_provider = self.hedge_provider.currentText()
+        try:
+            hedge_delay = float(self.hedge_delay.text().strip())
+        except ValueError:
+            hedge_delay = llm_client.DEFAULT_HEDGE_DELAY
         settings = {
             'provider': provider,
             'llm_endpoint': self.llm_endpoint.text().strip(),
@@ -207,6 +315,20 @@ class SettingsDialog(QDialog):
             'api_key': self.api_key.text().strip(),
             'ffmpeg_path': self.ffmpeg_path.text().strip(),
             'export_dir': self.export_dir.text().strip(),
+            'chunked_encoding': self.chunked_encoding.isChecked(),
+            'optimize_commands': self.optimize_commands.isChecked(),
+            'preflight': self.preflight.isChecked(),
+            'llm_streaming': self.llm_streaming.isChecked(),
+            'intent_fast_path': self.intent_fast_path.isChecked(),
+            'llm_constrained_output': self.llm_constrained_output.isChecked(),
+            'llm_output_mode': 'plan' if self.llm_plan_mode.isChecked() else 'command',
+            'few_shot_examples': command_history.DEFAULT_EXAMPLES if self.few_shot_examples.isChecked() else 0,
+            'fuzzy_reuse': self.fuzzy_reuse.isChecked(),
+            'hedge_provider': hedge_provider if hedge_provider != 'None' else '',
+            'hedge_model': self.hedge_model.text().strip(),
+            'hedge_endpoint': self.hedge_endpoint.text().strip(),
+            'hedge_api_key': self.hedge_api_key.text().strip(),
+            'hedge_delay': hedge_delay,
         }
         self.settings_saved.emit(settings)
         self.accept() 
\ No newline at end of file